@@ -0,0 +1,375 @@
+"""
+End-to-end ingestion load benchmark, usually run through `invoke bench`.
+
+Starts the application under gunicorn with `deployment.custom_uvicorn_worker`
+and the batching consumer (`manage.py consume_events`) against the configured
+Postgres and broker, then drives `/events/` (or `/events/batch/`) with
+simulated sessions from a built-in asyncio load generator. Every event carries a sequence number in its `data`, which a poller
+uses to find out when its row was committed.
+
+The results are written as JSON so runs can be compared:
+
+    python -m deployment.bench --duration 30 --connections 64 --output bench.json
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import datetime, timedelta, timezone
+
+
+CATEGORIES = {
+    "page interaction": ("pageview", "cta click"),
+    "form interaction": ("submit", "field focus"),
+}
+PATHS = ("/", "/reviews/", "/reviews/cars/", "/compare/", "/contact/")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load.")
+    parser.add_argument(
+        "--connections", type=int, default=32, help="Concurrent keep-alive clients."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Events per request, more than 1 posts to /events/batch/.",
+    )
+    parser.add_argument(
+        "--session-length", type=int, default=50, help="Events sent per session."
+    )
+    parser.add_argument("--workers", type=int, default=2, help="Gunicorn workers.")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument(
+        "--epoch",
+        default="2022-01-01T00:00:00+00:00",
+        help=(
+            "Timestamp of the first simulated event. It must be accepted by the "
+            "event_timestamp_cannot_be_future_dated constraint of the database."
+        ),
+    )
+    parser.add_argument(
+        "--commit-timeout",
+        type=float,
+        default=30,
+        help="Seconds to wait for the last events to be committed.",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Send gzip compressed request bodies and accept gzip responses.",
+    )
+    parser.add_argument("--output", default="bench_output.json")
+
+    return parser.parse_args()
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+
+    samples = sorted(samples)
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+
+    return {
+        "p50": round(cuts[49] * 1000, 3),
+        "p95": round(cuts[94] * 1000, 3),
+        "p99": round(cuts[98] * 1000, 3),
+        "max": round(samples[-1] * 1000, 3),
+    }
+
+
+class LoadGenerator:
+    def __init__(self, args, token):
+        self.args = args
+        self.token = token
+        self.epoch = datetime.fromisoformat(args.epoch)
+        self.path = b"/events/batch/" if args.batch_size > 1 else b"/events/"
+        self.sequence = 0
+        self.sent_at = {}
+        self.latencies = []
+        self.errors = 0
+        self.bytes_sent = 0
+        self.body_bytes = 0
+        self.compression_seconds = 0.0
+
+    async def run(self):
+        self.deadline = time.monotonic() + self.args.duration
+        started_at = time.monotonic()
+        await asyncio.gather(
+            *(self.client(index) for index in range(self.args.connections))
+        )
+        self.elapsed = time.monotonic() - started_at
+
+    async def client(self, index):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.args.port)
+        random_generator = random.Random(index)
+        session_id, sent = str(uuid.uuid4()), 0
+
+        try:
+            while time.monotonic() < self.deadline:
+                events = []
+                for _ in range(self.args.batch_size):
+                    if sent == self.args.session_length:
+                        session_id, sent = str(uuid.uuid4()), 0
+                    events.append(self.event(session_id, sent, random_generator))
+                    sent += 1
+
+                body = json.dumps(events if self.args.batch_size > 1 else events[0])
+                body = body.encode()
+                self.body_bytes += len(body)
+
+                if self.args.gzip:
+                    started_at = time.process_time()
+                    body = gzip.compress(body, compresslevel=6)
+                    self.compression_seconds += time.process_time() - started_at
+
+                await self.post(reader, writer, body, events)
+        finally:
+            writer.close()
+
+    def event(self, session_id, position, random_generator):
+        self.sequence += 1
+        category = random_generator.choice(list(CATEGORIES))
+
+        return {
+            "session_id": session_id,
+            "category": category,
+            "name": random_generator.choice(CATEGORIES[category]),
+            "data": {
+                "host": "www.consumeraffairs.com",
+                "path": random_generator.choice(PATHS),
+                "bench_seq": self.sequence,
+            },
+            "timestamp": (self.epoch + timedelta(seconds=position)).isoformat(),
+        }
+
+    async def post(self, reader, writer, body, events):
+        encoding = b""
+        if self.args.gzip:
+            encoding = b"Content-Encoding: gzip\r\nAccept-Encoding: gzip\r\n"
+
+        request = (
+            b"POST " + self.path + b" HTTP/1.1\r\n"
+            b"Host: 127.0.0.1\r\n"
+            b"Authorization: Token " + self.token.encode() + b"\r\n"
+            b"Content-Type: application/json\r\n"
+            + encoding
+            + b"Content-Length: "
+            + str(len(body)).encode()
+            + b"\r\n\r\n"
+            + body
+        )
+        started_at = time.monotonic()
+        writer.write(request)
+        await writer.drain()
+
+        status = int((await reader.readline()).split()[1])
+        content_length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                content_length = int(value)
+        await reader.readexactly(content_length)
+
+        self.bytes_sent += len(request)
+        self.latencies.append(time.monotonic() - started_at)
+        if status == 204:
+            for event in events:
+                self.sent_at[event["data"]["bench_seq"]] = started_at
+        else:
+            self.errors += 1
+
+
+class CommitPoller(threading.Thread):
+    """
+    Records when the rows of the benchmark application become visible.
+    """
+
+    interval = 0.005
+    # Rows may commit out of id order, look back this many ids on every poll.
+    window = 50_000
+
+    def __init__(self, application_id):
+        super().__init__(daemon=True)
+        self.application_id = application_id
+        self.committed_at = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        from django.db import connection
+
+        last_id = 0
+        while not self.stopped.is_set():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT e.id, (e.data->>'bench_seq')::bigint
+                    FROM events_event e
+                    JOIN events_session s ON s.id = e.session_id
+                    WHERE s.application_id = %s AND e.id > %s
+                    """,
+                    [self.application_id, last_id - self.window],
+                )
+                now = time.monotonic()
+                for row_id, sequence in cursor.fetchall():
+                    self.committed_at.setdefault(sequence, now)
+                    last_id = max(last_id, row_id)
+
+            time.sleep(self.interval)
+
+        connection.close()
+
+    def wait_for(self, sequences, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and not sequences <= self.committed_at.keys():
+            time.sleep(0.1)
+
+        self.stopped.set()
+        self.join()
+
+
+def start_processes(args, env):
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "the_eye.asgi:application",
+            "--config",
+            "deployment/gunicorn.conf.py",
+            "--workers",
+            str(args.workers),
+            "--bind",
+            f"127.0.0.1:{args.port}",
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    consumer = subprocess.Popen(
+        [sys.executable, "manage.py", "consume_events"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+    return server, consumer
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/events/", timeout=1)
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.2)
+
+    raise RuntimeError("The application server did not start")
+
+
+def cpu_seconds(who, since):
+    usage = resource.getrusage(who)
+
+    return round(usage.ru_utime - since.ru_utime + usage.ru_stime - since.ru_stime, 3)
+
+
+def git_revision():
+    result = subprocess.run(
+        ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=False
+    )
+
+    return result.stdout.strip() or None
+
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "the_eye.bench_settings")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+
+    from events.models import Application
+
+    application = Application.objects.create(name=f"bench-{uuid.uuid4()}")
+    # CPU time of the server processes is added to the children usage once
+    # they're waited for, that of the load generator to the own usage.
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    own_usage = resource.getrusage(resource.RUSAGE_SELF)
+    processes = start_processes(args, os.environ.copy())
+
+    try:
+        wait_until_ready(args.port)
+
+        poller = CommitPoller(application.id)
+        poller.start()
+        generator = LoadGenerator(args, application.auth_token.key)
+        asyncio.run(generator.run())
+        poller.wait_for(set(generator.sent_at), args.commit_timeout)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+        application.delete()
+
+    server_cpu_seconds = cpu_seconds(resource.RUSAGE_CHILDREN, children_usage)
+    client_cpu_seconds = cpu_seconds(resource.RUSAGE_SELF, own_usage)
+
+    commit_latencies = [
+        poller.committed_at[sequence] - sent_at
+        for sequence, sent_at in generator.sent_at.items()
+        if sequence in poller.committed_at
+    ]
+    accepted = len(generator.sent_at)
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "config": vars(args),
+        "accept": {
+            "requests": len(generator.latencies),
+            "errors": generator.errors,
+            "events": accepted,
+            "events_per_second": round(accepted / generator.elapsed, 1),
+            "bytes_sent": generator.bytes_sent,
+            "body_bytes": generator.body_bytes,
+            "latency_ms": percentiles(generator.latencies),
+        },
+        "cpu_seconds": {
+            "server": server_cpu_seconds,
+            "client": client_cpu_seconds,
+            "client_compression": round(generator.compression_seconds, 3),
+        },
+        "commit": {
+            "events": len(commit_latencies),
+            "missing": accepted - len(commit_latencies),
+            "events_per_second": round(len(commit_latencies) / generator.elapsed, 1),
+            "poll_interval_ms": CommitPoller.interval * 1000,
+            "latency_ms": percentiles(commit_latencies),
+        },
+    }
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Gunicorn settings of the application server, run it with:
+
+    gunicorn -c deployment/gunicorn.conf.py the_eye.asgi:application
+
+When PROMETHEUS_MULTIPROC_DIR is set, the samples files of a previous run are
+removed before the workers start, and the files of exited workers are marked
+dead so their live gauges go away.
+
+Exiting workers store the events their direct writer still holds and close
+their spool segment, instead of leaving it to `atexit`.
+"""
+import os
+import shutil
+import sys
+
+from prometheus_client import multiprocess
+
+
+worker_class = "deployment.custom_uvicorn_worker.CustomWorker"
+
+
+def on_starting(server):
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        return
+
+    # Counters of the previous run would be added to the new ones.
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    # Only workers that loaded them have a writer or a spool to close.
+    if writer := sys.modules.get("events.writer"):
+        writer.close_writer()
+
+    if spool := sys.modules.get("events.spool"):
+        spool.close_spool()
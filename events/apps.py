@@ -7,3 +7,6 @@ class EventsConfig(AppConfig):
 
     def ready(self):
         import events.signals
+        from events.codec import register_kombu_serializer
+
+        register_kombu_serializer()
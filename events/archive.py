@@ -0,0 +1,376 @@
+"""
+Cold storage of the events older than the hot window.
+
+`archive_events` moves the events older than EVENTS_ARCHIVE_AFTER_DAYS days
+out of `events_event` into segment files in EVENTS_ARCHIVE_DIR, then deletes
+them in chunks of EVENTS_ARCHIVE_DELETE_CHUNK_SIZE rows. A segment holds up to
+EVENTS_ARCHIVE_SEGMENT_SIZE events of one application and one UTC day, sorted
+by `(timestamp, id)`, as gzip compressed NDJSON:
+
+    <EVENTS_ARCHIVE_DIR>/<application_id>/<YYYYMMDD>-<first id>.ndjson.gz
+
+Next to every segment a `.json` index holds its application, time range,
+number of events and session ids. Indexes are written after their segment,
+so segments without one are incomplete and ignored. A run holds the
+ARCHIVE_LOCK advisory lock throughout, concurrent runs skip archival.
+
+`GET /events/` reads the segments through `archived_events` when the requested
+time range starts before the hot window and the application has segments in
+it, and merges them with the rows still in the database with `merge_events`.
+"""
+import gzip
+import heapq
+import itertools
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from events.cache import LRUCache
+from events.codec import dumps, loads
+from events.models import Event
+from events.partitions import partition_range
+
+
+ARCHIVE_FIELDS = ("id", "session_id", "category", "name", "data", "timestamp", "uid")
+SEGMENT_SUFFIX = ".ndjson.gz"
+INDEX_SUFFIX = ".json"
+
+# Key of the Postgres advisory lock held by the archival run.
+ARCHIVE_LOCK = 7_364_812_001
+
+# Parsed indexes by `(path, mtime)`, segments are only rewritten by an
+# interrupted archival running again.
+index_cache = LRUCache(10_000)
+
+# Sorted indexes of every application directory by `(path, mtime)`, segments
+# are added with renames, which update the mtime of their directory.
+directory_cache = LRUCache(10_000)
+
+
+def archive_horizon(now: datetime = None):
+    """
+    Returns the start of the UTC day EVENTS_ARCHIVE_AFTER_DAYS days ago, events
+    before it are archived. None when archival is disabled.
+    """
+    if not settings.EVENTS_ARCHIVE_AFTER_DAYS:
+        return None
+
+    now = now or timezone.now()
+    start, _ = partition_range(
+        now - timedelta(days=settings.EVENTS_ARCHIVE_AFTER_DAYS), "day"
+    )
+
+    return start
+
+
+def archive_events(now: datetime = None, directory=None) -> dict:
+    """
+    Archives every event before `archive_horizon` and returns the number of
+    segments written and events archived. `skipped` is set when another run
+    holds the archive lock.
+    """
+    directory = directory or settings.EVENTS_ARCHIVE_DIR
+    result = {"segments": 0, "events": 0}
+    horizon = archive_horizon(now)
+
+    if horizon is None:
+        return result
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [ARCHIVE_LOCK])
+        (locked,) = cursor.fetchone()
+
+    if not locked:
+        return {**result, "skipped": True}
+
+    try:
+        _archive_until(horizon, directory, result)
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [ARCHIVE_LOCK])
+
+    return result
+
+
+def _archive_until(horizon: datetime, directory, result: dict):
+    archivable = Event.objects.filter(
+        timestamp__lt=horizon, application__isnull=False
+    ).order_by("timestamp")
+
+    while first := archivable.values("application_id", "timestamp").first():
+        start, end = partition_range(first["timestamp"], "day")
+        rows = list(
+            Event.objects.filter(
+                application_id=first["application_id"],
+                timestamp__gte=start,
+                timestamp__lt=min(end, horizon),
+            )
+            .order_by("timestamp", "id")
+            .values(*ARCHIVE_FIELDS)[: settings.EVENTS_ARCHIVE_SEGMENT_SIZE]
+        )
+
+        write_segment(directory, first["application_id"], rows)
+        delete_events([row["id"] for row in rows], start, end)
+
+        result["segments"] += 1
+        result["events"] += len(rows)
+
+
+def write_segment(directory, application_id: int, rows: list) -> str:
+    """
+    Writes `rows`, sorted by `(timestamp, id)`, and their index. Both files are
+    synced to disk before returning, since the rows are deleted next.
+    """
+    application_directory = os.path.join(directory, str(application_id))
+    os.makedirs(application_directory, exist_ok=True)
+
+    first_timestamp = rows[0]["timestamp"].astimezone(dt_timezone.utc)
+    name = f"{first_timestamp:%Y%m%d}-{rows[0]['id']}"
+    path = os.path.join(application_directory, name)
+    index = {
+        "application_id": application_id,
+        "start": rows[0]["timestamp"].isoformat(),
+        "end": rows[-1]["timestamp"].isoformat(),
+        "events": len(rows),
+        "session_ids": sorted({str(row["session_id"]) for row in rows}),
+    }
+
+    # Unique names, an interrupted run may have left its own behind.
+    temporary = f".{os.getpid()}-{uuid.uuid4().hex}.tmp"
+
+    with open(path + SEGMENT_SUFFIX + temporary, "wb") as segment:
+        with gzip.GzipFile(fileobj=segment, mode="wb") as compressed:
+            for row in rows:
+                row = {**row, "timestamp": row["timestamp"].isoformat()}
+                compressed.write(dumps(row) + b"\n")
+        segment.flush()
+        os.fsync(segment.fileno())
+
+    with open(path + INDEX_SUFFIX + temporary, "wb") as index_file:
+        index_file.write(dumps(index))
+        index_file.flush()
+        os.fsync(index_file.fileno())
+
+    os.replace(path + SEGMENT_SUFFIX + temporary, path + SEGMENT_SUFFIX)
+    os.replace(path + INDEX_SUFFIX + temporary, path + INDEX_SUFFIX)
+    _fsync_directory(application_directory)
+
+    return path + SEGMENT_SUFFIX
+
+
+def delete_events(ids: list, start: datetime, end: datetime):
+    """
+    Deletes the events of `ids` in `[start, end)` in chunks, one transaction
+    each, so no transaction holds locks on many rows.
+    """
+    chunk_size = settings.EVENTS_ARCHIVE_DELETE_CHUNK_SIZE
+
+    for offset in range(0, len(ids), chunk_size):
+        Event.objects.filter(
+            timestamp__gte=start,
+            timestamp__lt=end,
+            id__in=ids[offset : offset + chunk_size],
+        ).delete()
+
+
+def reaches_archive(
+    application_id, after, now: datetime = None, directory=None
+) -> bool:
+    """
+    Whether a time range starting at `after` (None for no start) may contain
+    archived events of the application.
+    """
+    horizon = archive_horizon(now)
+    if horizon is None or (after is not None and after >= horizon):
+        return False
+
+    return bool(list_segments(application_id, after, directory=directory))
+
+
+def list_segments(application_id, after=None, before=None, directory=None) -> list:
+    """
+    Returns the indexes of the segments of the application overlapping
+    `[after, before)`, each with the `path` of its segment, by start.
+    """
+    directory = directory or settings.EVENTS_ARCHIVE_DIR
+
+    return [
+        index
+        for index in _list_indexes(os.path.join(directory, str(application_id)))
+        if (after is None or index["end"] >= after)
+        and (before is None or index["start"] < before)
+    ]
+
+
+def archived_events(
+    application_id,
+    session_id=None,
+    category=None,
+    data=None,
+    after=None,
+    before=None,
+    position=None,
+    directory=None,
+):
+    """
+    Yields the archived events of the application matching the filters of
+    `GET /events/`, sorted by `(timestamp, id)`. `position` is the `(timestamp,
+    id)` of the last event already returned. Rows are dicts of ARCHIVE_FIELDS.
+    """
+    if session_id is not None:
+        try:
+            session_id = str(uuid.UUID(str(session_id)))
+        except ValueError:
+            return
+
+    # Segments ending before the position were returned by earlier pages.
+    start = after
+    if position is not None and (start is None or position[0] > start):
+        start = position[0]
+
+    segments = [
+        index
+        for index in list_segments(application_id, start, before, directory)
+        if session_id is None or session_id in index["session_ids"]
+    ]
+
+    # Segments of different days don't overlap, only those of the same day
+    # (archived by different runs) need merging.
+    for _, day in itertools.groupby(segments, key=lambda index: index["day"]):
+        for row in heapq.merge(
+            *(_read_segment(index["path"]) for index in day), key=_position
+        ):
+            if session_id is not None and row["session_id"] != session_id:
+                continue
+            if category is not None and row["category"] != category:
+                continue
+            if data is not None and not contains(row["data"], data):
+                continue
+            if after is not None and row["timestamp"] < after:
+                continue
+            if before is not None and row["timestamp"] >= before:
+                break
+            if position is not None and _position(row) <= position:
+                continue
+
+            yield row
+
+
+def merge_events(events, archived):
+    """
+    Merges two iterables of events sorted by `(timestamp, id)`, skipping the
+    archived events still in the database. Events are dicts or `Event`s.
+    """
+    last = None
+
+    for event in heapq.merge(events, archived, key=_position):
+        position = _position(event)
+        if position != last:
+            last = position
+            yield event
+
+
+def contains(value, subset) -> bool:
+    """
+    Python version of the jsonb `@>` operator.
+    """
+    if isinstance(subset, dict):
+        return isinstance(value, dict) and all(
+            key in value and contains(value[key], item) for key, item in subset.items()
+        )
+
+    if isinstance(subset, list):
+        if not isinstance(value, list):
+            return False
+
+        return all(any(contains(element, item) for element in value) for item in subset)
+
+    if isinstance(value, list) and not isinstance(subset, (dict, list)):
+        return any(contains(element, subset) for element in value)
+
+    # jsonb compares numbers by value (1 matches 1.0) but never to booleans.
+    if _is_number(value) and _is_number(subset):
+        return value == subset
+
+    return type(value) is type(subset) and value == subset
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _position(event):
+    if isinstance(event, dict):
+        return event["timestamp"], event["id"]
+
+    return event.timestamp, event.id
+
+
+def _read_segment(path):
+    with gzip.open(path, "rb") as segment:
+        for line in segment:
+            row = loads(line)
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+            yield row
+
+
+def _list_indexes(application_directory):
+    try:
+        mtime = os.stat(application_directory).st_mtime_ns
+    except FileNotFoundError:
+        return []
+
+    key = (application_directory, mtime)
+    if (indexes := directory_cache.get(key)) is not None:
+        return indexes
+
+    indexes = []
+    for name in os.listdir(application_directory):
+        if name.endswith(INDEX_SUFFIX):
+            index = _read_index(os.path.join(application_directory, name))
+            if index is not None:
+                indexes.append(index)
+
+    indexes.sort(key=lambda index: index["start"])
+
+    # A rename within the same mtime tick as the listing wouldn't change the
+    # key, directories modified during the last second are listed again.
+    if time.time_ns() - mtime > 1_000_000_000:
+        directory_cache.set(key, indexes)
+
+    return indexes
+
+
+def _read_index(path):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    key = (path, mtime)
+    if (index := index_cache.get(key)) is None:
+        with open(path, "rb") as index_file:
+            index = json.loads(index_file.read())
+
+        index["start"] = datetime.fromisoformat(index["start"])
+        index["end"] = datetime.fromisoformat(index["end"])
+        index["session_ids"] = frozenset(index["session_ids"])
+        index["path"] = path[: -len(INDEX_SUFFIX)] + SEGMENT_SUFFIX
+        index["day"] = os.path.basename(path).split("-")[0]
+        index_cache.set(key, index)
+
+    return index
+
+
+def _fsync_directory(path):
+    descriptor = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
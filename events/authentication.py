@@ -0,0 +1,28 @@
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from events.cache import LRUCache
+
+
+# Authenticated (application, token) pairs by token key. Entries are dropped by
+# `events.signals` when the token or the application changes in this process,
+# other processes stop using them after EVENTS_AUTH_CACHE_TTL seconds.
+token_cache = LRUCache(
+    settings.EVENTS_AUTH_CACHE_SIZE, ttl=settings.EVENTS_AUTH_CACHE_TTL
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that remembers valid tokens in process memory, so
+    authenticated requests don't query the database.
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+
+        return credentials
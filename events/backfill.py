@@ -0,0 +1,174 @@
+"""
+Bulk loading of historical events from NDJSON dumps, see `manage.py load_events`.
+
+Lines are validated with the rules of `EventSerializer` and loaded in chunks
+with `COPY ... FROM STDIN`, which is an order of magnitude faster than
+inserting rows through the ORM. Events already stored are skipped, so a dump
+can be loaded again. Lines that can't be loaded are written to a rejects file
+along with the reason, so they can be fixed and loaded again.
+"""
+import csv
+import gzip
+import io
+import json
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from events.dedup import event_uid
+from events.sessions import ensure_sessions
+from events.validators import validate_event
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+EVENT_COLUMNS = 'application_id, session_id, category, name, data, "timestamp", uid'
+
+# Chunks are copied to a temporary table first, `COPY` can't skip the events
+# that were already stored.
+CREATE_STAGING_TABLE = (
+    "CREATE TEMPORARY TABLE IF NOT EXISTS events_event_staging "
+    f"ON COMMIT DELETE ROWS AS SELECT {EVENT_COLUMNS} FROM events_event WITH NO DATA"
+)
+COPY_EVENTS = (
+    f"COPY events_event_staging ({EVENT_COLUMNS}) FROM STDIN WITH (FORMAT csv)"
+)
+INSERT_EVENTS = (
+    f"INSERT INTO events_event ({EVENT_COLUMNS}) "
+    f"SELECT {EVENT_COLUMNS} FROM events_event_staging ON CONFLICT DO NOTHING"
+)
+
+
+def open_events_file(path):
+    """
+    Opens an NDJSON file for reading in binary mode, decompressing it on the
+    fly when it's gzip compressed.
+    """
+    with open(path, "rb") as events_file:
+        compressed = events_file.read(2) == GZIP_MAGIC
+
+    return gzip.open(path, "rb") if compressed else open(path, "rb")
+
+
+class EventLoader:
+    """
+    Loads the lines of an NDJSON stream as events of `application_id`.
+
+    `rejects` is a text file receiving one JSON object per rejected line with
+    its `line` number, the `errors` and the original `event`. `on_progress` is
+    called with `stats` after every chunk.
+    """
+
+    def __init__(self, application_id, rejects, chunk_size=None, on_progress=None):
+        self.application_id = application_id
+        self.rejects = rejects
+        self.chunk_size = chunk_size or settings.EVENTS_BACKFILL_CHUNK_SIZE
+        self.on_progress = on_progress
+        self.stats = {
+            "read": 0,
+            "loaded": 0,
+            "duplicates": 0,
+            "rejected": 0,
+            "elapsed": 0.0,
+        }
+
+    def load(self, lines) -> dict:
+        started_at = time.monotonic()
+        now = timezone.now()
+        chunk = []
+
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+
+            self.stats["read"] += 1
+            try:
+                data = json.loads(line)
+            except ValueError as error:
+                self.reject(number, line, {"non_field_errors": [str(error)]})
+                continue
+
+            validated_data, errors = validate_event(data, now)
+            if errors:
+                self.reject(number, line, errors)
+                continue
+
+            chunk.append((number, line, validated_data))
+            if len(chunk) == self.chunk_size:
+                self.flush(chunk)
+                chunk = []
+                self.report_progress(started_at)
+
+        if chunk:
+            self.flush(chunk)
+        self.report_progress(started_at)
+
+        return self.stats
+
+    def flush(self, chunk):
+        try:
+            with transaction.atomic():
+                loaded = self.copy([event for _, _, event in chunk])
+        except DatabaseError:
+            # Something in the chunk broke a database constraint, load the
+            # events one by one to find out which ones.
+            for number, line, event in chunk:
+                try:
+                    with transaction.atomic():
+                        loaded = self.copy([event])
+                except DatabaseError as error:
+                    self.reject(number, line, {"non_field_errors": [str(error)]})
+                else:
+                    self.stats["loaded"] += loaded
+                    self.stats["duplicates"] += 1 - loaded
+        else:
+            self.stats["loaded"] += loaded
+            self.stats["duplicates"] += len(chunk) - loaded
+
+    def copy(self, events) -> int:
+        """
+        Stores `events`, skipping those already stored, and returns the number
+        of events inserted.
+        """
+        ensure_sessions((self.application_id, event["session_id"]) for event in events)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_ALL, lineterminator="\n")
+        for event in events:
+            writer.writerow(
+                [
+                    self.application_id,
+                    event["session_id"],
+                    event["category"],
+                    event["name"],
+                    json.dumps(event["data"]),
+                    event["timestamp"].isoformat(),
+                    event_uid(event),
+                ]
+            )
+        buffer.seek(0)
+
+        # `copy_expert` comes straight from psycopg2, translate its errors.
+        with connection.cursor() as cursor, connection.wrap_database_errors:
+            cursor.execute(CREATE_STAGING_TABLE)
+            cursor.copy_expert(COPY_EVENTS, buffer)
+            cursor.execute(INSERT_EVENTS)
+
+            return cursor.rowcount
+
+    def reject(self, number, line, errors):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+
+        self.stats["rejected"] += 1
+        self.rejects.write(
+            json.dumps({"line": number, "errors": errors, "event": line.strip()}) + "\n"
+        )
+
+    def report_progress(self, started_at):
+        self.stats["elapsed"] = time.monotonic() - started_at
+
+        if self.on_progress:
+            self.on_progress(self.stats)
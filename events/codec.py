@@ -0,0 +1,77 @@
+"""
+JSON encoding and decoding for the hot paths: DRF parsing and rendering
+(`events.parsers`, `events.renderers`), Celery messages and the spool.
+
+orjson is used when it's installed. Otherwise the stdlib is used through a
+single compact encoder built once, without indentation or key sorting.
+Either way, values JSON doesn't know about (Decimal, lazy translations,
+datetimes...) are encoded like DRF's `JSONEncoder` does.
+
+orjson only handles integers within 64 bits, so documents holding longer
+ones are encoded and decoded by the stdlib, which keeps them exact.
+"""
+import json
+import re
+
+from kombu.serialization import register
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+KOMBU_SERIALIZER = "fastjson"
+KOMBU_CONTENT_TYPE = "application/x-fastjson"
+
+# Numbers this long may not fit in 64 bits, orjson would decode them as floats.
+_LONG_NUMBER = re.compile(r"\d{19}")
+_LONG_NUMBER_BYTES = re.compile(rb"\d{19}")
+
+_encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"), check_circular=False)
+
+
+def stdlib_dumps(value) -> bytes:
+    return _encoder.encode(value).encode("utf-8")
+
+
+def orjson_dumps(value) -> bytes:
+    # DRF formats datetimes its own way, leave them to its encoder.
+    try:
+        return orjson.dumps(
+            value, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME
+        )
+    except TypeError:
+        # Integers over 64 bits, or a value neither encoder knows about, which
+        # the stdlib encoder reports the usual way.
+        return stdlib_dumps(value)
+
+
+def orjson_loads(content):
+    pattern = _LONG_NUMBER if isinstance(content, str) else _LONG_NUMBER_BYTES
+    if pattern.search(content):
+        return json.loads(content)
+
+    return orjson.loads(content)
+
+
+if orjson is not None:
+    dumps = orjson_dumps
+    loads = orjson_loads
+else:
+    dumps = stdlib_dumps
+    loads = json.loads
+
+
+def register_kombu_serializer():
+    """
+    Makes the codec available to Celery as the KOMBU_SERIALIZER serializer.
+    """
+    register(
+        KOMBU_SERIALIZER,
+        dumps,
+        loads,
+        content_type=KOMBU_CONTENT_TYPE,
+        content_encoding="utf-8",
+    )
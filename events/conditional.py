@@ -0,0 +1,85 @@
+"""
+Conditional requests and response caching for `GET /events/`.
+
+The ETag of a response is derived from the query parameters, the negotiated
+format and the highest event id of the application, so polling clients
+sending `If-None-Match` get a `304 Not Modified` until a new event arrives.
+
+Pages are kept in `response_cache` for up to EVENTS_RESPONSE_CACHE_TTL
+seconds. Pages of closed time ranges (`timestamp_before` in the past) are
+keyed on the query alone, so they stay cached while the application keeps
+ingesting, and events arriving late in a closed range show up once the TTL
+expires. Pages of open ranges are keyed on the ETag and miss on every new event.
+
+Transactions commit in any order, so an event committed after one with a
+higher id, as well as deleted, archived or expired events other than the
+newest one, don't change the highest id. They show up once another event
+arrives or the TTL expires.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from events.cache import LRUCache
+
+
+# Serialized pages by `response_cache_key`.
+response_cache = LRUCache(
+    settings.EVENTS_RESPONSE_CACHE_SIZE, ttl=settings.EVENTS_RESPONSE_CACHE_TTL
+)
+
+
+def application_watermark(application_id):
+    """
+    Returns the highest event id of the application, read from the end of the
+    `(application, id)` index of each partition.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT MAX(id) FROM events_event WHERE application_id = %s",
+            [application_id],
+        )
+
+        return cursor.fetchone()[0]
+
+
+def events_etag(request) -> str:
+    """
+    ETag of `GET /events/` for the authenticated application.
+    """
+    parts = _query_parts(request) + [application_watermark(request.user.id)]
+
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def response_cache_key(request, etag: str) -> str:
+    """
+    Returns the `response_cache` key of the request with ETag `etag`: the
+    query alone when its time range is closed, the ETag otherwise.
+    """
+    try:
+        before = parse_datetime(request.query_params.get("timestamp_before", ""))
+    except ValueError:
+        before = None
+
+    if before is None:
+        return etag
+
+    if timezone.is_naive(before):
+        before = timezone.make_aware(before)
+
+    if before > timezone.now():
+        return etag
+
+    return "closed-" + hashlib.md5(repr(_query_parts(request)).encode()).hexdigest()
+
+
+def _query_parts(request) -> list:
+    return [
+        request.user.id,
+        request.accepted_renderer.format,
+        sorted(request.query_params.lists()),
+    ]
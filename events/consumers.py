@@ -0,0 +1,133 @@
+import logging
+import socket
+import time
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection
+
+from events.ingest import persist_events
+from events.metrics import observe_commit_lag
+from events.wire import decode_event
+from the_eye.celery import celery_app
+
+
+logger = logging.getLogger(__name__)
+
+
+class EventBatchConsumer:
+    """
+    Consumes `handle_event` and `handle_events` messages from the events queue
+    without going through the Celery worker, so that many messages can be
+    stored with a single transaction.
+
+    A batch is flushed when it holds `batch_size` messages or when
+    `batch_timeout` milliseconds have passed since its first message arrived.
+    Messages are only acknowledged after the batch has been committed, so a
+    crash before the commit makes the broker redeliver them.
+    """
+
+    def __init__(self, app=celery_app, batch_size=None, batch_timeout=None):
+        self.app = app
+        self.batch_size = batch_size or settings.EVENTS_CONSUMER_BATCH_SIZE
+        self.batch_timeout = (
+            batch_timeout or settings.EVENTS_CONSUMER_BATCH_TIMEOUT_MS
+        ) / 1000
+        self.queue = self.app.amqp.queues[settings.EVENTS_QUEUE]
+        self.pending = []
+        self.deadline = None
+        self.should_stop = False
+
+    def run(self, max_batches=None):
+        batches = 0
+
+        with self.app.connection_for_read() as broker:
+            with broker.Consumer(
+                self.queue,
+                callbacks=[self.on_message],
+                accept=self.app.conf.accept_content,
+                prefetch_count=self.batch_size,
+            ):
+                while not self.should_stop:
+                    if self.pending:
+                        timeout = max(self.deadline - time.monotonic(), 0)
+                    else:
+                        timeout = self.batch_timeout
+
+                    try:
+                        broker.drain_events(timeout=timeout)
+                    except socket.timeout:
+                        pass
+
+                    if self.pending and (
+                        len(self.pending) >= self.batch_size
+                        or time.monotonic() >= self.deadline
+                    ):
+                        self.flush()
+                        batches += 1
+
+                        if max_batches and batches >= max_batches:
+                            break
+
+                if self.pending:
+                    self.flush()
+
+    def stop(self, *args):
+        self.should_stop = True
+
+    def on_message(self, body, message):
+        if message.headers.get("task") not in ("handle_event", "handle_events"):
+            logger.error("Rejecting unexpected task %s", message.headers.get("task"))
+            message.reject()
+            return
+
+        if not self.pending:
+            self.deadline = time.monotonic() + self.batch_timeout
+
+        self.pending.append(message)
+
+    def flush(self):
+        messages, self.pending = self.pending, []
+
+        try:
+            persist_events(
+                [item for message in messages for item in self._decode(message)]
+            )
+        except (InterfaceError, OperationalError):
+            # The database is unavailable, give the messages back to the broker
+            # and drop the connection so that the next batch reconnects.
+            logger.exception("Could not store a batch of %d messages", len(messages))
+            connection.close()
+            for message in messages:
+                message.requeue()
+            time.sleep(self.batch_timeout)
+        except Exception:
+            # Something in the batch can't be stored, retry the messages one by
+            # one so a single bad message doesn't hold back the rest.
+            self._flush_individually(messages)
+        else:
+            for message in messages:
+                message.ack()
+                observe_commit_lag("consumer", message.headers.get("published_at"))
+
+    def _flush_individually(self, messages):
+        for message in messages:
+            try:
+                persist_events(self._decode(message))
+            except (InterfaceError, OperationalError):
+                connection.close()
+                message.requeue()
+            except Exception:
+                logger.exception("Rejecting message %s", message.delivery_tag)
+                message.reject()
+            else:
+                message.ack()
+                observe_commit_lag("consumer", message.headers.get("published_at"))
+
+    @staticmethod
+    def _decode(message):
+        application_id, payload = message.decode()[0]
+
+        if message.headers["task"] == "handle_event":
+            return [(application_id, decode_event(payload))]
+
+        return [(application_id, decode_event(event)) for event in payload]
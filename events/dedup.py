@@ -0,0 +1,103 @@
+"""
+Rejection of events stored more than once, e.g. when an SDK retries a request
+that timed out after the events were accepted.
+
+Every event has a `uid`: the `event_id` sent by the client or, without one, a
+hash of its session, name, timestamp and data. `events_event` is unique on
+`(session, uid, timestamp)` and events are inserted with `ON CONFLICT DO
+NOTHING`, so a retried event is stored once. On top of that each worker
+process remembers the events it committed lately in `recent_events` and drops
+their retries before they reach the database.
+"""
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from events.cache import LRUCache
+from events.metrics import DUPLICATE_EVENTS
+
+
+# Keys of the events committed lately, shared by every thread of the worker process.
+recent_events = LRUCache(settings.EVENTS_RECENT_EVENTS_SIZE)
+
+
+def event_uid(payload: dict) -> str:
+    """
+    Returns the `uid` of an event: its `event_id`, or a hash of its content.
+    """
+    if payload.get("event_id"):
+        return payload["event_id"]
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(uuid.UUID(str(payload["session_id"]))).encode())
+    digest.update(b"\0" + payload["name"].encode())
+    timestamp = _timestamp(payload["timestamp"]).astimezone(timezone.utc)
+    digest.update(b"\0" + timestamp.isoformat().encode())
+    digest.update(
+        b"\0"
+        + json.dumps(
+            payload["data"], sort_keys=True, separators=(",", ":"), default=str
+        ).encode()
+    )
+
+    return digest.hexdigest()
+
+
+def drop_recent_events(batch: list) -> list:
+    """
+    Returns the `(application_id, payload)` pairs of `batch` that weren't
+    committed lately by this process nor come earlier in the batch, with the
+    `uid` of every payload set.
+    """
+    fresh = {}
+    duplicates = 0
+
+    for application_id, payload in batch:
+        payload["uid"] = payload.get("uid") or event_uid(payload)
+        payload.pop("event_id", None)
+
+        key = _key(payload)
+        if key in fresh or recent_events.get(key) is not None:
+            duplicates += 1
+        else:
+            fresh[key] = (application_id, payload)
+
+    if duplicates:
+        DUPLICATE_EVENTS.inc(duplicates)
+
+    return list(fresh.values())
+
+
+def remember_events(batch: list):
+    """
+    Adds the events of `batch` to `recent_events` once the current transaction
+    commits.
+    """
+    keys = [_key(payload) for _, payload in batch]
+
+    def remember():
+        for key in keys:
+            recent_events.set(key, True)
+
+    transaction.on_commit(remember)
+
+
+def _key(payload):
+    return (
+        uuid.UUID(str(payload["session_id"])),
+        payload["uid"],
+        _timestamp(payload["timestamp"]),
+    )
+
+
+def _timestamp(timestamp):
+    # Messages in the old dict format carry the timestamp of the request.
+    if isinstance(timestamp, str):
+        return parse_datetime(timestamp)
+
+    return timestamp
@@ -0,0 +1,147 @@
+import concurrent.futures
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from psycopg2 import errors
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from events.dedup import drop_recent_events, remember_events
+from events.models import Event
+from events.sessions import ensure_sessions, forget_sessions
+from the_eye.celery import celery_app
+
+
+logger = logging.getLogger(__name__)
+
+
+class CommitTimeout(APIException):
+    """
+    The events of a request weren't committed within
+    EVENTS_DIRECT_ACK_TIMEOUT_MS. They may still be, retries are deduplicated.
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Events could not be stored in time, retry the request."
+    default_code = "commit_timeout"
+
+
+class SpoolUnavailable(APIException):
+    """
+    The events of a request couldn't be synced to the spool, because fsync
+    failed or took longer than EVENTS_SPOOL_SYNC_TIMEOUT_MS.
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Events could not be stored, retry the request."
+    default_code = "spool_unavailable"
+
+
+def persist_events(batch: list) -> list:
+    """
+    Stores a batch of `(application_id, payload)` pairs in a single transaction,
+    creating the sessions that don't exist yet with one bulk insert. Events
+    already stored are skipped, see `events.dedup`.
+    """
+    # Retries dropped here don't even open a transaction.
+    batch = drop_recent_events(batch)
+    if not batch:
+        return []
+
+    try:
+        return _store_events(batch)
+    except IntegrityError as error:
+        if not isinstance(error.__cause__, errors.ForeignKeyViolation):
+            raise
+
+        # A cached session was deleted by another process, the deferred
+        # foreign key only fails on commit. Create the sessions again.
+        forget_sessions(
+            (application_id, payload["session_id"]) for application_id, payload in batch
+        )
+
+        return _store_events(batch)
+
+
+def _store_events(batch: list) -> list:
+    with transaction.atomic():
+        ensure_sessions(
+            (application_id, payload["session_id"]) for application_id, payload in batch
+        )
+        remember_events(batch)
+
+        return Event.objects.bulk_create(
+            [
+                Event(application_id=application_id, **payload)
+                for application_id, payload in batch
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def publish_events(application_id: int, events: list):
+    """
+    Publishes a batch of wire encoded events as a `handle_events` task,
+    compressed when it has at least EVENTS_BATCH_COMPRESSION_MIN_SIZE events.
+    """
+    compression = None
+    if len(events) >= settings.EVENTS_BATCH_COMPRESSION_MIN_SIZE:
+        compression = settings.EVENTS_BATCH_COMPRESSION
+
+    celery_app.send_task(
+        "handle_events",
+        (application_id, events),
+        compression=compression,
+        headers={"published_at": time.time()},
+    )
+
+
+def submit_event(application_id: int, event: list):
+    """
+    Hands an accepted wire encoded event to EVENTS_INGEST_BACKEND.
+    """
+    if settings.EVENTS_INGEST_BACKEND == "celery":
+        celery_app.send_task(
+            "handle_event",
+            (application_id, event),
+            headers={"published_at": time.time()},
+        )
+    else:
+        _submit_locally(application_id, [event])
+
+
+def submit_events(application_id: int, events: list):
+    """
+    Hands a batch of accepted wire encoded events to EVENTS_INGEST_BACKEND.
+    """
+    if settings.EVENTS_INGEST_BACKEND == "celery":
+        publish_events(application_id, events)
+    else:
+        _submit_locally(application_id, events)
+
+
+def _submit_locally(application_id, events):
+    if settings.EVENTS_INGEST_BACKEND == "spool":
+        from events.spool import get_spool
+
+        try:
+            get_spool().append(application_id, events)
+        except OSError:
+            logger.exception("Could not spool events")
+            raise SpoolUnavailable()
+    elif settings.EVENTS_INGEST_BACKEND == "direct":
+        from events.writer import get_writer
+
+        committed = get_writer().submit(application_id, events)
+        if settings.EVENTS_DIRECT_SYNC_ACK:
+            try:
+                committed.result(timeout=settings.EVENTS_DIRECT_ACK_TIMEOUT_MS / 1000)
+            except concurrent.futures.TimeoutError:
+                raise CommitTimeout()
+    else:
+        raise ImproperlyConfigured(
+            f"Unknown EVENTS_INGEST_BACKEND {settings.EVENTS_INGEST_BACKEND!r}"
+        )
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.archive import archive_events, archive_horizon
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves the events older than EVENTS_ARCHIVE_AFTER_DAYS to segment files in "
+        "EVENTS_ARCHIVE_DIR and deletes them from the database."
+    )
+
+    def handle(self, *args, **options):
+        horizon = archive_horizon()
+        if horizon is None:
+            self.stdout.write("Archival is disabled, set EVENTS_ARCHIVE_AFTER_DAYS")
+            return
+
+        result = archive_events()
+        if result.get("skipped"):
+            self.stdout.write("Another archival is running, skipped")
+            return
+
+        self.stdout.write(
+            f"Archived {result['events']:,} events before {horizon.isoformat()} "
+            f"in {result['segments']:,} segments to {settings.EVENTS_ARCHIVE_DIR}"
+        )
@@ -0,0 +1,38 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from events.serializers import EventSerializer
+from events.validators import EventValidator
+
+
+class Command(BaseCommand):
+    help = "Measures events validated per second by EventSerializer and EventValidator."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=20_000)
+
+    def handle(self, *args, **options):
+        session_id = str(uuid.uuid4())
+        events = [
+            {
+                "session_id": session_id,
+                "category": "page interaction",
+                "name": "pageview",
+                "data": {"host": "www.consumeraffairs.com", "path": f"/{index}"},
+                "timestamp": "2021-01-01T09:15:27.243860+00:00",
+            }
+            for index in range(options["events"])
+        ]
+
+        for name, validator_class in (
+            ("EventSerializer", EventSerializer),
+            ("EventValidator", EventValidator),
+        ):
+            started_at = time.perf_counter()
+            for event in events:
+                assert validator_class(data=event).is_valid()
+            elapsed = time.perf_counter() - started_at
+
+            self.stdout.write(f"{name}: {len(events) / elapsed:,.0f} events/sec")
@@ -0,0 +1,34 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from events.consumers import EventBatchConsumer
+
+
+class Command(BaseCommand):
+    help = "Consumes the events queue storing the events in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Maximum number of messages stored per transaction.",
+        )
+        parser.add_argument(
+            "--batch-timeout",
+            type=int,
+            help="Milliseconds to wait for a batch to fill up before storing it.",
+        )
+
+    def handle(self, *args, **options):
+        consumer = EventBatchConsumer(
+            batch_size=options["batch_size"], batch_timeout=options["batch_timeout"]
+        )
+        signal.signal(signal.SIGTERM, consumer.stop)
+        signal.signal(signal.SIGINT, consumer.stop)
+
+        self.stdout.write(
+            f"Consuming {consumer.queue.name} in batches of up to "
+            f"{consumer.batch_size} messages"
+        )
+        consumer.run()
@@ -0,0 +1,45 @@
+import json
+import signal
+
+from django.core.management.base import BaseCommand
+
+from events.spool import SpoolDrainer, spool_stats
+
+
+class Command(BaseCommand):
+    help = "Sends the events spooled by EVENTS_INGEST_BACKEND=spool on."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            choices=("broker", "database"),
+            help="Publish the events to the broker or store them in the database.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the segments ready now and exit.",
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Print the depth and age of the spool as JSON and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self.stdout.write(json.dumps(spool_stats()))
+            return
+
+        drainer = SpoolDrainer(target=options["target"])
+
+        if options["once"]:
+            drained = drainer.drain()
+            self.stdout.write(f"Drained {drained} events to the {drainer.target}")
+            return
+
+        signal.signal(signal.SIGTERM, drainer.stop)
+        signal.signal(signal.SIGINT, drainer.stop)
+
+        self.stdout.write(f"Draining {drainer.directory} to the {drainer.target}")
+        drainer.run()
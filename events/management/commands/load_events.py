@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.backfill import EventLoader, open_events_file
+from events.models import Application
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads an NDJSON file of events (optionally gzip compressed) into an "
+        "application with COPY, writing the rejected lines to a side file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON file, may be gzip compressed.")
+        parser.add_argument(
+            "--application",
+            required=True,
+            help="Name of the application the events belong to.",
+        )
+        parser.add_argument(
+            "--rejects",
+            help="File receiving the rejected lines, defaults to PATH.rejects.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Number of events loaded per COPY statement.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            application = Application.objects.get(name=options["application"])
+        except Application.DoesNotExist:
+            raise CommandError(f"Application {options['application']} does not exist")
+
+        rejects_path = options["rejects"] or f"{options['path']}.rejects"
+
+        with open_events_file(options["path"]) as lines, open(
+            rejects_path, "w"
+        ) as rejects:
+            loader = EventLoader(
+                application.id,
+                rejects,
+                chunk_size=options["chunk_size"],
+                on_progress=self.report_progress,
+            )
+            stats = loader.load(lines)
+
+        if stats["rejected"]:
+            self.stdout.write(f"Rejected lines written to {rejects_path}")
+
+    def report_progress(self, stats):
+        rate = stats["loaded"] / stats["elapsed"] if stats["elapsed"] else 0
+
+        self.stdout.write(
+            f"Read {stats['read']:,} lines, loaded {stats['loaded']:,} events, "
+            f"skipped {stats['duplicates']:,} duplicates, rejected {stats['rejected']:,} ({rate:,.0f} events/sec)"
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from events.partitions import maintain_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates upcoming events_event partitions and detaches or drops the ones "
+        "past the retention period."
+    )
+
+    def handle(self, *args, **options):
+        result = maintain_partitions()
+        purged = result.pop("purged")
+
+        for action, partitions in result.items():
+            for partition in partitions:
+                self.stdout.write(f"{action.capitalize()} {partition}")
+
+        if purged:
+            self.stdout.write(
+                f"Purged {purged} expired events of the default partition"
+            )
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from events.profiling import rank_functions
+
+
+class Command(BaseCommand):
+    help = "Ranks the hottest functions across the collected request profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--directory", help="Profiles directory, EVENTS_PROFILE_DIR by default."
+        )
+        parser.add_argument(
+            "--sort",
+            choices=("tottime", "cumulative"),
+            default="tottime",
+            help="Rank by time spent in the function itself or including callees.",
+        )
+        parser.add_argument("--limit", type=int, default=30)
+        parser.add_argument("--json", action="store_true", help="Print JSON.")
+
+    def handle(self, *args, **options):
+        report = rank_functions(options["directory"], options["sort"], options["limit"])
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"{report['profiles']} profiles, by {options['sort']}")
+        self.stdout.write(f"{'tottime':>10} {'cumtime':>10} {'calls':>10}  function")
+        for row in report["functions"]:
+            self.stdout.write(
+                f"{row['tottime']:>10.4f} {row['cumtime']:>10.4f} {row['calls']:>10}  "
+                f"{row['function']}"
+            )
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = "Prints a header that makes requests get profiled."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{settings.EVENTS_PROFILE_HEADER}: {make_token()}")
@@ -0,0 +1,175 @@
+"""
+Prometheus metrics of the ingestion and query paths, served by `GET /metrics`.
+
+When the PROMETHEUS_MULTIPROC_DIR environment variable points to an empty
+directory before the processes start, every web and Celery worker process
+writes its samples to memory mapped files in it and `/metrics` adds them up,
+so it reports the whole host instead of the process that got the scrape.
+`deployment/gunicorn.conf.py` empties it when gunicorn starts.
+
+The database pool numbers are the exception: pools live in the memory of each
+process, so they're those of the process serving the scrape, labelled with
+its `pid`.
+"""
+import os
+import time
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from events.spool import spool_stats
+from the_eye.db.pooled.pool import pool_stats
+
+
+REQUEST_DURATION = Histogram(
+    "theeye_request_duration_seconds",
+    "Time spent handling requests.",
+    ["method", "view", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "theeye_request_db_queries",
+    "Database queries run per request.",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_DURATION = Histogram(
+    "theeye_request_db_seconds",
+    "Time spent in database queries per request.",
+    ["view"],
+)
+EVENTS_ACCEPTED = Counter(
+    "theeye_events_accepted",
+    "Events accepted by the POST endpoints.",
+    ["view"],
+)
+VALIDATION_FAILURES = Counter(
+    "theeye_validation_failures",
+    "POST requests rejected because of invalid events.",
+    ["view"],
+)
+DUPLICATE_EVENTS = Counter(
+    "theeye_duplicate_events",
+    "Events dropped because the worker committed them lately.",
+)
+TASK_DURATION = Histogram(
+    "theeye_task_duration_seconds",
+    "Time spent running Celery tasks.",
+    ["task"],
+)
+COMMIT_LAG = Histogram(
+    "theeye_commit_lag_seconds",
+    "Time from publishing events to the broker to committing them.",
+    ["path"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900),
+)
+ROWS_RETURNED = Histogram(
+    "theeye_rows_returned",
+    "Events returned per GET /events/ response.",
+    ["format"],
+    buckets=(0, 1, 10, 100, 1000, 10_000, 100_000, 1_000_000),
+)
+SERIALIZATION_DURATION = Histogram(
+    "theeye_serialization_seconds",
+    "Time spent serializing events per GET /events/ response.",
+    ["format"],
+)
+
+
+class SpoolCollector:
+    """
+    Reports the depth and age of the local spool. It's read from the spool
+    directory at scrape time, so it's the same whichever process is scraped.
+    """
+
+    def collect(self):
+        stats = spool_stats()
+
+        yield GaugeMetricFamily(
+            "theeye_spool_segments",
+            "Spool segments not drained yet.",
+            stats["segments"],
+        )
+        yield GaugeMetricFamily(
+            "theeye_spool_bytes", "Bytes of spool not drained yet.", stats["bytes"]
+        )
+        yield GaugeMetricFamily(
+            "theeye_spool_oldest_age_seconds",
+            "Age of the oldest spool segment not drained yet.",
+            stats["oldest_age_seconds"],
+        )
+
+
+class PoolCollector:
+    """
+    Reports the database connection pools of the current process by database
+    alias, see `the_eye.db.pooled.pool.pool_stats`.
+    """
+
+    GAUGES = (
+        ("size", "Connections opened by the pool."),
+        ("idle", "Connections waiting in the pool."),
+        ("in_use", "Connections checked out of the pool."),
+        ("overflow", "Connections opened over MAX_SIZE."),
+        ("max_wait_seconds", "Longest wait for a connection."),
+    )
+    COUNTERS = (
+        ("checkouts", "Connections checked out."),
+        ("waits", "Checkouts that waited for a connection."),
+        ("wait_seconds", "Time spent waiting for connections."),
+        ("timeouts", "Checkouts that gave up waiting."),
+        ("discarded", "Connections closed instead of reused."),
+    )
+
+    def collect(self):
+        stats = pool_stats()
+        pid = str(os.getpid())
+
+        for name, documentation in self.GAUGES:
+            gauge = GaugeMetricFamily(
+                f"theeye_db_pool_{name}", documentation, labels=["database", "pid"]
+            )
+            for alias, values in stats.items():
+                gauge.add_metric([alias, pid], values[name])
+            yield gauge
+
+        for name, documentation in self.COUNTERS:
+            counter = CounterMetricFamily(
+                f"theeye_db_pool_{name}", documentation, labels=["database", "pid"]
+            )
+            for alias, values in stats.items():
+                counter.add_metric([alias, pid], values[name])
+            yield counter
+
+
+spool_collector = SpoolCollector()
+REGISTRY.register(spool_collector)
+pool_collector = PoolCollector()
+REGISTRY.register(pool_collector)
+
+
+def observe_commit_lag(path: str, published_at):
+    """
+    Records the lag of events published at `published_at` (the `published_at`
+    message header) that were just committed.
+    """
+    if published_at is not None:
+        COMMIT_LAG.labels(path).observe(max(time.time() - published_at, 0))
+
+
+def render_metrics() -> bytes:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(spool_collector)
+    registry.register(pool_collector)
+
+    return generate_latest(registry)
@@ -0,0 +1,177 @@
+import cProfile
+import io
+import random
+import time
+import zlib
+
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse
+
+from events.metrics import REQUEST_DB_DURATION, REQUEST_DURATION, REQUEST_QUERIES
+from events.profiling import is_valid_token, write_profile
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the queries run and the time they took.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Records the duration, database queries and database time of every request
+    by view name. Queries run while a streaming response is being consumed
+    happen after the middleware returns and aren't counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        started = time.perf_counter()
+
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else "unknown"
+
+        REQUEST_DURATION.labels(request.method, view, response.status_code).observe(
+            duration
+        )
+        REQUEST_QUERIES.labels(view).observe(queries.count)
+        REQUEST_DB_DURATION.labels(view).observe(queries.duration)
+
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a EVENTS_PROFILE_SAMPLE_RATE fraction of the requests, and every
+    request with a valid `events.profiling.make_token()` in the
+    EVENTS_PROFILE_HEADER header, with cProfile and a query counter. See
+    `events.profiling` for where the results go.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = "HTTP_" + settings.EVENTS_PROFILE_HEADER.upper().replace("-", "_")
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        queries = QueryCounter()
+        started = time.perf_counter()
+
+        with connection.execute_wrapper(queries):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+
+        match = request.resolver_match
+        write_profile(
+            profiler,
+            {
+                "method": request.method,
+                "path": request.path,
+                "view": match.url_name if match else None,
+                "status": response.status_code,
+                "duration": round(time.perf_counter() - started, 6),
+                "queries": queries.count,
+                "db_duration": round(queries.duration, 6),
+            },
+        )
+
+        return response
+
+    def should_profile(self, request) -> bool:
+        if token := request.META.get(self.header):
+            return is_valid_token(token)
+
+        return random.random() < settings.EVENTS_PROFILE_SAMPLE_RATE
+
+
+class RequestDecompressionMiddleware:
+    """
+    Decompresses request bodies sent with `Content-Encoding: gzip` or
+    `deflate`, so parsers get plain bodies. Decompression stops as soon as the
+    body grows past EVENTS_REQUEST_MAX_DECOMPRESSED_SIZE bytes, so a small
+    request can't make the process inflate a huge one.
+    """
+
+    # zlib window bits of each encoding, 16 + 15 expects a gzip header.
+    ENCODINGS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+    READ_SIZE = 64 * 1024
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        encoding = request.META.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+
+        if encoding and encoding != "identity":
+            if encoding not in self.ENCODINGS:
+                return JsonResponse(
+                    {"detail": f'Unsupported content encoding "{encoding}".'},
+                    status=415,
+                )
+
+            try:
+                body = self.decompress(request, self.ENCODINGS[encoding])
+            except zlib.error:
+                return JsonResponse(
+                    {"detail": f"Malformed {encoding} request body."}, status=400
+                )
+            except ValueError:
+                return JsonResponse(
+                    {"detail": "Decompressed request body too large."}, status=413
+                )
+
+            request._body = body
+            request._stream = io.BytesIO(body)
+            request.META["CONTENT_LENGTH"] = str(len(body))
+            del request.META["HTTP_CONTENT_ENCODING"]
+
+        return self.get_response(request)
+
+    def decompress(self, request, wbits) -> bytes:
+        limit = settings.EVENTS_REQUEST_MAX_DECOMPRESSED_SIZE
+        decompressor = zlib.decompressobj(wbits)
+        body = bytearray()
+
+        while chunk := request.read(self.READ_SIZE):
+            while chunk:
+                body += decompressor.decompress(chunk, limit + 1 - len(body))
+                if len(body) > limit:
+                    raise ValueError("Decompressed request body too large")
+                chunk = decompressor.unconsumed_tail
+
+            if decompressor.eof:
+                break
+
+        body += decompressor.flush()
+        if len(body) > limit:
+            raise ValueError("Decompressed request body too large")
+        if not decompressor.eof:
+            raise zlib.error("Truncated request body")
+
+        return bytes(body)
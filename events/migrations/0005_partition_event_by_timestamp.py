@@ -0,0 +1,67 @@
+from django.db import migrations
+
+
+# Postgres requires the partition key in every unique constraint, so the primary
+# key of the partitioned table becomes (id, timestamp). `id` keeps being unique
+# since it still comes from a single sequence.
+PARTITION_EVENT_TABLE = [
+    "ALTER TABLE events_event RENAME TO events_event_unpartitioned",
+    """
+    CREATE TABLE events_event (
+        LIKE events_event_unpartitioned INCLUDING CONSTRAINTS
+    ) PARTITION BY RANGE ("timestamp")
+    """,
+    "CREATE TABLE events_event_default PARTITION OF events_event DEFAULT",
+    "INSERT INTO events_event SELECT * FROM events_event_unpartitioned",
+    "DROP TABLE events_event_unpartitioned",
+    "CREATE SEQUENCE events_event_id_seq OWNED BY events_event.id",
+    """
+    SELECT setval(
+        'events_event_id_seq', COALESCE((SELECT MAX(id) FROM events_event), 0) + 1, false
+    )
+    """,
+    "ALTER TABLE events_event ALTER COLUMN id SET DEFAULT nextval('events_event_id_seq')",
+    'ALTER TABLE events_event ADD PRIMARY KEY (id, "timestamp")',
+    "CREATE INDEX events_event_session_id_ad480ad4 ON events_event (session_id)",
+    'CREATE INDEX session_timestamp_index ON events_event (session_id, "timestamp")',
+    'CREATE INDEX timestamp_index ON events_event ("timestamp")',
+    """
+    ALTER TABLE events_event
+    ADD CONSTRAINT events_event_session_id_ad480ad4_fk_events_session_id
+    FOREIGN KEY (session_id) REFERENCES events_session (id) DEFERRABLE INITIALLY DEFERRED
+    """,
+]
+
+UNPARTITION_EVENT_TABLE = [
+    "ALTER TABLE events_event RENAME TO events_event_partitioned",
+    "CREATE TABLE events_event (LIKE events_event_partitioned INCLUDING CONSTRAINTS)",
+    "INSERT INTO events_event SELECT * FROM events_event_partitioned",
+    "DROP TABLE events_event_partitioned",
+    "CREATE SEQUENCE events_event_id_seq OWNED BY events_event.id",
+    """
+    SELECT setval(
+        'events_event_id_seq', COALESCE((SELECT MAX(id) FROM events_event), 0) + 1, false
+    )
+    """,
+    "ALTER TABLE events_event ALTER COLUMN id SET DEFAULT nextval('events_event_id_seq')",
+    "ALTER TABLE events_event ADD PRIMARY KEY (id)",
+    "CREATE INDEX events_event_session_id_ad480ad4 ON events_event (session_id)",
+    'CREATE INDEX session_timestamp_index ON events_event (session_id, "timestamp")',
+    'CREATE INDEX timestamp_index ON events_event ("timestamp")',
+    """
+    ALTER TABLE events_event
+    ADD CONSTRAINT events_event_session_id_ad480ad4_fk_events_session_id
+    FOREIGN KEY (session_id) REFERENCES events_session (id) DEFERRABLE INITIALLY DEFERRED
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0004_remove_event_event_timestamp_cannot_be_future_dated_and_more"),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION_EVENT_TABLE, reverse_sql=UNPARTITION_EVENT_TABLE),
+    ]
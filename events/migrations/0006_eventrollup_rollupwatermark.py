@@ -0,0 +1,66 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0005_partition_event_by_timestamp"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("event_id", models.BigIntegerField(default=0)),
+                ("pending_event_id", models.BigIntegerField(null=True)),
+                ("pending_xmax", models.BigIntegerField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="EventRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("category", models.CharField(max_length=100)),
+                ("name", models.CharField(max_length=100)),
+                ("minute", models.DateTimeField()),
+                ("count", models.BigIntegerField(default=0)),
+                (
+                    "application",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="events.application",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Event rollup",
+                "verbose_name_plural": "Event rollups",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="eventrollup",
+            index=models.Index(
+                fields=["application", "minute"], name="rollup_application_minute"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="eventrollup",
+            constraint=models.UniqueConstraint(
+                fields=("application", "category", "name", "minute"),
+                name="unique_event_rollup",
+            ),
+        ),
+    ]
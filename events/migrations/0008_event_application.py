@@ -0,0 +1,22 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0007_event_data_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="application",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="events.application",
+            ),
+        ),
+    ]
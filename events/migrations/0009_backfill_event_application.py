@@ -0,0 +1,55 @@
+from django.db import migrations, models
+
+
+CHUNK_SIZE = 50_000
+
+
+def backfill_event_application(apps, schema_editor):
+    """
+    Copies the application of the session into every event, one committed
+    chunk of ids at a time so the table is never locked for long.
+    """
+    connection = schema_editor.connection
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT MIN(id), MAX(id) FROM events_event")
+        first_id, last_id = cursor.fetchone()
+
+        if first_id is None:
+            return
+
+        for start in range(first_id, last_id + 1, CHUNK_SIZE):
+            cursor.execute(
+                """
+                UPDATE events_event
+                SET application_id = events_session.application_id
+                FROM events_session
+                WHERE events_session.id = events_event.session_id
+                AND events_event.id >= %s AND events_event.id < %s
+                AND events_event.application_id IS NULL
+                """,
+                [start, start + CHUNK_SIZE],
+            )
+
+
+class Migration(migrations.Migration):
+
+    # Every chunk is committed on its own.
+    atomic = False
+
+    dependencies = [
+        ("events", "0008_event_application"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_event_application, reverse_code=migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["application", "timestamp"],
+                name="application_timestamp_index",
+            ),
+        ),
+    ]
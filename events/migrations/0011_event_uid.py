@@ -0,0 +1,81 @@
+from django.db import migrations, models
+
+
+INDEX_NAME = "unique_session_event_uid"
+INDEX_COLUMNS = '(session_id, uid, "timestamp")'
+
+
+def list_partitions(cursor):
+    cursor.execute(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'events_event'::regclass
+        """
+    )
+
+    return [name for (name,) in cursor.fetchall()]
+
+
+def create_uid_index(apps, schema_editor):
+    """
+    Builds the unique index of every partition concurrently, so events keep
+    being stored meanwhile, then creates the index of the partitioned table
+    alone and attaches the partition indexes to it. Partitions created later
+    get theirs when they're attached.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        partitions = list_partitions(cursor)
+
+        for partition in partitions:
+            cursor.execute(
+                f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {partition}_uid "
+                f"ON {partition} {INDEX_COLUMNS}"
+            )
+
+        cursor.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {INDEX_NAME} "
+            f"ON ONLY events_event {INDEX_COLUMNS}"
+        )
+        for partition in partitions:
+            cursor.execute(f"ALTER INDEX {INDEX_NAME} ATTACH PARTITION {partition}_uid")
+
+
+def drop_uid_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("events", "0010_event_application_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="uid",
+            field=models.CharField(max_length=64, null=True),
+        ),
+        # Postgres can't add a constraint to a partitioned table from an index,
+        # the unique index stands for the constraint of the model.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name="event",
+                    constraint=models.UniqueConstraint(
+                        fields=("session", "uid", "timestamp"),
+                        name=INDEX_NAME,
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_uid_index, reverse_code=drop_uid_index),
+            ],
+        ),
+    ]
@@ -1,2 +1,3 @@
 from .auth import Application
 from .events import Event, Session
+from .rollups import EventRollup, RollupWatermark
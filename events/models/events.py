@@ -1,5 +1,6 @@
 import uuid
 
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.utils import timezone
 
@@ -21,10 +22,19 @@ class Session(models.Model):
 
 class Event(models.Model):
     session = models.ForeignKey(to=Session, on_delete=models.CASCADE)
+    # Copy of `session.application`, so per application queries don't need a join.
+    application = models.ForeignKey(
+        to="events.Application",
+        on_delete=models.CASCADE,
+        null=True,
+        db_index=False,
+    )
     category = models.CharField(max_length=100)
     name = models.CharField(max_length=100)
     data = models.JSONField(default=dict)
     timestamp = models.DateTimeField()
+    # Client supplied `event_id` or hash of the event, see `events.dedup`.
+    uid = models.CharField(max_length=64, null=True)
 
     class Meta:
         verbose_name = "Event"
@@ -33,13 +43,25 @@ class Event(models.Model):
             models.CheckConstraint(
                 check=models.Q(timestamp__lte=timezone.localtime()),
                 name="event_timestamp_cannot_be_future_dated",
-            )
+            ),
+            # Partitioned tables need the partition key in unique constraints.
+            models.UniqueConstraint(
+                fields=["session", "uid", "timestamp"], name="unique_session_event_uid"
+            ),
         ]
         indexes = [
             models.Index(fields=["timestamp"], name="timestamp_index"),
             models.Index(
                 fields=["session", "timestamp"], name="session_timestamp_index"
             ),
+            models.Index(
+                fields=["application", "timestamp"],
+                name="application_timestamp_index",
+            ),
+            models.Index(fields=["application", "id"], name="application_id_index"),
+            GinIndex(
+                fields=["data"], name="event_data_index", opclasses=["jsonb_path_ops"]
+            ),
         ]
         ordering = (
             "session",
@@ -0,0 +1,54 @@
+from django.db import models
+
+
+class EventRollup(models.Model):
+    """
+    Number of events of an application per category, name and minute.
+    """
+
+    application = models.ForeignKey(
+        to="events.Application",
+        on_delete=models.CASCADE,
+    )
+    category = models.CharField(max_length=100)
+    name = models.CharField(max_length=100)
+    minute = models.DateTimeField()
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Event rollup"
+        verbose_name_plural = "Event rollups"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["application", "category", "name", "minute"],
+                name="unique_event_rollup",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["application", "minute"], name="rollup_application_minute"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.category} - {self.name} at {self.minute}: {self.count}"
+
+
+class RollupWatermark(models.Model):
+    """
+    Progress of `events.rollups.update_rollups` over `Event.id`.
+
+    Events up to `event_id` are counted in `EventRollup`. Events up to
+    `pending_event_id` are counted on the next run that starts after every
+    transaction older than `pending_xmax`, and every one of the
+    `pending_transactions` (`[pid, xact_start]` pairs), finished.
+    """
+
+    name = models.CharField(max_length=100, primary_key=True)
+    event_id = models.BigIntegerField(default=0)
+    pending_event_id = models.BigIntegerField(null=True)
+    pending_xmax = models.BigIntegerField(null=True)
+    pending_transactions = models.JSONField(default=list)
+
+    def __str__(self) -> str:
+        return f"{self.name} at event {self.event_id}"
@@ -0,0 +1,126 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from itertools import islice
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from events.archive import merge_events
+
+
+class EventCursorPagination(BasePagination):
+    """
+    Keyset pagination over `(timestamp, id)`.
+
+    The cursor holds the position of the last event of the current page, so
+    every page is a range scan on the timestamp indexes starting at that
+    position and deep pages cost the same as the first one.
+
+    `archived` is called with the position to get the archived events after
+    it, which are merged into the page (see `events.archive`).
+    """
+
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None, archived=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by("timestamp", "id")
+        if position is not None:
+            timestamp, pk = position
+            queryset = queryset.filter(timestamp__gte=timestamp).exclude(
+                timestamp=timestamp, id__lte=pk
+            )
+
+        results = list(queryset[: self.limit + 1])
+        if archived is not None:
+            rows = archived(position=position)
+            results = list(
+                islice(
+                    merge_events(results, (queryset.model(**row) for row in rows)),
+                    self.limit + 1,
+                )
+            )
+        self.has_next = len(results) > self.limit
+        results = results[: self.limit]
+
+        if self.has_next:
+            self.next_position = (results[-1].timestamp, results[-1].id)
+
+        return results
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return settings.EVENTS_PAGE_SIZE
+
+        if limit < 1:
+            return settings.EVENTS_PAGE_SIZE
+
+        return min(limit, settings.EVENTS_MAX_PAGE_SIZE)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            timestamp, pk = (
+                urlsafe_b64decode(encoded.encode("ascii")).decode("ascii").split("|")
+            )
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return timestamp, pk
+
+    def encode_cursor(self, position):
+        timestamp, pk = position
+        encoded = urlsafe_b64encode(f"{timestamp.isoformat()}|{pk}".encode("ascii"))
+
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            encoded.decode("ascii"),
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {
+                    "type": "string",
+                    "nullable": True,
+                },
+                "results": schema,
+            },
+        }
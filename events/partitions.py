@@ -0,0 +1,176 @@
+"""
+Lifecycle of the `events_event` range partitions.
+
+`events_event` is partitioned by `timestamp` (see migration 0005). Partitions
+cover one day or one month in UTC depending on EVENTS_PARTITION_INTERVAL and
+are named after the start of their range, e.g. `events_event_p202203` or
+`events_event_p20220301`. Rows outside every partition land in
+`events_event_default`, its expired rows are purged along with the expired
+partitions: deleted, or moved to `events_event_expired` when partitions are
+only detached.
+"""
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+PARENT_TABLE = "events_event"
+DEFAULT_PARTITION = "events_event_default"
+EXPIRED_TABLE = "events_event_expired"
+PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_p(\d{{6}}|\d{{8}})$")
+
+
+def partition_range(moment: datetime, interval: str) -> tuple:
+    """
+    Returns the `(start, end)` of the partition containing `moment`.
+    """
+    moment = moment.astimezone(dt_timezone.utc)
+
+    if interval == "day":
+        start = datetime(moment.year, moment.month, moment.day, tzinfo=dt_timezone.utc)
+        return start, start + timedelta(days=1)
+
+    if interval == "month":
+        start = datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+        return start, (start + timedelta(days=32)).replace(day=1)
+
+    raise ValueError(f"Unknown partition interval {interval!r}")
+
+
+def partition_name(start: datetime, interval: str) -> str:
+    suffix = start.strftime("%Y%m%d" if interval == "day" else "%Y%m")
+
+    return f"{PARENT_TABLE}_p{suffix}"
+
+
+def list_partitions() -> dict:
+    """
+    Returns the `(start, end)` range of every attached partition by name.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            """,
+            [PARENT_TABLE],
+        )
+        names = [name for (name,) in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        if match := PARTITION_NAME.match(name):
+            suffix = match.group(1)
+            interval = "day" if len(suffix) == 8 else "month"
+            start = datetime.strptime(suffix, "%Y%m%d" if interval == "day" else "%Y%m")
+            partitions[name] = partition_range(
+                start.replace(tzinfo=dt_timezone.utc), interval
+            )
+
+    return partitions
+
+
+def create_partition(start: datetime, end: datetime, name: str):
+    """
+    Creates and attaches the partition for `[start, end)`, moving into it the
+    rows of that range that were stored in the default partition.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {name} "
+            f"(LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE "timestamp" >= %s AND "timestamp" < %s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            [start, end],
+        )
+        cursor.execute(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+
+
+def detach_partition(name: str, drop: bool):
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+        if drop:
+            cursor.execute(f"DROP TABLE {name}")
+
+
+def purge_default_partition(before: datetime, drop: bool) -> int:
+    """
+    Removes the rows before `before` from the default partition and returns
+    their number. They're deleted with `drop`, moved to EXPIRED_TABLE otherwise.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        if drop:
+            cursor.execute(
+                f'DELETE FROM {DEFAULT_PARTITION} WHERE "timestamp" < %s', [before]
+            )
+        else:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {EXPIRED_TABLE} "
+                f"(LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            )
+            cursor.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION}
+                    WHERE "timestamp" < %s
+                    RETURNING *
+                )
+                INSERT INTO {EXPIRED_TABLE} SELECT * FROM moved
+                """,
+                [before],
+            )
+
+        return cursor.rowcount
+
+
+def maintain_partitions(now: datetime = None) -> dict:
+    """
+    Creates the current partition plus EVENTS_PARTITION_PREMAKE future ones and
+    detaches the partitions entirely older than EVENTS_RETENTION_DAYS, dropping
+    them when EVENTS_PARTITION_DROP_EXPIRED is set. The rows of the default
+    partition those partitions would have held are purged too.
+    """
+    now = now or timezone.now()
+    interval = settings.EVENTS_PARTITION_INTERVAL
+    partitions = list_partitions()
+    result = {"created": [], "detached": [], "dropped": [], "purged": 0}
+
+    start, end = partition_range(now, interval)
+    for _ in range(settings.EVENTS_PARTITION_PREMAKE + 1):
+        name = partition_name(start, interval)
+        if name not in partitions:
+            create_partition(start, end, name)
+            result["created"].append(name)
+
+        start, end = partition_range(end, interval)
+
+    if settings.EVENTS_RETENTION_DAYS:
+        cutoff = now - timedelta(days=settings.EVENTS_RETENTION_DAYS)
+        drop = settings.EVENTS_PARTITION_DROP_EXPIRED
+
+        for name, (_, end) in sorted(partitions.items()):
+            if end <= cutoff:
+                detach_partition(name, drop=drop)
+                result["dropped" if drop else "detached"].append(name)
+
+        expired, _ = partition_range(cutoff, interval)
+        result["purged"] = purge_default_partition(expired, drop=drop)
+
+    return result
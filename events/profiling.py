@@ -0,0 +1,111 @@
+"""
+Sampled request profiles written by `events.middleware.ProfilingMiddleware`.
+
+Every profiled request leaves a `<time_ms>-<pid>-<n>.pstats` file with its
+cProfile stats and a `.json` summary next to it in EVENTS_PROFILE_DIR. Only
+the newest EVENTS_PROFILE_KEEP profiles are kept. `rank_functions` adds up
+all of them to find the hottest functions (`manage.py profile_report`).
+"""
+import glob
+import itertools
+import json
+import os
+import pstats
+import time
+
+from django.conf import settings
+from django.core import signing
+
+
+TOKEN_SALT = "events.profiling"
+
+_counter = itertools.count(1)
+
+
+def make_token() -> str:
+    """
+    Returns a value for the EVENTS_PROFILE_HEADER header that makes requests
+    get profiled for EVENTS_PROFILE_TOKEN_MAX_AGE seconds.
+    """
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign("profile")
+
+
+def is_valid_token(token: str) -> bool:
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=settings.EVENTS_PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+
+    return True
+
+
+def write_profile(profiler, summary: dict, directory=None) -> str:
+    """
+    Writes the stats of `profiler` and `summary`, completed with the top
+    functions by cumulative time, and removes the oldest profiles past
+    EVENTS_PROFILE_KEEP. Returns the path of the stats file.
+    """
+    directory = directory or settings.EVENTS_PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    name = f"{time.time_ns() // 1_000_000:013d}-{os.getpid()}-{next(_counter):06d}"
+    path = os.path.join(directory, name)
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(path + ".pstats")
+
+    summary["functions"] = top_functions(stats, "cumulative", 20)
+    with open(path + ".json", "w") as summary_file:
+        json.dump(summary, summary_file, indent=2)
+
+    _rotate(directory, settings.EVENTS_PROFILE_KEEP)
+
+    return path + ".pstats"
+
+
+def top_functions(stats: pstats.Stats, sort: str, limit: int) -> list:
+    """
+    Returns the `limit` functions of `stats` with the highest `sort`
+    ("cumulative" or "tottime") time.
+    """
+    field = {"cumulative": "cumtime", "tottime": "tottime"}[sort]
+    rows = [
+        {
+            "function": pstats.func_std_string(function),
+            "calls": calls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        }
+        for function, (_, calls, tottime, cumtime, _) in stats.stats.items()
+    ]
+    rows.sort(key=lambda row: row[field], reverse=True)
+
+    return rows[:limit]
+
+
+def rank_functions(directory=None, sort="tottime", limit=30) -> dict:
+    """
+    Adds up every profile in `directory` and returns the number of profiles
+    and their hottest functions.
+    """
+    directory = directory or settings.EVENTS_PROFILE_DIR
+    paths = sorted(glob.glob(os.path.join(directory, "*.pstats")))
+
+    if not paths:
+        return {"profiles": 0, "functions": []}
+
+    stats = pstats.Stats(*paths)
+
+    return {"profiles": len(paths), "functions": top_functions(stats, sort, limit)}
+
+
+def _rotate(directory, keep):
+    paths = sorted(glob.glob(os.path.join(directory, "*.pstats")))
+
+    for path in paths[: max(len(paths) - keep, 0)]:
+        for extension in (".pstats", ".json"):
+            try:
+                os.remove(path[: -len(".pstats")] + extension)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,118 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from events.archive import merge_events
+from events.codec import dumps
+from events.metrics import ROWS_RETURNED, SERIALIZATION_DURATION
+
+
+EVENT_FIELDS = ("session_id", "category", "name", "data", "timestamp")
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` rendering compact output through `events.codec`. Indented
+    output, e.g. for the browsable API, still goes through `JSONRenderer`.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        content = dumps(data)
+
+        # Like JSONRenderer, escape the separators JavaScript doesn't allow in strings.
+        if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+
+        return content
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders a list as newline delimited JSON, one item per line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        if not isinstance(data, list):
+            data = [data]
+
+        return b"".join(dumps(item) + b"\n" for item in data)
+
+
+def stream_events(queryset, chunk_size, archived=None):
+    """
+    Yields the events of `queryset` as NDJSON, `chunk_size` lines at a time,
+    merged with the `archived` events, if any.
+
+    Rows are read through a server side cursor and rendered straight from
+    `values()`, so memory use doesn't depend on the number of rows.
+    """
+    timestamp_field = serializers.DateTimeField()
+    lines = []
+    rows = 0
+    serializing = 0.0
+
+    events = queryset.values("id", *EVENT_FIELDS).iterator(chunk_size=chunk_size)
+    if archived is not None:
+        events = merge_events(
+            events,
+            (
+                {field: row[field] for field in ("id", *EVENT_FIELDS)}
+                for row in archived
+            ),
+        )
+
+    for event in events:
+        started = time.perf_counter()
+        del event["id"]
+        event["timestamp"] = timestamp_field.to_representation(event["timestamp"])
+        lines.append(dumps(event))
+        serializing += time.perf_counter() - started
+        rows += 1
+
+        if len(lines) == chunk_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+    SERIALIZATION_DURATION.labels(NDJSONRenderer.format).observe(serializing)
+    ROWS_RETURNED.labels(NDJSONRenderer.format).observe(rows)
+
+
+def ndjson_streaming_response(request, queryset, chunk_size, archived=None):
+    content = stream_events(queryset, chunk_size, archived)
+
+    # The ASGI handler iterates responses in the event loop, where the ORM can't
+    # run. Hand it an asynchronous iterator that pulls each chunk in the request
+    # thread. Only ASGI requests have a `scope`, which DRF's `Request` proxies.
+    if getattr(request, "scope", None) is not None:
+        content = _iterate_in_thread(content)
+
+    return StreamingHttpResponse(content, content_type=NDJSONRenderer.media_type)
+
+
+async def _iterate_in_thread(iterator):
+    get_next = sync_to_async(next, thread_sensitive=True)
+    sentinel = object()
+
+    while (chunk := await get_next(iterator, sentinel)) is not sentinel:
+        yield chunk
@@ -0,0 +1,102 @@
+"""
+Incremental maintenance of `EventRollup`, the per minute event counts.
+
+`update_rollups` runs from Celery beat and only reads the events stored since
+its previous run, tracked by `RollupWatermark`. Ids come from a sequence but
+transactions commit in any order, so a run can't just count every visible
+event above the watermark: a slower transaction may still commit a smaller
+id. Instead every run records the last id handed out, then the transaction
+horizon (`txid_snapshot_xmax`) and the transactions still running, and the
+events up to that id are only counted by a later run once all of those have
+finished. Rollups therefore lag up to two runs behind.
+
+The horizon alone isn't enough: an `INSERT` takes its ids from the sequence
+before its transaction gets an xid. Such a transaction already has a
+snapshot though, so it shows up in `pg_stat_activity` with a `backend_xmin`.
+"""
+from django.db import connection, transaction
+
+from events.models import RollupWatermark
+
+
+WATERMARK = "events"
+
+FOLD_EVENTS = """
+    INSERT INTO events_eventrollup (application_id, category, name, minute, count)
+    SELECT
+        events_event.application_id,
+        events_event.category,
+        events_event.name,
+        date_trunc('minute', events_event."timestamp"),
+        COUNT(*)
+    FROM events_event
+    WHERE events_event.id > %s AND events_event.id <= %s
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (application_id, category, name, minute)
+    DO UPDATE SET count = events_eventrollup.count + EXCLUDED.count
+"""
+
+# Other sessions of the database that may still commit events, those with an xid
+# or a running statement, identified by `[pid, xact_start]`.
+RUNNING_TRANSACTIONS = """
+    SELECT pid, xact_start::text
+    FROM pg_stat_activity
+    WHERE datname = current_database()
+        AND backend_type = 'client backend'
+        AND pid <> pg_backend_pid()
+        AND (backend_xid IS NOT NULL OR backend_xmin IS NOT NULL)
+"""
+
+
+def update_rollups(chunk_size: int = 100_000) -> dict:
+    """
+    Counts the events that became final since the previous run into
+    `EventRollup`, `chunk_size` ids per statement.
+
+    Returns the `(from, to]` range of event ids that was counted.
+    """
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(
+            name=WATERMARK
+        )
+
+        with connection.cursor() as cursor:
+            # Until `is_called`, `last_value` is the next id, not the last one.
+            cursor.execute(
+                """
+                SELECT
+                    txid_snapshot_xmin(txid_current_snapshot()),
+                    txid_snapshot_xmax(txid_current_snapshot()),
+                    CASE WHEN is_called THEN last_value ELSE last_value - 1 END
+                FROM events_event_id_seq
+                """
+            )
+            xmin, xmax, last_event_id = cursor.fetchone()
+
+            # Read after the last id, a transaction holding an id up to it is
+            # either finished or listed.
+            cursor.execute(RUNNING_TRANSACTIONS)
+            running = [list(backend) for backend in cursor.fetchall()]
+
+            start, pending = watermark.event_id, watermark.pending_event_id
+            if (
+                pending is not None
+                and xmin >= watermark.pending_xmax
+                and not any(
+                    backend in running for backend in watermark.pending_transactions
+                )
+            ):
+                for chunk_start in range(start, pending, chunk_size):
+                    chunk_end = min(chunk_start + chunk_size, pending)
+                    cursor.execute(FOLD_EVENTS, [chunk_start, chunk_end])
+
+                watermark.event_id, pending = pending, None
+
+            if pending is None:
+                watermark.pending_event_id = last_event_id
+                watermark.pending_xmax = xmax
+                watermark.pending_transactions = running
+
+        watermark.save()
+
+    return {"from": start, "to": watermark.event_id}
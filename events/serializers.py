@@ -1,16 +1,20 @@
 from django.utils import timezone
 from rest_framework import serializers
 
-from events.models import Event, Session
+from events.dedup import event_uid
+from events.models import Event
+from events.sessions import ensure_sessions
+from events.stats import BUCKETS, GROUP_BY_FIELDS
 
 
 class EventSerializer(serializers.ModelSerializer):
 
     session_id = serializers.UUIDField(required=True)
-    category = serializers.CharField(required=True)
-    name = serializers.CharField(required=True)
+    category = serializers.CharField(required=True, max_length=100)
+    name = serializers.CharField(required=True, max_length=100)
     data = serializers.JSONField(required=True)
     timestamp = serializers.DateTimeField(required=True)
+    event_id = serializers.CharField(required=False, max_length=64, write_only=True)
 
     class Meta:
         model = Event
@@ -20,6 +24,7 @@ class EventSerializer(serializers.ModelSerializer):
             "name",
             "data",
             "timestamp",
+            "event_id",
         )
 
     def validate_timestamp(self, timestamp):
@@ -31,14 +36,30 @@ class EventSerializer(serializers.ModelSerializer):
         return timestamp
 
     def create(self, validated_data):
-        session = Session.objects.filter(
-            id=validated_data["session_id"],
-        ).first()
-
-        if not session:
-            Session.objects.create(
-                id=validated_data['session_id'],
-                application_id=self.context.get("application_id")
+        application_id = self.context.get("application_id")
+        ensure_sessions([(application_id, validated_data["session_id"])])
+        validated_data["uid"] = event_uid(validated_data)
+        validated_data.pop("event_id", None)
+
+        return Event.objects.create(application_id=application_id, **validated_data)
+
+
+class EventStatsQuerySerializer(serializers.Serializer):
+
+    session_id = serializers.UUIDField(required=False)
+    category = serializers.CharField(required=False, max_length=100)
+    timestamp_before = serializers.DateTimeField(required=False)
+    timestamp_after = serializers.DateTimeField(required=False)
+    bucket = serializers.ChoiceField(choices=BUCKETS, default="hour")
+    group_by = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_group_by(self, group_by):
+        fields = [field.strip() for field in group_by.split(",") if field.strip()]
+
+        if unknown := set(fields) - set(GROUP_BY_FIELDS):
+            raise serializers.ValidationError(
+                f"Cannot group by {', '.join(sorted(unknown))}, "
+                f"use {' or '.join(GROUP_BY_FIELDS)}."
             )
 
-        return Event.objects.create(**validated_data)
+        return list(dict.fromkeys(fields))
@@ -0,0 +1,64 @@
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+
+from events.cache import LRUCache
+from events.models import Session
+
+
+# Sessions known to exist, shared by every thread of the worker process. Deletes
+# only evict them from the process that made them, others forget them after
+# EVENTS_SESSION_CACHE_TTL seconds.
+session_cache = LRUCache(
+    settings.EVENTS_SESSION_CACHE_SIZE, ttl=settings.EVENTS_SESSION_CACHE_TTL
+)
+
+
+def ensure_sessions(pairs):
+    """
+    Makes sure a `Session` exists for every `(application_id, session_id)` pair.
+
+    Pairs found in `session_cache` don't touch the database, the rest are
+    inserted with a single `INSERT ... ON CONFLICT DO NOTHING` so concurrent
+    workers can't race each other. Pairs are only cached once the surrounding
+    transaction commits, and only when the session belongs to their application.
+    """
+    missing = {}
+    for application_id, session_id in pairs:
+        key = (application_id, uuid.UUID(str(session_id)))
+        if key not in missing and session_cache.get(key) is None:
+            missing[key] = True
+
+    if not missing:
+        return
+
+    Session.objects.bulk_create(
+        [
+            Session(id=session_id, application_id=application_id)
+            for application_id, session_id in missing
+        ],
+        ignore_conflicts=True,
+    )
+
+    # Sessions that existed already may belong to another application.
+    owned = set(
+        Session.objects.filter(
+            id__in=[session_id for _, session_id in missing]
+        ).values_list("application_id", "id")
+    )
+
+    def cache_sessions():
+        for key in missing:
+            if key in owned:
+                session_cache.set(key, True)
+
+    transaction.on_commit(cache_sessions)
+
+
+def forget_sessions(pairs):
+    """
+    Drops the `(application_id, session_id)` pairs from `session_cache`.
+    """
+    for application_id, session_id in pairs:
+        session_cache.delete((application_id, uuid.UUID(str(session_id))))
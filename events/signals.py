@@ -1,10 +1,55 @@
+import time
+
+from celery.signals import task_postrun, task_prerun
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 
+from events.authentication import token_cache
+from events.metrics import TASK_DURATION
+from events.models import Session
+from events.sessions import session_cache
+
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_auth_token(sender, instance=None, created=False, **kwargs):
     if created:
         Token.objects.create(user=instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_application_tokens(sender, instance=None, created=False, **kwargs):
+    if created:
+        return
+
+    # The application may have been deactivated, make its tokens go through
+    # the database again.
+    for key in Token.objects.filter(user=instance).values_list("key", flat=True):
+        token_cache.delete(key)
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance=None, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(post_delete, sender=Session)
+def forget_session(sender, instance=None, **kwargs):
+    session_cache.delete((instance.application_id, instance.id))
+
+
+# Start time of the tasks running in this process by task id.
+_task_started = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task_duration(task_id=None, task=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.labels(task.name).observe(time.perf_counter() - started)
@@ -0,0 +1,447 @@
+"""
+Local append-only spool of accepted events, used when EVENTS_INGEST_BACKEND
+is "spool" so that requests never wait for the broker.
+
+Every process appends to its own segment file in EVENTS_SPOOL_DIR, one JSON
+line `[application_id, [event, ...]]` per accepted request. A line that fails
+half way is truncated away. `Spool.append` returns once its line is synced to
+disk: a background thread fsyncs the segment every
+EVENTS_SPOOL_FSYNC_INTERVAL_MS milliseconds, so the requests of that interval
+share one fsync, and with 0 every append fsyncs itself. The same thread closes
+segments older than EVENTS_SPOOL_SEGMENT_SECONDS. Appends raise the OSError of
+a failed fsync of their line, or TimeoutError after
+EVENTS_SPOOL_SYNC_TIMEOUT_MS.
+
+Segments go through these states, encoded in the file name:
+
+- `<created_ms>-<pid>-<n>.open`: being written by process `pid`.
+- `<created_ms>-<pid>-<n>.ready`: closed after EVENTS_SPOOL_SEGMENT_BYTES or
+  EVENTS_SPOOL_SEGMENT_SECONDS, waiting to be drained.
+- `<created_ms>-<pid>-<n>.draining-<drainer pid>`: claimed by a drainer.
+
+The process writing or draining a segment holds an exclusive `flock` on it
+until it's done, the writer takes it before the segment gets its `.open`
+name. Locks go away with the process that held them, whatever its PID
+namespace, so a segment nobody holds is safe to claim.
+
+`SpoolDrainer` (`manage.py drain_spool`) publishes ready segments to the
+broker, or stores them in the database, and deletes them once done. Open or
+claimed segments of processes that no longer run are drained as well, so
+nothing is lost across restarts. Delivery is at least once: a segment that
+fails half way is drained again from the start.
+"""
+import atexit
+import fcntl
+import logging
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from events.codec import dumps, loads
+
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_NAME = re.compile(r"^(\d+)-(\d+)-(\d+)\.(open|ready|draining-(\d+))$")
+
+
+class Spool:
+    def __init__(
+        self,
+        directory=None,
+        fsync_interval=None,
+        segment_bytes=None,
+        segment_seconds=None,
+        sync_timeout=None,
+    ):
+        self.directory = directory or settings.EVENTS_SPOOL_DIR
+        self.fsync_interval = (
+            settings.EVENTS_SPOOL_FSYNC_INTERVAL_MS
+            if fsync_interval is None
+            else fsync_interval
+        ) / 1000
+        self.segment_bytes = segment_bytes or settings.EVENTS_SPOOL_SEGMENT_BYTES
+        self.segment_seconds = segment_seconds or settings.EVENTS_SPOOL_SEGMENT_SECONDS
+        self.sync_timeout = (
+            settings.EVENTS_SPOOL_SYNC_TIMEOUT_MS
+            if sync_timeout is None
+            else sync_timeout
+        ) / 1000
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._fd = None
+        self._path = None
+        self._opened_at = None
+        self._size = 0
+        self._count = 0
+        # Lines appended and lines synced to disk, appenders wait for the latter.
+        self._appended = 0
+        self._synced_lines = 0
+        # `(appended, error)` of the last failed fsync, lines up to `appended`
+        # may not be on disk.
+        self._sync_error = None
+        self._syncer = None
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def append(self, application_id: int, events: list):
+        """
+        Appends a line to the current segment and waits until it's synced.
+        """
+        data = dumps([application_id, events]) + b"\n"
+        deadline = time.monotonic() + self.sync_timeout
+
+        with self._lock:
+            if self._fd is None:
+                self._open_segment()
+
+            self._write(data)
+            self._appended += 1
+            line = self._appended
+
+            if self._size >= self.segment_bytes:
+                self._close_segment()
+            elif not self.fsync_interval:
+                self._sync()
+
+            while self._synced_lines < line:
+                if self._sync_error is not None and self._sync_error[0] >= line:
+                    raise self._sync_error[1]
+
+                if not self._synced.wait(deadline - time.monotonic()):
+                    raise TimeoutError(
+                        f"Spool line not synced within {self.sync_timeout}s"
+                    )
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+    def _open_segment(self):
+        self._count += 1
+        self._opened_at = time.monotonic()
+        name = f"{time.time_ns() // 1_000_000:013d}-{self.pid}-{self._count}"
+        path = os.path.join(self.directory, name)
+
+        # Locked before drainers can see it as an open segment.
+        self._fd = os.open(
+            path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644
+        )
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._path = path + ".open"
+        os.rename(path + ".tmp", self._path)
+        self._size = 0
+        _fsync_directory(self.directory)
+        self._start_syncer()
+
+    def _close_segment(self):
+        if self._fd is None:
+            return
+
+        self._sync()
+        os.rename(self._path, self._path[: -len(".open")] + ".ready")
+        _fsync_directory(self.directory)
+        # Releases the lock, the segment is complete under its new name.
+        os.close(self._fd)
+        self._fd = None
+
+    def _write(self, data: bytes):
+        written = 0
+        try:
+            while written < len(data):
+                written += os.write(self._fd, data[written:])
+        except OSError:
+            # The next line would be appended to the torn one.
+            os.ftruncate(self._fd, self._size)
+            raise
+
+        self._size += written
+
+    def _sync(self):
+        try:
+            os.fsync(self._fd)
+        except OSError as error:
+            self._sync_error = (self._appended, error)
+            self._synced.notify_all()
+            raise
+
+        self._synced_lines = self._appended
+        self._synced.notify_all()
+
+    def _start_syncer(self):
+        if self._syncer is None:
+            self._syncer = threading.Thread(target=self._sync_forever, daemon=True)
+            self._syncer.start()
+
+    def _sync_forever(self):
+        # Segments are closed by age even when every append syncs itself.
+        interval = self.fsync_interval or min(1.0, self.segment_seconds)
+
+        while True:
+            time.sleep(interval)
+
+            with self._lock:
+                if self._fd is None:
+                    continue
+
+                try:
+                    if time.monotonic() - self._opened_at >= self.segment_seconds:
+                        self._close_segment()
+                    elif self._synced_lines < self._appended:
+                        self._sync()
+                except OSError:
+                    logger.exception("Could not sync the spool segment %s", self._path)
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_spool() -> Spool:
+    """
+    Returns the spool of the current process, creating it on first use (and
+    again after a fork, since segments belong to a single process).
+    """
+    global _spool
+
+    with _spool_lock:
+        if _spool is not None and _spool.pid != os.getpid() and _spool._fd is not None:
+            # The descriptor inherited from the parent would keep the lock of
+            # its open segment after the parent exits.
+            os.close(_spool._fd)
+            _spool._fd = None
+
+        if (
+            _spool is None
+            or _spool.pid != os.getpid()
+            or _spool.directory != settings.EVENTS_SPOOL_DIR
+        ):
+            _spool = Spool()
+            atexit.register(_spool.close)
+
+        return _spool
+
+
+def close_spool():
+    """
+    Syncs and closes the open segment of the current process, if it has one,
+    so it can be drained right away.
+    """
+    with _spool_lock:
+        spool = _spool if _spool is not None and _spool.pid == os.getpid() else None
+
+    if spool is not None:
+        spool.close()
+
+
+class SpoolDrainer:
+    """
+    Moves spooled events to `target`: "broker" publishes them as
+    `handle_events` tasks, "database" stores them directly.
+    """
+
+    def __init__(self, directory=None, target=None, batch_size=None):
+        self.directory = directory or settings.EVENTS_SPOOL_DIR
+        self.target = target or settings.EVENTS_SPOOL_DRAIN_TARGET
+        self.batch_size = batch_size or settings.EVENTS_BATCH_MAX_SIZE
+        self.pid = os.getpid()
+        self.should_stop = False
+
+    def run(self, interval=1.0):
+        delay = interval
+
+        while not self.should_stop:
+            try:
+                drained = self.drain()
+            except Exception:
+                logger.exception("Could not drain the spool, retrying in %ss", delay)
+                delay = min(delay * 2, 60)
+            else:
+                delay = interval
+                if drained:
+                    continue
+
+            time.sleep(delay)
+
+    def stop(self, *args):
+        self.should_stop = True
+
+    def drain(self) -> int:
+        """
+        Drains every segment that can be claimed, returning the number of
+        events moved. A failing segment is released and the error raised.
+        """
+        drained = 0
+
+        for path in claimable_segments(self.directory):
+            if self.should_stop:
+                break
+
+            claimed = self._claim(path)
+            if claimed is None:
+                continue
+
+            fd, claimed = claimed
+            try:
+                try:
+                    drained += self._drain_segment(claimed)
+                except Exception:
+                    os.rename(claimed, _with_state(claimed, "ready"))
+                    raise
+
+                os.remove(claimed)
+            finally:
+                os.close(fd)
+
+        return drained
+
+    def _claim(self, path):
+        """
+        Locks the segment and renames it as drained by this process. Returns
+        the descriptor holding the lock and the new path, or None when another
+        process holds the segment or claimed it first.
+        """
+        fd = _lock_segment(path)
+        if fd is None:
+            return None
+
+        claimed = _with_state(path, f"draining-{self.pid}")
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            # Another drainer claimed, and maybe drained, it first.
+            os.close(fd)
+            return None
+
+        return fd, claimed
+
+    def _drain_segment(self, path) -> int:
+        batches = {}
+        drained = 0
+
+        for application_id, events in read_segment(path):
+            batch = batches.setdefault(application_id, [])
+            batch.extend(events)
+
+            if len(batch) >= self.batch_size:
+                drained += self._publish(application_id, batch)
+                batches[application_id] = []
+
+        for application_id, batch in batches.items():
+            if batch:
+                drained += self._publish(application_id, batch)
+
+        return drained
+
+    def _publish(self, application_id, events) -> int:
+        from events.ingest import persist_events, publish_events
+        from events.wire import decode_event
+
+        for start in range(0, len(events), self.batch_size):
+            chunk = events[start : start + self.batch_size]
+
+            if self.target == "database":
+                persist_events([(application_id, decode_event(e)) for e in chunk])
+            else:
+                publish_events(application_id, chunk)
+
+        return len(events)
+
+
+def read_segment(path):
+    """
+    Yields the `(application_id, events)` lines of a segment. A line torn by
+    a crash while it was being written is skipped.
+    """
+    with open(path, "rb") as segment:
+        for number, line in enumerate(segment, start=1):
+            try:
+                application_id, events = loads(line)
+            except ValueError:
+                logger.warning("Skipping torn line %s of %s", number, path)
+                continue
+
+            yield application_id, events
+
+
+def claimable_segments(directory) -> list:
+    """
+    Returns the segments a drainer may claim, oldest first: ready ones plus
+    the open or claimed ones left behind by processes that no longer run,
+    i.e. every segment no process holds a lock on.
+    """
+    segments = []
+
+    for name, _ in _list_segments(directory):
+        fd = _lock_segment(os.path.join(directory, name))
+        if fd is not None:
+            os.close(fd)
+            segments.append(name)
+
+    return [os.path.join(directory, name) for name in sorted(segments)]
+
+
+def spool_stats(directory=None) -> dict:
+    """
+    Depth and age of the spool: number of segments and bytes not drained yet,
+    and the age in seconds of the oldest one.
+    """
+    directory = directory or settings.EVENTS_SPOOL_DIR
+    stats = {"segments": 0, "bytes": 0, "oldest_age_seconds": 0.0}
+
+    for name, match in _list_segments(directory):
+        try:
+            size = os.path.getsize(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
+
+        age = time.time() - int(match.group(1)) / 1000
+        stats["segments"] += 1
+        stats["bytes"] += size
+        stats["oldest_age_seconds"] = max(stats["oldest_age_seconds"], round(age, 3))
+
+    return stats
+
+
+def _list_segments(directory):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+    return [(name, match) for name in names if (match := SEGMENT_NAME.match(name))]
+
+
+def _with_state(path, state):
+    return path.rsplit(".", 1)[0] + f".{state}"
+
+
+def _lock_segment(path):
+    """
+    Returns a descriptor of `path` holding its lock, or None when it's gone or
+    another process holds it.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+
+    return fd
+
+
+def _fsync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
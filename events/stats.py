@@ -0,0 +1,145 @@
+"""
+Event counts per time bucket for `GET /events/stats/`.
+
+Counts come from `EventRollup` when the filters allow it: no `session_id`
+and a time range aligned to whole minutes. The events that the rollups
+don't cover yet (above the `RollupWatermark`) are counted from
+`events_event` in the same statement, so the result is exact and both parts
+are read from the same snapshot. Any other query counts the events directly.
+
+The two sources only agree while no event is removed. Rollups count every
+event ever stored, while `events_event` only has those still in it. Events
+that are deleted, archived or dropped by retention after they're counted
+still show up in the "rollups" counts but not in the "events" ones. The
+`source` of a response tells which one answered.
+
+Buckets are truncated in the current time zone, like `Trunc` does.
+"""
+from django.db import connection
+from django.db.models import Count
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from events.models import Event
+from events.rollups import WATERMARK
+
+
+BUCKETS = ("minute", "hour", "day")
+GROUP_BY_FIELDS = ("category", "name")
+
+COUNT_FROM_ROLLUPS = """
+    SELECT
+        date_trunc(%(bucket)s, counted.minute AT TIME ZONE %(time_zone)s)
+        AT TIME ZONE %(time_zone)s{columns},
+        SUM(counted.count)::bigint
+    FROM (
+        SELECT minute, category, name, count
+        FROM events_eventrollup
+        WHERE application_id = %(application_id)s{rollup_filters}
+        UNION ALL
+        SELECT
+            date_trunc('minute', events_event."timestamp"),
+            events_event.category,
+            events_event.name,
+            1
+        FROM events_event
+        WHERE events_event.application_id = %(application_id)s
+        AND events_event.id > (
+            SELECT COALESCE(MAX(event_id), 0)
+            FROM events_rollupwatermark
+            WHERE name = %(watermark)s
+        ){event_filters}
+    ) counted
+    GROUP BY 1{group_by}
+    ORDER BY 1{group_by}
+"""
+
+
+def can_use_rollups(filters: dict) -> bool:
+    """
+    Rollups count whole minutes per category and name, they can't answer
+    questions about sessions or parts of a minute.
+    """
+    if filters.get("session_id"):
+        return False
+
+    return all(
+        moment.second == 0 and moment.microsecond == 0
+        for moment in (filters.get("after"), filters.get("before"))
+        if moment is not None
+    )
+
+
+def count_events(application_id, filters: dict, bucket: str, group_by: list) -> tuple:
+    """
+    Returns `(source, rows)` with one `{"bucket", *group_by, "count"}` row per
+    bucket and group, ordered by bucket. `filters` may hold `session_id`,
+    `category`, `after` (inclusive) and `before` (exclusive).
+    """
+    if can_use_rollups(filters):
+        return "rollups", _count_from_rollups(application_id, filters, bucket, group_by)
+
+    return "events", _count_from_events(application_id, filters, bucket, group_by)
+
+
+def _count_from_rollups(application_id, filters, bucket, group_by):
+    params = {
+        "application_id": application_id,
+        "bucket": bucket,
+        "time_zone": timezone.get_current_timezone_name(),
+        "watermark": WATERMARK,
+    }
+    rollup_filters = []
+    event_filters = []
+
+    if category := filters.get("category"):
+        params["category"] = category
+        rollup_filters.append("category = %(category)s")
+        event_filters.append("events_event.category = %(category)s")
+
+    if after := filters.get("after"):
+        params["after"] = after
+        rollup_filters.append("minute >= %(after)s")
+        event_filters.append('events_event."timestamp" >= %(after)s')
+
+    if before := filters.get("before"):
+        params["before"] = before
+        rollup_filters.append("minute < %(before)s")
+        event_filters.append('events_event."timestamp" < %(before)s')
+
+    sql = COUNT_FROM_ROLLUPS.format(
+        columns="".join(f", counted.{field}" for field in group_by),
+        group_by="".join(f", {index}" for index in range(2, len(group_by) + 2)),
+        rollup_filters="".join(f" AND {condition}" for condition in rollup_filters),
+        event_filters="".join(f" AND {condition}" for condition in event_filters),
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return [dict(zip(("bucket", *group_by, "count"), row)) for row in rows]
+
+
+def _count_from_events(application_id, filters, bucket, group_by):
+    lookups = {"application_id": application_id}
+
+    if session_id := filters.get("session_id"):
+        lookups["session_id"] = session_id
+
+    if category := filters.get("category"):
+        lookups["category"] = category
+
+    if after := filters.get("after"):
+        lookups["timestamp__gte"] = after
+
+    if before := filters.get("before"):
+        lookups["timestamp__lt"] = before
+
+    return list(
+        Event.objects.filter(**lookups)
+        .annotate(bucket=Trunc("timestamp", bucket))
+        .values("bucket", *group_by)
+        .annotate(count=Count("id"))
+        .order_by("bucket", *group_by)
+    )
@@ -1,17 +1,34 @@
-from events.models import Event, Session
+from events.archive import archive_events
+from events.ingest import persist_events
+from events.metrics import observe_commit_lag
+from events.partitions import maintain_partitions
+from events.rollups import update_rollups
+from events.wire import decode_event
 from the_eye.celery import celery_app
 
 
 @celery_app.task(name="handle_event")
-def handle_event(application_id: int, payload: dict):
-    session = Session.objects.filter(
-        application_id=application_id,
-        id=payload.get("session_id"),
-    ).first()
-
-    if not session:
-        Session.objects.create(
-            application_id=application_id, id=payload.get("session_id")
-        )
-
-    Event.objects.create(**payload)
+def handle_event(application_id: int, event: list):
+    persist_events([(application_id, decode_event(event))])
+    observe_commit_lag("task", handle_event.request.get("published_at"))
+
+
+@celery_app.task(name="handle_events")
+def handle_events(application_id: int, events: list):
+    persist_events([(application_id, decode_event(event)) for event in events])
+    observe_commit_lag("task", handle_events.request.get("published_at"))
+
+
+@celery_app.task(name="maintain_event_partitions")
+def maintain_event_partitions():
+    return maintain_partitions()
+
+
+@celery_app.task(name="archive_events")
+def archive_old_events():
+    return archive_events()
+
+
+@celery_app.task(name="update_event_rollups")
+def update_event_rollups():
+    return update_rollups()
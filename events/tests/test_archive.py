@@ -0,0 +1,258 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest import TestCase, mock
+from urllib.parse import parse_qs, urlparse
+
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from events import archive
+from events.archive import (
+    ARCHIVE_FIELDS,
+    ARCHIVE_LOCK,
+    archive_events,
+    archived_events,
+    contains,
+    list_segments,
+    reaches_archive,
+    write_segment,
+)
+from events.conditional import response_cache
+from events.models import Application, Event, Session
+from events.views import EventsView
+
+
+class ArchiveTestCase(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = override_settings(
+            EVENTS_ARCHIVE_AFTER_DAYS=30,
+            EVENTS_ARCHIVE_DIR=self.directory.name,
+            EVENTS_ARCHIVE_SEGMENT_SIZE=2,
+            EVENTS_ARCHIVE_DELETE_CHUNK_SIZE=1,
+        )
+        self.settings.enable()
+        response_cache.clear()
+
+        self.application = Application.objects.create(name='Archived Application')
+        self.session = Session.objects.create(application=self.application)
+        self.request_factory = APIRequestFactory()
+
+        # Ten events a day apart, the last three stay in the hot window.
+        self.now = timezone.make_aware(datetime.fromisoformat("2021-02-10 12:00:00"))
+        self.events = [
+            Event.objects.create(
+                application=self.application,
+                session=self.session,
+                category="page interaction" if index % 3 else "form",
+                name="pageview",
+                data={"path": f"/{index}"},
+                timestamp=self.now - timedelta(days=37 - index),
+            )
+            for index in range(10)
+        ]
+
+    def tearDown(self) -> None:
+
+        self.settings.disable()
+        self.directory.cleanup()
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def paths(self, events):
+        return [event["data"]["path"] for event in events]
+
+    def get(self, **params):
+        request = self.request_factory.get(reverse('events'), params)
+        force_authenticate(request, user=self.application)
+
+        return EventsView.as_view()(request)
+
+    def test_old_events_are_moved_to_sorted_segments(self):
+
+        result = archive_events(now=self.now)
+
+        self.assertEqual(result, {"segments": 7, "events": 7})
+        self.assertEqual(Event.objects.count(), 3)
+
+        segments = list_segments(self.application.id)
+        self.assertEqual(len(segments), 7)
+        self.assertEqual(segments[0]["session_ids"], {str(self.session.id)})
+        self.assertEqual(segments[0]["start"], self.events[0].timestamp)
+        with gzip.open(segments[0]["path"]) as segment:
+            row = json.loads(segment.readline())
+        self.assertEqual(set(row), set(ARCHIVE_FIELDS))
+        self.assertEqual(row["id"], self.events[0].id)
+
+        self.assertEqual(archive_events(now=self.now), {"segments": 0, "events": 0})
+
+    def test_segments_of_one_day_are_split_by_size(self):
+
+        for index in range(3):
+            Event.objects.create(
+                application=self.application,
+                session=self.session,
+                category="page interaction",
+                name="scroll",
+                data={"path": f"/{index}"},
+                timestamp=self.events[0].timestamp + timedelta(minutes=index + 1),
+            )
+
+        result = archive_events(now=self.now)
+
+        self.assertEqual(result, {"segments": 8, "events": 10})
+        self.assertEqual(
+            [event["name"] for event in archived_events(self.application.id)][:4],
+            ["pageview", "scroll", "scroll", "scroll"],
+        )
+
+    def test_pages_merge_archived_and_stored_events(self):
+
+        archive_events(now=self.now)
+
+        paths = []
+        params = {"limit": 4}
+        while True:
+            response = self.get(**params)
+            paths += self.paths(response.data["results"])
+
+            if not response.data["next"]:
+                break
+
+            cursor = parse_qs(urlparse(response.data["next"]).query)["cursor"][0]
+            params = {"limit": 4, "cursor": cursor}
+
+        self.assertEqual(paths, [event.data["path"] for event in self.events])
+
+    def test_ndjson_export_skips_events_archived_but_not_deleted_yet(self):
+
+        rows = list(Event.objects.order_by("timestamp", "id").values(*ARCHIVE_FIELDS))
+        write_segment(self.directory.name, self.application.id, rows[:5])
+
+        response = self.get(format="ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(
+            self.paths(json.loads(line) for line in lines),
+            [event.data["path"] for event in self.events],
+        )
+
+    def test_deep_pages_skip_segments_before_the_cursor(self):
+
+        archive_events(now=self.now)
+        first = self.get(limit=6)
+        cursor = parse_qs(urlparse(first.data["next"]).query)["cursor"][0]
+
+        with mock.patch.object(
+            archive, '_read_segment', wraps=archive._read_segment
+        ) as read_segment:
+            response = self.get(limit=6, cursor=cursor)
+
+        self.assertEqual(self.paths(response.data["results"]), ["/6", "/7", "/8", "/9"])
+        # The segment of the cursor and the last one, out of seven.
+        self.assertEqual(read_segment.call_count, 2)
+
+    def test_archive_is_only_read_by_applications_with_segments(self):
+
+        other = Application.objects.create(name='Unarchived Application')
+
+        self.assertFalse(reaches_archive(other.id, None, now=self.now))
+        self.assertFalse(reaches_archive(self.application.id, None, now=self.now))
+
+        archive_events(now=self.now)
+
+        self.assertTrue(reaches_archive(self.application.id, None, now=self.now))
+        self.assertFalse(
+            reaches_archive(self.application.id, self.events[8].timestamp, now=self.now)
+        )
+
+    def test_indexes_are_listed_again_once_the_directory_changes(self):
+
+        archive_events(now=self.now)
+        application_directory = os.path.join(
+            self.directory.name, str(self.application.id)
+        )
+        os.utime(application_directory, (0, 0))
+        list_segments(self.application.id)
+
+        with mock.patch('events.archive.os.listdir', wraps=os.listdir) as listdir:
+            self.assertEqual(len(list_segments(self.application.id)), 7)
+            listdir.assert_not_called()
+
+            os.utime(application_directory, (1, 1))
+            self.assertEqual(len(list_segments(self.application.id)), 7)
+            listdir.assert_called_once()
+
+    def test_archived_events_are_filtered_like_stored_ones(self):
+
+        archive_events(now=self.now)
+
+        response = self.get(
+            category="form",
+            data=json.dumps({"path": "/3"}),
+            timestamp_after=self.events[1].timestamp.isoformat(),
+            timestamp_before=self.events[8].timestamp.isoformat(),
+            session_id=str(self.session.id),
+        )
+
+        self.assertEqual(self.paths(response.data["results"]), ["/3"])
+
+    def test_ranges_within_the_hot_window_do_not_read_the_archive(self):
+
+        archive_events(now=self.now)
+
+        with mock.patch('django.utils.timezone.now', return_value=self.now):
+            with mock.patch('events.views.archived_events') as archived:
+                response = self.get(
+                    format="ndjson",
+                    timestamp_after=self.events[7].timestamp.isoformat(),
+                )
+                lines = b"".join(response.streaming_content).decode().splitlines()
+
+        archived.assert_not_called()
+        self.assertEqual(len(lines), 3)
+
+    def test_contains_follows_jsonb_containment(self):
+
+        value = {"path": "/", "tags": ["a", "b"], "nested": {"x": 1, "y": 2}}
+
+        self.assertTrue(contains(value, {}))
+        self.assertTrue(contains(value, {"tags": ["b"], "nested": {"x": 1}}))
+        self.assertFalse(contains(value, {"tags": ["c"]}))
+        self.assertFalse(contains(value, {"nested": {"x": True}}))
+        self.assertFalse(contains(value, {"missing": None}))
+
+    def test_contains_compares_numbers_by_value(self):
+
+        value = {"price": 1, "ratio": 0.5, "flags": [1, True], "seen": True}
+
+        self.assertTrue(contains(value, {"price": 1.0, "ratio": 0.5}))
+        self.assertTrue(contains(value, {"flags": [1.0, True]}))
+        self.assertFalse(contains(value, {"seen": 1}))
+        self.assertFalse(contains({"flags": [True]}, {"flags": 1}))
+
+    def test_runs_do_not_overlap(self):
+
+        other = connections.create_connection('default')
+        try:
+            with other.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_lock(%s)', [ARCHIVE_LOCK])
+
+            result = archive_events(now=self.now)
+
+            self.assertEqual(result, {"segments": 0, "events": 0, "skipped": True})
+            self.assertEqual(Event.objects.count(), 10)
+
+            with other.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [ARCHIVE_LOCK])
+        finally:
+            other.close()
+
+        self.assertEqual(archive_events(now=self.now)["events"], 7)
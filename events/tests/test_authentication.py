@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+
+from events.authentication import CachedTokenAuthentication, token_cache
+from events.models import Application
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+    def setUp(self) -> None:
+        self.application = Application.objects.create(name='Cached Client')
+        self.authentication = CachedTokenAuthentication()
+        token_cache.clear()
+
+    def tearDown(self) -> None:
+        Application.objects.all().delete()
+
+    def authenticate(self):
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Token {self.application.auth_token.key}"
+        )
+
+        return self.authentication.authenticate(request)
+
+    def test_cached_token_does_not_hit_the_database(self):
+
+        self.authenticate()
+
+        with CaptureQueriesContext(connection) as queries:
+            user, _ = self.authenticate()
+
+        self.assertEqual(user, self.application)
+        self.assertEqual(len(queries), 0)
+
+    def test_deleted_token_is_removed_from_cache(self):
+
+        self.authenticate()
+        self.application.auth_token.delete()
+
+        self.assertEqual(len(token_cache), 0)
+
+    def test_deactivated_application_is_not_authenticated(self):
+
+        self.authenticate()
+        self.application.is_active = False
+        self.application.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
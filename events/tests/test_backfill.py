@@ -0,0 +1,113 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+from uuid import uuid4
+
+from django.core.management import call_command
+
+from events.backfill import EventLoader
+from events.models import Application, Event, Session
+from events.sessions import session_cache
+
+
+class EventLoaderTestCase(TestCase):
+    def setUp(self) -> None:
+        self.application = Application.objects.create(name='Backfill Application')
+        self.session_id = str(uuid4())
+        session_cache.clear()
+
+    def tearDown(self) -> None:
+
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def event(self, **kwargs):
+        event = {
+            "session_id": self.session_id,
+            "category": "page interaction",
+            "name": "pageview",
+            "data": {"host": "www.consumeraffairs.com", "path": "/"},
+            "timestamp": "2021-01-01 09:15:27.243860",
+        }
+        event.update(kwargs)
+
+        return json.dumps(event).encode()
+
+    def test_load_copies_valid_events_and_creates_sessions(self):
+
+        lines = [
+            self.event(),
+            self.event(name="cta click"),
+            self.event(timestamp="2021-01-01 09:15:28.243860"),
+        ]
+        rejects = io.StringIO()
+
+        stats = EventLoader(self.application.id, rejects, chunk_size=2).load(lines)
+
+        self.assertEqual(stats["loaded"], 3)
+        self.assertEqual(stats["rejected"], 0)
+        self.assertEqual(
+            Event.objects.filter(
+                application=self.application, session_id=self.session_id
+            ).count(),
+            3,
+        )
+        self.assertEqual(
+            Session.objects.get(id=self.session_id).application_id,
+            self.application.id,
+        )
+        self.assertEqual(
+            Event.objects.filter(session_id=self.session_id).first().data,
+            {"host": "www.consumeraffairs.com", "path": "/"},
+        )
+
+    def test_load_writes_rejected_lines_with_their_errors(self):
+
+        lines = [self.event(), b"{not json", self.event(category=""), b"\n"]
+        rejects = io.StringIO()
+
+        stats = EventLoader(self.application.id, rejects).load(lines)
+
+        self.assertEqual(stats, {**stats, "read": 3, "loaded": 1, "rejected": 2})
+        rejected = [json.loads(line) for line in rejects.getvalue().splitlines()]
+        self.assertEqual([reject["line"] for reject in rejected], [2, 3])
+        self.assertEqual(
+            rejected[1]["errors"], {"category": ["This field may not be blank."]}
+        )
+
+    def test_database_errors_only_reject_the_offending_events(self):
+
+        lines = [
+            self.event(),
+            self.event(data={"text": "\u0000"}),
+            self.event(name="cta click"),
+        ]
+        rejects = io.StringIO()
+
+        stats = EventLoader(self.application.id, rejects).load(lines)
+
+        self.assertEqual(stats["loaded"], 2)
+        self.assertEqual(stats["rejected"], 1)
+        self.assertEqual(json.loads(rejects.getvalue())["line"], 2)
+
+    def test_load_events_command_reads_gzip_files(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "events.ndjson.gz")
+            with gzip.open(path, "wb") as events_file:
+                events_file.write(
+                    self.event() + b"\n" + self.event(name="cta click") + b"\n"
+                )
+
+            call_command(
+                "load_events",
+                path,
+                application=self.application.name,
+                stdout=io.StringIO(),
+            )
+
+        self.assertEqual(Event.objects.filter(session_id=self.session_id).count(), 2)
@@ -0,0 +1,42 @@
+from unittest import TestCase, mock
+
+from events.cache import LRUCache
+
+
+class LRUCacheTestCase(TestCase):
+    def test_cache_evicts_least_recently_used_key(self):
+
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_cache_counts_hits_and_misses(self):
+
+        cache = LRUCache(maxsize=10)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertAlmostEqual(stats["hit_rate"], 2 / 3)
+
+    def test_expired_entries_are_missing(self):
+
+        cache = LRUCache(maxsize=10, ttl=60)
+        with mock.patch("events.cache.time.monotonic", return_value=100):
+            cache.set("a", 1)
+
+        with mock.patch("events.cache.time.monotonic", return_value=159):
+            self.assertEqual(cache.get("a"), 1)
+
+        with mock.patch("events.cache.time.monotonic", return_value=160):
+            self.assertIsNone(cache.get("a"))
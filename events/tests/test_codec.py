@@ -0,0 +1,76 @@
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import TestCase
+from uuid import UUID
+
+from kombu.serialization import dumps as kombu_dumps, loads as kombu_loads
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from events.codec import (
+    KOMBU_CONTENT_TYPE,
+    KOMBU_SERIALIZER,
+    loads,
+    orjson_dumps,
+    stdlib_dumps,
+)
+from events.parsers import FastJSONParser
+from events.renderers import FastJSONRenderer
+
+
+class CodecTestCase(TestCase):
+    def setUp(self) -> None:
+        self.data = {
+            "session_id": UUID("e2085be5-9137-4e4e-80b5-f1ffddc25423"),
+            "category": "página\u2028interaction",
+            "timestamp": datetime(2021, 1, 1, 9, 15, 27, 243860, tzinfo=timezone.utc),
+            "data": {"price": Decimal("9.5"), "tags": ["a", "b"], "seen": None},
+        }
+
+    def test_encoders_render_like_drf(self):
+
+        expected = JSONRenderer().render(self.data)
+
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+        self.assertEqual(loads(orjson_dumps(self.data)), loads(stdlib_dumps(self.data)))
+        self.assertEqual(loads(expected), loads(orjson_dumps(self.data)))
+
+    def test_integers_over_64_bits_stay_exact(self):
+
+        data = {"data": {"id": 10**20, "negative": -(2**63) - 1, "small": 1}}
+
+        for content in (orjson_dumps(data), stdlib_dumps(data)):
+            self.assertEqual(content.count(b"100000000000000000000"), 1)
+            self.assertEqual(loads(content), data)
+            self.assertEqual(loads(content.decode()), data)
+            self.assertIsInstance(loads(content)["data"]["id"], int)
+
+    def test_indented_output_goes_through_drf(self):
+
+        content = FastJSONRenderer().render(
+            {"name": "pageview"}, 'application/json; indent=2'
+        )
+
+        self.assertEqual(content, b'{\n  "name": "pageview"\n}')
+
+    def test_parser_reports_invalid_json(self):
+
+        parser = FastJSONParser()
+
+        self.assertEqual(
+            parser.parse(io.BytesIO(b'{"name": "pageview"}')), {"name": "pageview"}
+        )
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"name": '))
+
+    def test_celery_messages_round_trip(self):
+
+        message = (1, [["e2085be5-9137-4e4e-80b5-f1ffddc25423", "page interaction"]])
+
+        content_type, encoding, body = kombu_dumps(message, serializer=KOMBU_SERIALIZER)
+
+        self.assertEqual(
+            kombu_loads(body, content_type, encoding, accept=[KOMBU_CONTENT_TYPE]),
+            [1, [["e2085be5-9137-4e4e-80b5-f1ffddc25423", "page interaction"]]],
+        )
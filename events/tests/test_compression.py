@@ -0,0 +1,106 @@
+import gzip
+import json
+import zlib
+from datetime import datetime
+from unittest import TestCase
+from uuid import uuid4
+
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from events.models import Application, Event, Session
+from events.writer import get_writer
+
+
+class CompressionTestCase(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.application = Application.objects.create(name='Compressed Application')
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.application.auth_token.key}'
+        )
+
+    def tearDown(self) -> None:
+
+        get_writer().close()
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def batch(self, size):
+        return [
+            {
+                "session_id": str(uuid4()),
+                "category": "page interaction",
+                "name": "pageview",
+                "data": {"host": "www.consumeraffairs.com", "path": "/"},
+                "timestamp": "2021-01-01 09:15:27.243860",
+            }
+            for _ in range(size)
+        ]
+
+    def post(self, body, encoding):
+        # Store the events right away rather than leaving messages in the broker.
+        with override_settings(EVENTS_INGEST_BACKEND='direct'):
+            return self.client.generic(
+                'POST',
+                '/events/batch/',
+                body,
+                content_type='application/json',
+                HTTP_CONTENT_ENCODING=encoding,
+            )
+
+    def test_gzip_and_deflate_request_bodies_are_decompressed(self):
+
+        gzipped = gzip.compress(json.dumps(self.batch(20)).encode())
+        deflated = zlib.compress(json.dumps(self.batch(20)).encode())
+
+        self.assertEqual(self.post(gzipped, 'gzip').status_code, 204)
+        self.assertEqual(self.post(deflated, 'deflate').status_code, 204)
+        self.assertEqual(Event.objects.filter(application=self.application).count(), 40)
+
+    def test_bodies_inflating_past_the_limit_are_rejected(self):
+
+        body = gzip.compress(b' ' * 2048)
+
+        with override_settings(EVENTS_REQUEST_MAX_DECOMPRESSED_SIZE=1024):
+            response = self.post(body, 'gzip')
+
+        self.assertEqual(response.status_code, 413)
+
+    def test_malformed_or_unknown_encodings_are_rejected(self):
+
+        body = gzip.compress(json.dumps(self.batch(1)).encode())
+
+        self.assertEqual(self.post(body[:-10], 'gzip').status_code, 400)
+        self.assertEqual(self.post(body, 'br').status_code, 415)
+
+    def test_responses_are_compressed_when_accepted(self):
+
+        session = Session.objects.create(application=self.application)
+        timestamp = timezone.make_aware(datetime(2021, 1, 1, 9, 15))
+        Event.objects.bulk_create(
+            Event(
+                application=self.application,
+                session=session,
+                category="page interaction",
+                name="pageview",
+                data={"path": f"/{index}"},
+                timestamp=timestamp,
+            )
+            for index in range(50)
+        )
+
+        response = self.client.get('/events/?format=json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            len(json.loads(gzip.decompress(response.content))['results']), 50
+        )
+
+        response = self.client.get(
+            '/events/?format=ndjson', HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(content.splitlines()), 50)
@@ -0,0 +1,49 @@
+from unittest import TestCase
+from uuid import uuid4
+
+from events.consumers import EventBatchConsumer
+from events.models import Application, Event, Session
+from events.tasks import handle_event, handle_events
+
+
+class EventBatchConsumerTestCase(TestCase):
+    def setUp(self) -> None:
+        self.application = Application.objects.create(name='Consumer Application')
+        self.payload = {
+            "session_id": str(uuid4()),
+            "category": "page interaction",
+            "name": "pageview",
+            "data": {"host": "www.consumeraffairs.com", "path": "/"},
+            "timestamp": "2021-01-01T09:15:27.243860+00:00",
+        }
+
+    def tearDown(self) -> None:
+
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def test_consumer_stores_messages_in_one_batch(self):
+
+        handle_event.delay(self.application.id, self.payload)
+        handle_events.delay(
+            self.application.id,
+            [{**self.payload, "name": "cta click"}, {**self.payload, "name": "scroll"}],
+        )
+
+        consumer = EventBatchConsumer(batch_size=2, batch_timeout=1000)
+        consumer.run(max_batches=1)
+
+        self.assertEqual(Event.objects.count(), 3)
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_consumer_rejects_only_the_invalid_message(self):
+
+        handle_event.delay(self.application.id, {**self.payload, "data": None})
+        handle_event.delay(self.application.id, self.payload)
+
+        consumer = EventBatchConsumer(batch_size=2, batch_timeout=1000)
+        with self.assertLogs("events.consumers", level="ERROR"):
+            consumer.run(max_batches=1)
+
+        self.assertEqual(Event.objects.count(), 1)
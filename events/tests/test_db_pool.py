@@ -0,0 +1,136 @@
+from unittest import TestCase
+
+import psycopg2
+from django.db import connection
+
+from the_eye.db.pooled.base import DatabaseWrapper
+from the_eye.db.pooled.pool import ConnectionPool, PoolTimeout
+
+
+class ConnectionPoolTestCase(TestCase):
+    def setUp(self) -> None:
+        self.pools = []
+
+    def tearDown(self) -> None:
+
+        for pool in self.pools:
+            pool.close()
+
+    def pool(self, **options):
+        pool = ConnectionPool({"MIN_SIZE": 0, **options})
+        self.pools.append(pool)
+
+        return pool
+
+    def connect(self):
+        return psycopg2.connect(**connection.get_connection_params())
+
+    def test_returned_connections_are_reused(self):
+
+        pool = self.pool()
+        first = pool.getconn(self.connect)
+        pool.putconn(first)
+        second = pool.getconn(self.connect)
+        pool.putconn(second)
+
+        self.assertIs(first, second)
+        self.assertEqual(pool.stats()["checkouts"], 2)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_overflow_connections_are_closed_on_return(self):
+
+        pool = self.pool(MAX_SIZE=1, MAX_OVERFLOW=1, TIMEOUT=0.05)
+        first = pool.getconn(self.connect)
+        second = pool.getconn(self.connect)
+
+        self.assertEqual(pool.stats()["overflow"], 1)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(self.connect)
+
+        pool.putconn(first)
+        pool.putconn(second)
+
+        self.assertEqual(first.closed, 1)
+        self.assertEqual(second.closed, 0)
+        self.assertEqual(pool.stats()["timeouts"], 1)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_pool_tops_up_to_min_size_on_checkout(self):
+
+        failures = [
+            psycopg2.OperationalError("down"),
+            psycopg2.OperationalError("down"),
+        ]
+
+        def connect():
+            if failures:
+                raise failures.pop()
+            return self.connect()
+
+        pool = ConnectionPool({"MIN_SIZE": 2})
+        self.pools.append(pool)
+
+        with self.assertLogs('the_eye.db.pooled.pool', 'ERROR'):
+            first = pool.getconn(connect)
+        pool.putconn(first)
+        self.assertEqual(pool.stats()["size"], 1)
+
+        pool.putconn(pool.getconn(connect))
+        self.assertEqual(pool.stats()["size"], 2)
+        self.assertEqual(pool.stats()["idle"], 2)
+
+    def test_expired_connections_are_closed(self):
+
+        pool = self.pool(MAX_LIFETIME=0)
+        first = pool.getconn(self.connect)
+        pool.putconn(first)
+
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()["size"], 0)
+
+    def test_dead_connections_are_replaced_on_checkout(self):
+
+        pool = self.pool(CHECK_IDLE=0)
+        first = pool.getconn(self.connect)
+        pid = first.get_backend_pid()
+        pool.putconn(first)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s)", [pid])
+
+        second = pool.getconn(self.connect)
+        pool.putconn(second)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(pool.stats()["discarded"], 1)
+
+    def test_connections_are_returned_outside_transactions(self):
+
+        pool = self.pool()
+        first = pool.getconn(self.connect)
+        with first.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        pool.putconn(first)
+
+        self.assertEqual(
+            first.get_transaction_status(),
+            psycopg2.extensions.TRANSACTION_STATUS_IDLE,
+        )
+
+
+class PooledDatabaseWrapperTestCase(TestCase):
+    def test_closed_connections_go_back_to_the_pool(self):
+
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, "POOL": {"MIN_SIZE": 0}}, alias="pooled"
+        )
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, raw)
+        self.assertEqual(wrapper.pool.stats()["in_use"], 1)
+
+        wrapper.close()
+        wrapper.pool.close()
@@ -0,0 +1,107 @@
+from unittest import TestCase
+from uuid import uuid4
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from events.dedup import event_uid, recent_events
+from events.models import Application, Event, Session
+from events.sessions import session_cache
+from events.tasks import handle_event, handle_events
+from events.validators import validate_event
+from events.wire import encode_event
+
+
+class DuplicateEventsTestCase(TestCase):
+    def setUp(self) -> None:
+        self.application = Application.objects.create(name='Dedup Application')
+        self.session_id = str(uuid4())
+        session_cache.clear()
+        recent_events.clear()
+
+    def tearDown(self) -> None:
+
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def event(self, **kwargs):
+        event = {
+            "session_id": self.session_id,
+            "category": "page interaction",
+            "name": "pageview",
+            "data": {"host": "www.consumeraffairs.com", "path": "/"},
+            "timestamp": "2021-01-01T09:15:27.243860+00:00",
+        }
+        event.update(kwargs)
+        validated_data, _ = validate_event(event, timezone.now())
+
+        return encode_event(validated_data)
+
+    def stored(self):
+        return Event.objects.filter(session_id=self.session_id).count()
+
+    def test_retried_event_is_dropped_without_querying_the_database(self):
+
+        handle_event(self.application.id, self.event())
+
+        with CaptureQueriesContext(connection) as queries:
+            handle_event(self.application.id, self.event())
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.stored(), 1)
+
+    def test_retried_event_unknown_to_the_worker_is_stored_once(self):
+
+        handle_events(self.application.id, [self.event(), self.event(name="scroll")])
+        recent_events.clear()
+
+        handle_events(self.application.id, [self.event(), self.event(name="scroll")])
+
+        self.assertEqual(self.stored(), 2)
+
+    def test_duplicates_within_a_batch_are_stored_once(self):
+
+        handle_events(self.application.id, [self.event(), self.event()])
+
+        self.assertEqual(self.stored(), 1)
+
+    def test_event_id_tells_apart_events_with_the_same_content(self):
+
+        handle_events(
+            self.application.id,
+            [self.event(event_id="first"), self.event(event_id="second")],
+        )
+        handle_event(self.application.id, self.event(event_id="second"))
+
+        self.assertEqual(
+            sorted(
+                Event.objects.filter(session_id=self.session_id).values_list(
+                    "uid", flat=True
+                )
+            ),
+            ["first", "second"],
+        )
+
+    def test_content_hash_ignores_key_order_and_timestamp_offset(self):
+
+        event = {
+            "session_id": uuid4(),
+            "name": "pageview",
+            "data": {"host": "www.consumeraffairs.com", "path": "/"},
+            "timestamp": "2021-01-01T09:15:27.243860+00:00",
+        }
+
+        self.assertEqual(
+            event_uid(event),
+            event_uid(
+                {
+                    **event,
+                    "session_id": str(event["session_id"]).upper(),
+                    "data": {"path": "/", "host": "www.consumeraffairs.com"},
+                    "timestamp": "2021-01-01T01:15:27.243860-08:00",
+                }
+            ),
+        )
+        self.assertNotEqual(event_uid(event), event_uid({**event, "name": "scroll"}))
@@ -0,0 +1,124 @@
+import os
+import time
+from unittest import TestCase, mock
+from uuid import uuid4
+
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from events.metrics import observe_commit_lag
+from events.models import Application
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.application = Application.objects.create(name='Metrics Application')
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.application.auth_token.key}'
+        )
+
+    def tearDown(self) -> None:
+
+        Application.objects.all().delete()
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_post_requests_are_counted(self):
+
+        accepted = self.sample('theeye_events_accepted_total', view='events')
+        failures = self.sample('theeye_validation_failures_total', view='events')
+        requests = self.sample(
+            'theeye_request_duration_seconds_count',
+            method='POST',
+            view='events',
+            status='204',
+        )
+        event = {
+            "session_id": str(uuid4()),
+            "category": "page interaction",
+            "name": "pageview",
+            "data": {"host": "www.consumeraffairs.com", "path": "/"},
+            "timestamp": "2021-01-01 09:15:27.243860",
+        }
+
+        self.client.post('/events/', event, format='json')
+        self.client.post('/events/', {**event, "data": None}, format='json')
+
+        self.assertEqual(
+            self.sample('theeye_events_accepted_total', view='events'), accepted + 1
+        )
+        self.assertEqual(
+            self.sample('theeye_validation_failures_total', view='events'),
+            failures + 1,
+        )
+        self.assertEqual(
+            self.sample(
+                'theeye_request_duration_seconds_count',
+                method='POST',
+                view='events',
+                status='204',
+            ),
+            requests + 1,
+        )
+
+    def test_get_requests_record_queries_and_rows(self):
+
+        queries = self.sample('theeye_request_db_queries_sum', view='events')
+        rows = self.sample('theeye_rows_returned_count', format='json')
+
+        self.client.get('/events/', format='json')
+
+        self.assertGreater(
+            self.sample('theeye_request_db_queries_sum', view='events'), queries
+        )
+        self.assertEqual(
+            self.sample('theeye_rows_returned_count', format='json'), rows + 1
+        )
+
+    def test_commit_lag_is_only_observed_for_published_events(self):
+
+        lags = self.sample('theeye_commit_lag_seconds_count', path='task')
+
+        observe_commit_lag('task', None)
+        observe_commit_lag('task', time.time() - 1)
+
+        self.assertEqual(
+            self.sample('theeye_commit_lag_seconds_count', path='task'), lags + 1
+        )
+        self.assertGreaterEqual(
+            self.sample('theeye_commit_lag_seconds_sum', path='task'), 1
+        )
+
+    def test_metrics_are_served_in_prometheus_format(self):
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'theeye_events_accepted_total', response.content)
+        self.assertIn(b'theeye_spool_segments', response.content)
+
+    def test_pool_stats_are_reported_by_database(self):
+
+        stats = {
+            "size": 3,
+            "idle": 1,
+            "in_use": 2,
+            "overflow": 0,
+            "checkouts": 10,
+            "waits": 1,
+            "wait_seconds": 0.5,
+            "max_wait_seconds": 0.5,
+            "timeouts": 0,
+            "discarded": 1,
+        }
+
+        with mock.patch('events.metrics.pool_stats', return_value={'default': stats}):
+            labels = {'database': 'default', 'pid': str(os.getpid())}
+
+            self.assertEqual(self.sample('theeye_db_pool_in_use', **labels), 2)
+            self.assertEqual(
+                self.sample('theeye_db_pool_checkouts_total', **labels), 10
+            )
@@ -1,7 +1,7 @@
 from datetime import timedelta, datetime
 from unittest import TestCase
 
-from django.db import IntegrityError
+from django.db import IntegrityError, connection, transaction
 from django.utils import timezone
 
 from events.models import Application, Event, Session
@@ -102,3 +102,29 @@ class EventTestCase(TestCase):
 
         with self.assertRaises(IntegrityError):
             Event.objects.create(**data)
+
+    def test_data_containment_uses_the_data_index(self):
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = 'event_data_index'::regclass
+                """
+            )
+            index_names = {name for (name,) in cursor.fetchall()}
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # The table is tiny, make a sequential scan look as bad as on a big one.
+            # So do full scans of the btree indexes, which the planner may pick
+            # depending on the statistics of the table.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_indexscan = off")
+            plan = Event.objects.filter(
+                data__contains={"host": "www.consumeraffairs.com"}
+            ).explain()
+
+        self.assertTrue(index_names)
+        self.assertTrue(any(f"Index Scan on {name}" in plan for name in index_names))
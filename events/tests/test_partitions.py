@@ -0,0 +1,138 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest import TestCase
+
+from django.db import connection
+from django.test import override_settings
+
+from events.models import Application, Event, Session
+from events.partitions import (
+    EXPIRED_TABLE,
+    create_partition,
+    detach_partition,
+    list_partitions,
+    maintain_partitions,
+    partition_range,
+)
+
+
+class PartitionTestCase(TestCase):
+    def setUp(self) -> None:
+        self.application = Application.objects.create(name='Partitioned Client')
+        self.session = Session.objects.create(application=self.application)
+
+    def tearDown(self) -> None:
+
+        for name in list_partitions():
+            detach_partition(name, drop=True)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {EXPIRED_TABLE}")
+
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def partition_of(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM events_event WHERE id = %s",
+                [event.id],
+            )
+            return cursor.fetchone()[0]
+
+    def test_partition_range_covers_the_whole_interval(self):
+
+        moment = datetime(2021, 12, 31, 23, 59, tzinfo=dt_timezone.utc)
+
+        self.assertEqual(
+            partition_range(moment, "month"),
+            (
+                datetime(2021, 12, 1, tzinfo=dt_timezone.utc),
+                datetime(2022, 1, 1, tzinfo=dt_timezone.utc),
+            ),
+        )
+        self.assertEqual(
+            partition_range(moment, "day"),
+            (
+                datetime(2021, 12, 31, tzinfo=dt_timezone.utc),
+                datetime(2022, 1, 1, tzinfo=dt_timezone.utc),
+            ),
+        )
+
+    def test_create_partition_moves_rows_out_of_default_partition(self):
+
+        event = Event.objects.create(
+            session=self.session,
+            category="page interaction",
+            name="pageview",
+            timestamp=datetime(2021, 1, 15, tzinfo=dt_timezone.utc),
+        )
+        self.assertEqual(self.partition_of(event), "events_event_default")
+
+        start, end = partition_range(event.timestamp, "month")
+        create_partition(start, end, "events_event_p202101")
+
+        self.assertEqual(self.partition_of(event), "events_event_p202101")
+
+    @override_settings(
+        EVENTS_PARTITION_INTERVAL="month",
+        EVENTS_PARTITION_PREMAKE=1,
+        EVENTS_RETENTION_DAYS=30,
+        EVENTS_PARTITION_DROP_EXPIRED=True,
+    )
+    def test_maintain_partitions_creates_upcoming_and_drops_expired(self):
+
+        result = maintain_partitions(datetime(2021, 1, 10, tzinfo=dt_timezone.utc))
+        self.assertEqual(
+            result["created"], ["events_event_p202101", "events_event_p202102"]
+        )
+
+        result = maintain_partitions(datetime(2021, 3, 10, tzinfo=dt_timezone.utc))
+        self.assertEqual(
+            result["created"], ["events_event_p202103", "events_event_p202104"]
+        )
+        self.assertEqual(result["dropped"], ["events_event_p202101"])
+        self.assertNotIn("events_event_p202101", list_partitions())
+
+    @override_settings(
+        EVENTS_PARTITION_INTERVAL="month",
+        EVENTS_PARTITION_PREMAKE=0,
+        EVENTS_RETENTION_DAYS=30,
+    )
+    def test_expired_rows_of_the_default_partition_are_purged(self):
+
+        expired, kept = [
+            Event.objects.create(
+                session=self.session,
+                category="page interaction",
+                name="pageview",
+                timestamp=timestamp,
+            )
+            for timestamp in (
+                datetime(2021, 1, 15, tzinfo=dt_timezone.utc),
+                datetime(2021, 2, 15, tzinfo=dt_timezone.utc),
+            )
+        ]
+
+        now = datetime(2021, 3, 10, tzinfo=dt_timezone.utc)
+        with override_settings(EVENTS_PARTITION_DROP_EXPIRED=False):
+            result = maintain_partitions(now)
+
+        self.assertEqual(result["purged"], 1)
+        self.assertFalse(Event.objects.filter(id=expired.id).exists())
+        self.assertEqual(self.partition_of(kept), "events_event_default")
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM {EXPIRED_TABLE}")
+            self.assertEqual(cursor.fetchall(), [(expired.id,)])
+
+        Event.objects.create(
+            session=self.session,
+            category="page interaction",
+            name="pageview",
+            timestamp=expired.timestamp,
+        )
+        with override_settings(EVENTS_PARTITION_DROP_EXPIRED=True):
+            result = maintain_partitions(now)
+
+        self.assertEqual(result["purged"], 1)
+        self.assertEqual(list(Event.objects.values_list("id", flat=True)), [kept.id])
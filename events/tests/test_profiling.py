@@ -0,0 +1,62 @@
+import glob
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from events.models import Application
+from events.profiling import make_token, rank_functions
+
+
+class ProfilingMiddlewareTestCase(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.client = APIClient()
+        self.application = Application.objects.create(name='Profiled Application')
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.application.auth_token.key}'
+        )
+
+    def tearDown(self) -> None:
+
+        self.directory.cleanup()
+        Application.objects.all().delete()
+
+    def profiles(self):
+        return sorted(glob.glob(os.path.join(self.directory.name, '*.pstats')))
+
+    def test_requests_with_a_signed_header_are_profiled(self):
+
+        with override_settings(EVENTS_PROFILE_DIR=self.directory.name):
+            self.client.get('/events/', HTTP_X_PROFILE=make_token())
+            self.client.get('/events/', HTTP_X_PROFILE='forged')
+            self.client.get('/events/')
+
+        [profile] = self.profiles()
+        with open(profile[: -len('.pstats')] + '.json') as summary_file:
+            summary = json.load(summary_file)
+
+        self.assertEqual(summary['view'], 'events')
+        self.assertEqual(summary['status'], 200)
+        self.assertGreater(summary['queries'], 0)
+        self.assertTrue(summary['functions'])
+
+    def test_sampled_requests_are_profiled_and_rotated(self):
+
+        with override_settings(
+            EVENTS_PROFILE_DIR=self.directory.name,
+            EVENTS_PROFILE_SAMPLE_RATE=1,
+            EVENTS_PROFILE_KEEP=2,
+        ):
+            for _ in range(3):
+                self.client.get('/events/')
+
+        self.assertEqual(len(self.profiles()), 2)
+        self.assertEqual(len(glob.glob(os.path.join(self.directory.name, '*.json'))), 2)
+
+        report = rank_functions(self.directory.name, limit=5)
+        self.assertEqual(report['profiles'], 2)
+        self.assertEqual(len(report['functions']), 5)
@@ -0,0 +1,139 @@
+from datetime import datetime, timezone
+from unittest import TestCase
+
+from django.db import connection, connections
+
+from events.models import (
+    Application,
+    Event,
+    EventRollup,
+    RollupWatermark,
+    Session,
+)
+from events.rollups import WATERMARK, update_rollups
+
+
+class UpdateRollupsTestCase(TestCase):
+    def setUp(self) -> None:
+        RollupWatermark.objects.all().delete()
+        self.application = Application.objects.create(name='Rollups Application')
+        self.session = Session.objects.create(application=self.application)
+
+    def tearDown(self) -> None:
+
+        EventRollup.objects.all().delete()
+        RollupWatermark.objects.all().delete()
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def create_event(self, name, second):
+        return Event.objects.create(
+            application=self.application,
+            session=self.session,
+            category="page interaction",
+            name=name,
+            data={},
+            timestamp=datetime(2021, 1, 1, 9, 15, second, tzinfo=timezone.utc),
+        )
+
+    def counts(self):
+        return {
+            (rollup.name, rollup.minute.minute): rollup.count
+            for rollup in EventRollup.objects.filter(application=self.application)
+        }
+
+    def test_events_are_counted_per_minute_once_final(self):
+
+        self.create_event("pageview", 1)
+        self.create_event("pageview", 59)
+        self.create_event("cta click", 30)
+
+        update_rollups()
+        self.assertEqual(self.counts(), {})
+
+        update_rollups()
+        self.assertEqual(self.counts(), {("pageview", 15): 2, ("cta click", 15): 1})
+
+    def test_events_are_only_counted_once(self):
+
+        self.create_event("pageview", 1)
+        update_rollups()
+        update_rollups()
+
+        self.create_event("pageview", 2)
+        update_rollups()
+        update_rollups()
+        update_rollups()
+
+        self.assertEqual(self.counts(), {("pageview", 15): 2})
+
+    def test_events_wait_for_older_transactions(self):
+
+        self.create_event("pageview", 1)
+        update_rollups()
+        # Pretend a transaction older than the previous run is still running.
+        RollupWatermark.objects.filter(name=WATERMARK).update(pending_xmax=2**62)
+
+        update_rollups()
+        self.assertEqual(self.counts(), {})
+
+        RollupWatermark.objects.filter(name=WATERMARK).update(pending_xmax=0)
+        update_rollups()
+        self.assertEqual(self.counts(), {("pageview", 15): 1})
+
+    def test_events_wait_for_transactions_without_xid(self):
+
+        self.create_event("pageview", 1)
+        other = connections.create_connection('default')
+        try:
+            # An INSERT gets its id before its transaction gets an xid.
+            other.set_autocommit(False)
+            with other.cursor() as cursor:
+                cursor.execute(
+                    "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;"
+                    "SELECT nextval('events_event_id_seq')"
+                )
+                (event_id,) = cursor.fetchone()
+
+            update_rollups()
+            update_rollups()
+            self.assertEqual(self.counts(), {})
+
+            with other.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO events_event (
+                        id, application_id, session_id, category, name, data,
+                        "timestamp"
+                    )
+                    VALUES (%s, %s, %s, 'page interaction', 'pageview', '{}', %s)
+                    """,
+                    [
+                        event_id,
+                        self.application.id,
+                        self.session.id,
+                        datetime(2021, 1, 1, 9, 15, 2, tzinfo=timezone.utc),
+                    ],
+                )
+            other.commit()
+        finally:
+            other.close()
+
+        update_rollups()
+        update_rollups()
+        self.assertEqual(self.counts(), {("pageview", 15): 2})
+
+    def test_unused_sequence_value_is_not_pending(self):
+
+        event = self.create_event("pageview", 1)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT setval('events_event_id_seq', %s, false)", [event.id + 1]
+            )
+
+        update_rollups()
+
+        self.assertEqual(
+            RollupWatermark.objects.get(name=WATERMARK).pending_event_id, event.id
+        )
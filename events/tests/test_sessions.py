@@ -0,0 +1,99 @@
+from datetime import datetime
+from unittest import TestCase
+from uuid import uuid4
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from django.utils import timezone
+
+from events.ingest import persist_events
+from events.models import Application, Event, Session
+from events.sessions import ensure_sessions, session_cache
+
+
+class EnsureSessionsTestCase(TestCase):
+    def setUp(self) -> None:
+        self.application = Application.objects.create(name='Sessions Application')
+        session_cache.clear()
+
+    def tearDown(self) -> None:
+
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def test_ensure_sessions_creates_missing_sessions(self):
+
+        session_ids = [uuid4(), uuid4()]
+
+        ensure_sessions((self.application.id, session_id) for session_id in session_ids)
+
+        self.assertEqual(
+            Session.objects.filter(application=self.application).count(), 2
+        )
+
+    def test_ensure_sessions_does_not_fail_on_existing_session(self):
+
+        session = Session.objects.create(application=self.application)
+
+        ensure_sessions([(self.application.id, str(session.id))])
+
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_cached_session_does_not_hit_the_database(self):
+
+        session_id = str(uuid4())
+        ensure_sessions([(self.application.id, session_id)])
+
+        with CaptureQueriesContext(connection) as queries:
+            ensure_sessions([(self.application.id, session_id)])
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(session_cache.stats()["hits"], 1)
+
+    def test_deleted_session_is_removed_from_cache(self):
+
+        session_id = uuid4()
+        ensure_sessions([(self.application.id, session_id)])
+
+        Session.objects.filter(id=session_id).delete()
+        ensure_sessions([(self.application.id, session_id)])
+
+        self.assertTrue(Session.objects.filter(id=session_id).exists())
+
+    def test_session_of_another_application_is_not_cached(self):
+
+        other = Application.objects.create(name='Other Application')
+        session = Session.objects.create(application=other)
+
+        ensure_sessions([(self.application.id, session.id)])
+
+        self.assertIsNone(session_cache.get((self.application.id, session.id)))
+
+    def test_session_deleted_by_another_process_is_created_again(self):
+
+        session_id = uuid4()
+        ensure_sessions([(self.application.id, session_id)])
+
+        # Another process deleted it, the cache of this one doesn't know.
+        Session.objects.filter(id=session_id).delete()
+        session_cache.set((self.application.id, session_id), True)
+
+        persist_events(
+            [
+                (
+                    self.application.id,
+                    {
+                        "session_id": str(session_id),
+                        "category": "page interaction",
+                        "name": "pageview",
+                        "data": {"path": "/"},
+                        "timestamp": timezone.make_aware(datetime(2021, 1, 1, 9, 15)),
+                    },
+                )
+            ]
+        )
+
+        self.assertTrue(Session.objects.filter(id=session_id).exists())
+        self.assertEqual(Event.objects.filter(session_id=session_id).count(), 1)
@@ -0,0 +1,268 @@
+import errno
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import TestCase, mock
+from uuid import uuid4
+
+from django.test import override_settings
+
+from events.ingest import SpoolUnavailable, submit_events
+from events.models import Application, Event, Session
+from events.sessions import session_cache
+from events.spool import (
+    Spool,
+    SpoolDrainer,
+    claimable_segments,
+    get_spool,
+    read_segment,
+    spool_stats,
+)
+
+
+class SpoolTestCase(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.application = Application.objects.create(name='Spool Application')
+        self.session_id = str(uuid4())
+        session_cache.clear()
+
+    def tearDown(self) -> None:
+
+        self.directory.cleanup()
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def event(self, name="pageview"):
+        return [
+            self.session_id,
+            "page interaction",
+            name,
+            {"host": "www.consumeraffairs.com", "path": "/"},
+            "2021-01-01T09:15:27.243860+00:00",
+        ]
+
+    def spool(self, **kwargs):
+        return Spool(directory=self.directory.name, fsync_interval=0, **kwargs)
+
+    def drainer(self):
+        return SpoolDrainer(directory=self.directory.name, target="database")
+
+    def segments(self):
+        return sorted(os.listdir(self.directory.name))
+
+    def test_closed_segments_are_drained_to_the_database(self):
+
+        spool = self.spool(segment_bytes=1)
+        spool.append(self.application.id, [self.event(), self.event("cta click")])
+        spool.append(self.application.id, [self.event("scroll")])
+
+        self.assertEqual(len(self.segments()), 2)
+        self.assertTrue(all(name.endswith(".ready") for name in self.segments()))
+
+        self.assertEqual(self.drainer().drain(), 3)
+        self.assertEqual(self.segments(), [])
+        self.assertEqual(
+            Event.objects.filter(
+                application=self.application, session_id=self.session_id
+            ).count(),
+            3,
+        )
+
+    def test_open_segment_is_only_drained_once_closed(self):
+
+        spool = self.spool()
+        spool.append(self.application.id, [self.event()])
+
+        self.assertEqual(self.drainer().drain(), 0)
+
+        spool.close()
+        self.assertEqual(self.drainer().drain(), 1)
+
+    def test_segments_nobody_holds_are_recovered(self):
+
+        # The PID in the name doesn't matter, even a running one.
+        for state in ("open", f"draining-{os.getpid()}"):
+            path = os.path.join(
+                self.directory.name, f"0000000000001-{os.getpid()}-1.{state}"
+            )
+            with open(path, "w") as segment:
+                segment.write(
+                    json.dumps([self.application.id, [self.event(state)]]) + "\n"
+                )
+
+            self.assertEqual(claimable_segments(self.directory.name), [path])
+            self.assertEqual(self.drainer().drain(), 1)
+
+        self.assertEqual(Event.objects.filter(session_id=self.session_id).count(), 2)
+
+    def test_segments_locked_by_another_process_are_left_alone(self):
+
+        path = os.path.join(self.directory.name, "0000000000001-1-1.open")
+        with open(path, "w") as segment:
+            segment.write(json.dumps([self.application.id, [self.event()]]) + "\n")
+
+        holder = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "import fcntl, sys; segment = open(sys.argv[1]); "
+                "fcntl.flock(segment, fcntl.LOCK_EX); print(flush=True); sys.stdin.read()",
+                path,
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        try:
+            holder.stdout.readline()
+
+            self.assertEqual(claimable_segments(self.directory.name), [])
+            self.assertEqual(self.drainer().drain(), 0)
+        finally:
+            holder.communicate()
+
+        self.assertEqual(self.drainer().drain(), 1)
+
+    def test_append_returns_once_synced(self):
+
+        spool = Spool(directory=self.directory.name, fsync_interval=50)
+
+        with mock.patch('events.spool.os.fsync', wraps=os.fsync) as fsync:
+            spool.append(self.application.id, [self.event()])
+            self.assertIn(mock.call(spool._fd), fsync.call_args_list)
+
+        spool.close()
+
+    def test_failed_fsync_is_raised_to_waiting_appends(self):
+
+        spool = Spool(directory=self.directory.name, fsync_interval=10)
+        spool.append(self.application.id, [self.event()])
+
+        with mock.patch(
+            'events.spool.os.fsync', side_effect=OSError(errno.EIO, "I/O error")
+        ), self.assertLogs("events.spool", "ERROR"):
+            with self.assertRaises(OSError) as raised:
+                spool.append(self.application.id, [self.event()])
+
+        self.assertEqual(raised.exception.errno, errno.EIO)
+        spool.append(self.application.id, [self.event()])
+        spool.close()
+
+    def test_append_waits_up_to_the_sync_timeout(self):
+
+        spool = Spool(
+            directory=self.directory.name, fsync_interval=10_000, sync_timeout=20
+        )
+
+        with self.assertRaises(TimeoutError):
+            spool.append(self.application.id, [self.event()])
+        spool.close()
+
+    def test_short_writes_are_completed(self):
+
+        spool = self.spool()
+        write = os.write
+
+        with mock.patch(
+            'events.spool.os.write', side_effect=lambda fd, data: write(fd, data[:7])
+        ):
+            spool.append(self.application.id, [self.event()])
+        spool.append(self.application.id, [self.event("cta click")])
+        spool.close()
+
+        (segment,) = self.segments()
+        lines = list(read_segment(os.path.join(self.directory.name, segment)))
+        self.assertEqual(
+            [events[0][2] for _, events in lines], ["pageview", "cta click"]
+        )
+
+    def test_failed_writes_leave_no_torn_line(self):
+
+        spool = self.spool()
+        write = os.write
+        calls = []
+
+        def fail_after_first_chunk(fd, data):
+            calls.append(fd)
+            if len(calls) > 1:
+                raise OSError(errno.ENOSPC, "No space left on device")
+            return write(fd, data[:7])
+
+        with mock.patch('events.spool.os.write', side_effect=fail_after_first_chunk):
+            with self.assertRaises(OSError):
+                spool.append(self.application.id, [self.event()])
+        spool.append(self.application.id, [self.event("cta click")])
+        spool.close()
+
+        (segment,) = self.segments()
+        lines = list(read_segment(os.path.join(self.directory.name, segment)))
+        self.assertEqual([events[0][2] for _, events in lines], ["cta click"])
+
+    def test_spool_failures_return_service_unavailable(self):
+
+        settings = override_settings(
+            EVENTS_INGEST_BACKEND="spool", EVENTS_SPOOL_DIR=self.directory.name
+        )
+        with settings, mock.patch.object(Spool, 'append', side_effect=TimeoutError):
+            with self.assertLogs("events.ingest", "ERROR"):
+                with self.assertRaises(SpoolUnavailable) as raised:
+                    submit_events(self.application.id, [self.event()])
+
+        self.assertEqual(raised.exception.status_code, 503)
+
+    def test_old_segments_are_closed_without_fsync_interval(self):
+
+        spool = self.spool(segment_seconds=0.05)
+        spool.append(self.application.id, [self.event()])
+
+        for _ in range(50):
+            if self.segments()[0].endswith(".ready"):
+                break
+            time.sleep(0.02)
+
+        self.assertTrue(self.segments()[0].endswith(".ready"))
+
+    def test_torn_lines_are_skipped(self):
+
+        path = os.path.join(self.directory.name, "segment")
+        with open(path, "w") as segment:
+            segment.write(json.dumps([self.application.id, [self.event()]]) + "\n")
+            segment.write('[1, [["torn')
+
+        with self.assertLogs("events.spool", "WARNING"):
+            lines = list(read_segment(path))
+
+        self.assertEqual(lines, [(self.application.id, [self.event()])])
+
+    def test_stats_report_depth_and_age(self):
+
+        self.assertEqual(
+            spool_stats(self.directory.name),
+            {"segments": 0, "bytes": 0, "oldest_age_seconds": 0.0},
+        )
+
+        spool = self.spool()
+        spool.append(self.application.id, [self.event()])
+        stats = spool_stats(self.directory.name)
+
+        self.assertEqual(stats["segments"], 1)
+        self.assertGreater(stats["bytes"], 0)
+        self.assertGreaterEqual(stats["oldest_age_seconds"], 0)
+
+    def test_submit_events_appends_to_the_spool(self):
+
+        with override_settings(
+            EVENTS_INGEST_BACKEND="spool", EVENTS_SPOOL_DIR=self.directory.name
+        ):
+            submit_events(self.application.id, [self.event()])
+            get_spool().close()
+
+        [name] = self.segments()
+        self.assertEqual(
+            list(read_segment(os.path.join(self.directory.name, name))),
+            [(self.application.id, [self.event()])],
+        )
@@ -0,0 +1,94 @@
+from datetime import datetime
+from unittest import TestCase
+from uuid import uuid4
+
+from django.utils import timezone
+
+from events.models import Application, Event, Session
+from events.tasks import handle_event, handle_events
+from events.wire import encode_event
+
+
+class HandleEventsTestCase(TestCase):
+    def setUp(self) -> None:
+        self.application = Application.objects.create(name='Batch Application')
+
+    def tearDown(self) -> None:
+
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def test_handle_events_stores_whole_batch(self):
+
+        session_ids = [str(uuid4()), str(uuid4())]
+        payloads = [
+            {
+                "session_id": session_id,
+                "category": "page interaction",
+                "name": "pageview",
+                "data": {"host": "www.consumeraffairs.com", "path": "/"},
+                "timestamp": timestamp,
+            }
+            for session_id in session_ids
+            for timestamp in (
+                "2021-01-01T09:15:27.243860+00:00",
+                "2021-01-01T09:15:28.243860+00:00",
+            )
+        ]
+
+        handle_events(self.application.id, payloads)
+
+        self.assertEqual(Event.objects.count(), 4)
+        self.assertEqual(
+            Session.objects.filter(application=self.application).count(), 2
+        )
+
+    def test_handle_events_reuses_existing_sessions(self):
+
+        session = Session.objects.create(application=self.application)
+        payloads = [
+            {
+                "session_id": str(session.id),
+                "category": "page interaction",
+                "name": "pageview",
+                "data": {},
+                "timestamp": "2021-01-01T09:15:27.243860+00:00",
+            }
+        ]
+
+        handle_events(self.application.id, payloads)
+
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertEqual(Event.objects.filter(session=session).count(), 1)
+
+
+class HandleEventTestCase(TestCase):
+    def setUp(self) -> None:
+        self.application = Application.objects.create(name='Event Application')
+
+    def tearDown(self) -> None:
+
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def test_handle_event_stores_encoded_event(self):
+
+        timestamp = timezone.make_aware(
+            datetime.fromisoformat("2021-01-01 09:15:27.243860")
+        )
+        event = {
+            "session_id": uuid4(),
+            "category": "page interaction",
+            "name": "pageview",
+            "data": {"host": "www.consumeraffairs.com", "path": "/"},
+            "timestamp": timestamp,
+        }
+
+        handle_event(self.application.id, encode_event(event))
+
+        stored = Event.objects.get(session_id=event["session_id"])
+        self.assertEqual(stored.timestamp, timestamp)
+        self.assertEqual(stored.data, event["data"])
+        self.assertEqual(stored.application_id, self.application.id)
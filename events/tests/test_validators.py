@@ -0,0 +1,115 @@
+from datetime import timedelta
+from unittest import TestCase
+from uuid import uuid4
+
+from django.utils import timezone
+
+from events.serializers import EventSerializer
+from events.validators import EventListValidator, EventValidator
+
+
+VALID_EVENT = {
+    "session_id": "e2085be5-9137-4e4e-80b5-f1ffddc25423",
+    "category": "page interaction",
+    "name": "cta click",
+    "data": {"host": "www.consumeraffairs.com", "path": "/"},
+    "timestamp": "2021-01-01 09:15:27.243860",
+}
+
+
+class EventValidatorTestCase(TestCase):
+    def assertSameAsSerializer(self, data):
+        serializer = EventSerializer(data=data)
+        validator = EventValidator(data=data)
+
+        self.assertEqual(validator.is_valid(), serializer.is_valid())
+        self.assertEqual(validator.errors, serializer.errors)
+        self.assertEqual(
+            dict(validator.validated_data), dict(serializer.validated_data)
+        )
+
+    def test_valid_event(self):
+
+        self.assertSameAsSerializer(VALID_EVENT)
+        self.assertSameAsSerializer(
+            {**VALID_EVENT, "timestamp": "2021-01-01T09:15:27.243860+00:00"}
+        )
+        self.assertSameAsSerializer({**VALID_EVENT, "category": "  padded  "})
+        self.assertSameAsSerializer({**VALID_EVENT, "name": 12, "data": []})
+
+    def test_missing_and_null_fields(self):
+
+        self.assertSameAsSerializer({})
+        self.assertSameAsSerializer({field: None for field in VALID_EVENT})
+
+    def test_invalid_fields(self):
+
+        self.assertSameAsSerializer(
+            {
+                "session_id": "not a uuid",
+                "category": "   ",
+                "name": {"a": "dict"},
+                "data": {},
+                "timestamp": "yesterday",
+            }
+        )
+        self.assertSameAsSerializer(
+            {
+                **VALID_EVENT,
+                "session_id": ["list"],
+                "category": "x" * 101,
+                "name": "null\x00character",
+                "timestamp": 1234,
+            }
+        )
+
+    def test_event_id(self):
+
+        self.assertSameAsSerializer({**VALID_EVENT, "event_id": " retried-1 "})
+        self.assertSameAsSerializer({**VALID_EVENT, "event_id": None})
+        self.assertSameAsSerializer({**VALID_EVENT, "event_id": ""})
+        self.assertSameAsSerializer({**VALID_EVENT, "event_id": "x" * 65})
+        self.assertSameAsSerializer({**VALID_EVENT, "event_id": "x" * 101})
+
+    def test_future_dated_timestamp(self):
+
+        self.assertSameAsSerializer(
+            {**VALID_EVENT, "timestamp": timezone.localtime() + timedelta(hours=1)}
+        )
+
+    def test_out_of_range_timestamp(self):
+
+        self.assertSameAsSerializer(
+            {**VALID_EVENT, "timestamp": "0001-01-01T00:00:00+00:00"}
+        )
+
+    def test_invalid_payload_type(self):
+
+        self.assertSameAsSerializer(["not", "a", "dict"])
+
+
+class EventListValidatorTestCase(TestCase):
+    def assertSameAsSerializer(self, data, max_length=None):
+        serializer = EventSerializer(
+            data=data, many=True, allow_empty=False, max_length=max_length
+        )
+        validator = EventListValidator(data=data, max_length=max_length)
+
+        self.assertEqual(validator.is_valid(), serializer.is_valid())
+        self.assertEqual(validator.errors, serializer.errors)
+
+    def test_valid_list(self):
+
+        events = [{**VALID_EVENT, "session_id": str(uuid4())} for _ in range(3)]
+
+        self.assertSameAsSerializer(events)
+
+    def test_invalid_item(self):
+
+        self.assertSameAsSerializer([VALID_EVENT, {**VALID_EVENT, "data": None}])
+
+    def test_invalid_lists(self):
+
+        self.assertSameAsSerializer({"not": "a list"})
+        self.assertSameAsSerializer([])
+        self.assertSameAsSerializer([VALID_EVENT] * 3, max_length=2)
@@ -1,11 +1,21 @@
+import json
+from datetime import datetime, timedelta
 from unittest import TestCase
+from urllib.parse import parse_qs, urlparse
 
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
 
-from events.models import Application
-from events.views import EventsView
+from events.models import Application, Event, EventRollup, RollupWatermark, Session
+from events.conditional import response_cache
+from events.rollups import update_rollups
+from events.views import EventsBatchView, EventStatsView, EventsView
 
 
 class EventViewTestCase(TestCase):
@@ -91,3 +101,396 @@ class EventViewTestCase(TestCase):
         response = self.view(request)
 
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class EventViewPaginationTestCase(TestCase):
+    def setUp(self) -> None:
+
+        self.application = Application.objects.create(name='Paginated Client')
+        self.session = Session.objects.create(application=self.application)
+        self.request_factory = APIRequestFactory()
+        self.view = EventsView.as_view()
+
+        timestamp = timezone.make_aware(
+            datetime.fromisoformat("2021-01-01 09:15:27.243860")
+        )
+        self.events = [
+            Event.objects.create(
+                application=self.application,
+                session=self.session,
+                category="page interaction",
+                name="pageview",
+                data={"path": f"/{index}"},
+                timestamp=timestamp + timedelta(seconds=index // 2),
+            )
+            for index in range(5)
+        ]
+
+    def tearDown(self) -> None:
+        self.application.delete()
+
+    def get(self, **params):
+        headers = {key: params.pop(key) for key in list(params) if key.isupper()}
+        request = self.request_factory.get(
+            reverse('events'), {"session_id": str(self.session.id), **params}, **headers
+        )
+        force_authenticate(request, user=self.application)
+
+        return self.view(request)
+
+    def test_pages_return_every_event_once_in_timestamp_order(self):
+
+        paths = []
+        params = {"limit": 2}
+        while True:
+            response = self.get(**params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            paths += [event["data"]["path"] for event in response.data["results"]]
+
+            if not response.data["next"]:
+                break
+
+            cursor = parse_qs(urlparse(response.data["next"]).query)["cursor"][0]
+            params = {"limit": 2, "cursor": cursor}
+
+        self.assertEqual(paths, [event.data["path"] for event in self.events])
+
+    def test_events_of_other_applications_are_not_returned(self):
+
+        other_application = Application.objects.create(name='Other Client')
+        Event.objects.create(
+            application=other_application,
+            session=Session.objects.create(application=other_application),
+            category="page interaction",
+            name="pageview",
+            data={},
+            timestamp=self.events[0].timestamp,
+        )
+
+        request = self.request_factory.get(reverse('events'), {"limit": 10})
+        force_authenticate(request, user=self.application)
+        response = self.view(request)
+        other_application.delete()
+
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_last_page_has_no_next_link(self):
+
+        response = self.get(limit=10)
+
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertIsNone(response.data["next"])
+
+    def test_ndjson_format_streams_every_event(self):
+
+        response = self.get(format="ndjson", limit=2)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)["data"]["path"] for line in lines],
+            [event.data["path"] for event in self.events],
+        )
+
+    def test_ndjson_export_is_pulled_from_a_thread_under_asgi(self):
+
+        request = AsyncRequestFactory().get(
+            reverse('events'), {"session_id": str(self.session.id), "format": "ndjson"}
+        )
+        force_authenticate(request, user=self.application)
+        response = self.view(request)
+
+        async def read(content):
+            return b"".join([chunk async for chunk in content])
+
+        self.assertTrue(response.is_async)
+        lines = async_to_sync(read)(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), len(self.events))
+
+    def test_ndjson_accept_header_streams_events(self):
+
+        request = self.request_factory.get(
+            reverse('events'),
+            {"session_id": str(self.session.id)},
+            HTTP_ACCEPT="application/x-ndjson",
+        )
+        force_authenticate(request, user=self.application)
+        response = self.view(request)
+
+        self.assertTrue(response.streaming)
+
+    def test_data_filter_returns_events_containing_it(self):
+
+        response = self.get(data=json.dumps({"path": "/3"}))
+
+        self.assertEqual(
+            [event["data"] for event in response.data["results"]], [{"path": "/3"}]
+        )
+
+    def test_data_filter_must_be_a_json_object(self):
+
+        for data in ("{not json", "[1]"):
+            response = self.get(data=data)
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unchanged_results_return_not_modified_response(self):
+
+        etag = self.get()["ETag"]
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_new_events_change_the_etag(self):
+
+        etag = self.get()["ETag"]
+        Event.objects.create(
+            application=self.application,
+            session=self.session,
+            category="page interaction",
+            name="pageview",
+            data={},
+            timestamp=self.events[0].timestamp,
+        )
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.data["results"]), 6)
+
+    def test_closed_time_ranges_are_served_from_cache(self):
+
+        response_cache.clear()
+        self.get(timestamp_before="2021-12-31T00:00:00Z")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(timestamp_before="2021-12-31T00:00:00Z")
+
+        # Only the watermark of the ETag is read.
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_closed_time_ranges_stay_cached_while_events_arrive(self):
+
+        response_cache.clear()
+        self.get(timestamp_before="2021-12-31T00:00:00Z")
+        Event.objects.create(
+            application=self.application,
+            session=self.session,
+            category="page interaction",
+            name="pageview",
+            data={},
+            timestamp=self.events[0].timestamp,
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(timestamp_before="2021-12-31T00:00:00Z")
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_new_events_in_open_time_ranges_skip_the_cache(self):
+
+        response_cache.clear()
+        self.get()
+        Event.objects.create(
+            application=self.application,
+            session=self.session,
+            category="page interaction",
+            name="pageview",
+            data={},
+            timestamp=self.events[0].timestamp,
+        )
+
+        response = self.get()
+
+        self.assertEqual(len(response.data["results"]), 6)
+
+    def test_invalid_cursor_returns_not_found_response(self):
+
+        response = self.get(cursor="not-a-cursor")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class EventStatsViewTestCase(TestCase):
+    def setUp(self) -> None:
+
+        RollupWatermark.objects.all().delete()
+        self.application = Application.objects.create(name='Stats Client')
+        self.session = Session.objects.create(application=self.application)
+        self.request_factory = APIRequestFactory()
+        self.view = EventStatsView.as_view()
+
+        for minute, name in ((0, "pageview"), (1, "pageview"), (59, "cta click")):
+            self.create_event(name, minute)
+
+    def tearDown(self) -> None:
+        EventRollup.objects.all().delete()
+        RollupWatermark.objects.all().delete()
+        self.application.delete()
+
+    def create_event(self, name, minute):
+        Event.objects.create(
+            application=self.application,
+            session=self.session,
+            category="page interaction",
+            name=name,
+            data={},
+            timestamp=timezone.make_aware(datetime(2021, 1, 1, 9, minute, 30)),
+        )
+
+    def get(self, **params):
+        request = self.request_factory.get(reverse('events-stats'), params)
+        force_authenticate(request, user=self.application)
+
+        return self.view(request)
+
+    def test_counts_events_per_bucket_and_group(self):
+
+        response = self.get(bucket="hour", group_by="name")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "bucket": "2021-01-01T09:00:00-08:00",
+                    "name": "cta click",
+                    "count": 1,
+                },
+                {"bucket": "2021-01-01T09:00:00-08:00", "name": "pageview", "count": 2},
+            ],
+        )
+
+    def test_minute_aligned_queries_read_rollups_and_recent_events(self):
+
+        update_rollups()
+        update_rollups()
+        self.create_event("pageview", 2)
+
+        response = self.get(
+            bucket="minute",
+            timestamp_after="2021-01-01T09:01:00-08:00",
+            timestamp_before="2021-01-01T09:59:00-08:00",
+        )
+
+        self.assertEqual(response.data["source"], "rollups")
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"bucket": "2021-01-01T09:01:00-08:00", "count": 1},
+                {"bucket": "2021-01-01T09:02:00-08:00", "count": 1},
+            ],
+        )
+
+    def test_session_filter_counts_events(self):
+
+        response = self.get(session_id=str(self.session.id), bucket="day")
+
+        self.assertEqual(response.data["source"], "events")
+        self.assertEqual(
+            response.data["results"],
+            [{"bucket": "2021-01-01T00:00:00-08:00", "count": 3}],
+        )
+
+    def test_rollups_keep_counting_removed_events(self):
+
+        update_rollups()
+        update_rollups()
+        Event.objects.filter(application=self.application, name="cta click").delete()
+
+        rollups = self.get(bucket="day")
+        events = self.get(session_id=str(self.session.id), bucket="day")
+
+        self.assertEqual(rollups.data["source"], "rollups")
+        self.assertEqual(rollups.data["results"][0]["count"], 3)
+        self.assertEqual(events.data["source"], "events")
+        self.assertEqual(events.data["results"][0]["count"], 2)
+
+    def test_invalid_parameters_return_bad_request_response(self):
+
+        response = self.get(bucket="week", group_by="session")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {"bucket", "group_by"})
+
+
+class EventsBatchViewTestCase(TestCase):
+    def setUp(self) -> None:
+
+        self.application = Application.objects.create(name='Batch Client')
+        self.request_factory = APIRequestFactory()
+        self.view = EventsBatchView.as_view()
+        self.event = {
+            "session_id": "e2085be5-9137-4e4e-80b5-f1ffddc25423",
+            "category": "page interaction",
+            "name": "cta click",
+            "data": {
+                "host": "www.consumeraffairs.com",
+                "path": "/",
+                "element": "chat bubble",
+            },
+            "timestamp": "2021-01-01 09:15:27.243860",
+        }
+
+    def tearDown(self) -> None:
+        self.application.delete()
+
+    def test_unauthenticated_post_request_return_forbidden_response(self):
+
+        request = self.request_factory.post(
+            reverse('events-batch'), data=[self.event], format="json"
+        )
+        response = self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_post_with_json_array_returns_no_content_response(self):
+
+        request = self.request_factory.post(
+            reverse('events-batch'), data=[self.event, self.event], format="json"
+        )
+        force_authenticate(request, user=self.application)
+        response = self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_post_with_ndjson_body_returns_no_content_response(self):
+
+        body = "\n".join(json.dumps(event) for event in [self.event, self.event])
+        request = self.request_factory.post(
+            reverse('events-batch'), data=body, content_type="application/x-ndjson"
+        )
+        force_authenticate(request, user=self.application)
+        response = self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_post_with_invalid_item_reports_errors_per_item(self):
+
+        invalid_event = {**self.event}
+        del invalid_event["data"]
+        request = self.request_factory.post(
+            reverse('events-batch'), data=[self.event, invalid_event], format="json"
+        )
+        force_authenticate(request, user=self.application)
+        response = self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("data", response.data[1])
+
+    def test_post_with_empty_batch_returns_bad_request_response(self):
+
+        request = self.request_factory.post(
+            reverse('events-batch'), data=[], format="json"
+        )
+        force_authenticate(request, user=self.application)
+        response = self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
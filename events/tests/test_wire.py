@@ -0,0 +1,44 @@
+from datetime import datetime
+from unittest import TestCase
+from uuid import uuid4
+
+from django.utils import timezone
+
+from events.wire import decode_event, encode_event
+
+
+class WireFormatTestCase(TestCase):
+    def test_encoded_event_decodes_to_the_same_event(self):
+
+        event = {
+            "session_id": uuid4(),
+            "category": "page interaction",
+            "name": "pageview",
+            "data": {"host": "www.consumeraffairs.com", "path": "/"},
+            "timestamp": timezone.make_aware(
+                datetime.fromisoformat("2021-01-01 09:15:27.243860")
+            ),
+        }
+
+        decoded = decode_event(encode_event(event))
+
+        self.assertEqual(decoded, {**event, "session_id": str(event["session_id"])})
+
+    def test_event_id_travels_as_uid(self):
+
+        event = {
+            "session_id": uuid4(),
+            "category": "page interaction",
+            "name": "pageview",
+            "data": {},
+            "timestamp": timezone.now(),
+            "event_id": "retried-1",
+        }
+
+        self.assertEqual(decode_event(encode_event(event))["uid"], "retried-1")
+
+    def test_legacy_dict_payload_is_decoded_as_is(self):
+
+        payload = {"session_id": str(uuid4()), "category": "page interaction"}
+
+        self.assertIs(decode_event(payload), payload)
@@ -0,0 +1,128 @@
+from concurrent.futures import Future
+from unittest import TestCase, mock
+from uuid import uuid4
+
+from django.db import IntegrityError
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from events.ingest import persist_events, submit_events
+from events.models import Application, Event, Session
+from events.sessions import session_cache
+from events.writer import EventWriter, close_writer, get_writer
+
+
+class EventWriterTestCase(TestCase):
+    def setUp(self) -> None:
+        self.application = Application.objects.create(name='Writer Application')
+        self.session_id = str(uuid4())
+        session_cache.clear()
+
+    def tearDown(self) -> None:
+
+        Event.objects.all().delete()
+        Session.objects.all().delete()
+        Application.objects.all().delete()
+
+    def event(self, timestamp="2021-01-01T09:15:27.243860+00:00"):
+        return [
+            self.session_id,
+            "page interaction",
+            "pageview",
+            {"host": "www.consumeraffairs.com", "path": "/"},
+            timestamp,
+        ]
+
+    def stored(self):
+        return Event.objects.filter(
+            application=self.application, session_id=self.session_id
+        ).count()
+
+    def test_submissions_are_committed_together(self):
+
+        writer = EventWriter(flush_interval=10_000, flush_size=3)
+
+        with mock.patch(
+            "events.writer.persist_events", wraps=persist_events
+        ) as persist:
+            futures = [
+                writer.submit(
+                    self.application.id,
+                    [self.event(), self.event("2021-01-01T09:15:28.243860+00:00")],
+                ),
+                writer.submit(
+                    self.application.id,
+                    [self.event("2021-01-01T09:15:29.243860+00:00")],
+                ),
+            ]
+            for future in futures:
+                future.result(timeout=5)
+            writer.close()
+
+        self.assertEqual(persist.call_count, 1)
+        self.assertEqual(self.stored(), 3)
+
+    def test_bad_submission_only_fails_itself(self):
+
+        writer = EventWriter(flush_interval=10_000, flush_size=2)
+
+        with self.assertLogs("events.writer", "ERROR"):
+            good = writer.submit(self.application.id, [self.event()])
+            bad = writer.submit(
+                self.application.id, [self.event("2090-01-01T00:00:00+00:00")]
+            )
+
+            self.assertIsNone(good.result(timeout=5))
+            self.assertIsInstance(bad.exception(timeout=5), IntegrityError)
+
+        writer.close()
+        self.assertEqual(self.stored(), 1)
+
+    def test_close_flushes_pending_events(self):
+
+        writer = EventWriter(flush_interval=10_000, flush_size=100)
+        future = writer.submit(self.application.id, [self.event()])
+        writer.close()
+
+        self.assertTrue(future.done())
+        self.assertEqual(self.stored(), 1)
+
+    def test_submit_events_waits_for_the_commit(self):
+
+        with override_settings(EVENTS_INGEST_BACKEND="direct"):
+            submit_events(self.application.id, [self.event()])
+            self.assertEqual(self.stored(), 1)
+
+        get_writer().close()
+
+    def test_commit_timeout_returns_service_unavailable(self):
+
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.application.auth_token.key}'
+        )
+        event = {
+            "session_id": self.session_id,
+            "category": "page interaction",
+            "name": "pageview",
+            "data": {"host": "www.consumeraffairs.com", "path": "/"},
+            "timestamp": "2021-01-01 09:15:27.243860",
+        }
+
+        with override_settings(
+            EVENTS_INGEST_BACKEND="direct", EVENTS_DIRECT_ACK_TIMEOUT_MS=10
+        ), mock.patch.object(EventWriter, 'submit', return_value=Future()):
+            response = client.post('/events/', event, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data["detail"].code, "commit_timeout")
+
+    def test_close_writer_flushes_the_writer_of_the_process(self):
+
+        with override_settings(EVENTS_DIRECT_SYNC_ACK=False):
+            future = get_writer().submit(self.application.id, [self.event()])
+        close_writer()
+
+        self.assertTrue(future.done())
+        self.assertEqual(self.stored(), 1)
@@ -0,0 +1,247 @@
+"""
+Validation of incoming events without the `ModelSerializer` machinery.
+
+`EventValidator` applies the rules of `EventSerializer` and reports the same
+error messages, it just does it with plain functions so the ingest path
+doesn't pay for field introspection on every event.
+"""
+import re
+import uuid
+from datetime import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.fields import ISO_8601
+from rest_framework.utils import humanize_datetime
+
+
+MAX_LENGTH = 100
+EVENT_ID_MAX_LENGTH = 64
+NON_FIELD_ERRORS = "non_field_errors"
+
+REQUIRED = ("This field is required.", "required")
+NULL = ("This field may not be null.", "null")
+INVALID_UUID = ("Must be a valid UUID.", "invalid")
+INVALID_STRING = ("Not a valid string.", "invalid")
+BLANK = ("This field may not be blank.", "blank")
+MAX_LENGTH_EXCEEDED = (
+    f"Ensure this field has no more than {MAX_LENGTH} characters.",
+    "max_length",
+)
+EVENT_ID_MAX_LENGTH_EXCEEDED = (
+    f"Ensure this field has no more than {EVENT_ID_MAX_LENGTH} characters.",
+    "max_length",
+)
+NULL_CHARACTERS = ("Null characters are not allowed.", "null_characters_not_allowed")
+INVALID_DATETIME = (
+    "Datetime has wrong format. Use one of these formats instead: "
+    f"{humanize_datetime.datetime_formats([ISO_8601])}.",
+    "invalid",
+)
+DATETIME_OVERFLOW = ("Datetime value out of range.", "overflow")
+FUTURE_TIMESTAMP = ("Event timestamp cannot be dated in the future.", "invalid")
+
+SURROGATE_CHARACTER = re.compile(r"[\ud800-\udfff]")
+
+
+class EventValidator:
+    """
+    Drop-in replacement of `EventSerializer(data=data)` for validation only.
+    """
+
+    def __init__(self, data, now=None):
+        self.initial_data = data
+        self.now = now
+
+    def is_valid(self) -> bool:
+        self.validated_data, self.errors = validate_event(
+            self.initial_data, self.now or timezone.now()
+        )
+
+        return not self.errors
+
+
+class EventListValidator:
+    """
+    Drop-in replacement of `EventSerializer(data=data, many=True,
+    allow_empty=False, max_length=max_length)` for validation only.
+    """
+
+    def __init__(self, data, max_length=None):
+        self.initial_data = data
+        self.max_length = max_length
+
+    def is_valid(self) -> bool:
+        data = self.initial_data
+        self.validated_data = []
+        self.errors = []
+
+        if not isinstance(data, list):
+            self.errors = _non_field_error(
+                f'Expected a list of items but got type "{type(data).__name__}".',
+                "not_a_list",
+            )
+        elif not data:
+            self.errors = _non_field_error("This list may not be empty.", "empty")
+        elif self.max_length is not None and len(data) > self.max_length:
+            self.errors = _non_field_error(
+                f"Ensure this field has no more than {self.max_length} elements.",
+                "max_length",
+            )
+        else:
+            now = timezone.now()
+            for item in data:
+                validated_data, errors = validate_event(item, now)
+                self.validated_data.append(validated_data)
+                self.errors.append(errors)
+
+            if not any(self.errors):
+                self.errors = []
+
+        if self.errors:
+            self.validated_data = []
+
+        return not self.errors
+
+
+def validate_event(data, now: datetime) -> tuple:
+    """
+    Returns the `(validated_data, errors)` of one event.
+    """
+    if not isinstance(data, dict):
+        return {}, _non_field_error(
+            f"Invalid data. Expected a dictionary, but got {type(data).__name__}.",
+            "invalid",
+        )
+
+    validated_data = {}
+    errors = {}
+
+    for field, validate in FIELD_VALIDATORS:
+        value = data.get(field)
+
+        if value is None:
+            error = NULL if field in data else REQUIRED
+            errors[field] = [ErrorDetail(*error)]
+            continue
+
+        field_errors = []
+        validated_data[field] = validate(value, field_errors)
+        if field_errors:
+            errors[field] = [ErrorDetail(*error) for error in field_errors]
+
+    # `event_id` is optional, events without one are told apart by their content.
+    if data.get("event_id") is not None:
+        field_errors = []
+        validated_data["event_id"] = _validate_event_id(data["event_id"], field_errors)
+        if field_errors:
+            errors["event_id"] = [ErrorDetail(*error) for error in field_errors]
+    elif "event_id" in data:
+        errors["event_id"] = [ErrorDetail(*NULL)]
+
+    if "timestamp" not in errors and validated_data["timestamp"] > now:
+        errors["timestamp"] = [ErrorDetail(*FUTURE_TIMESTAMP)]
+
+    if errors:
+        return {}, errors
+
+    return validated_data, {}
+
+
+def _validate_uuid(value, errors):
+    if isinstance(value, str):
+        try:
+            return uuid.UUID(hex=value)
+        except ValueError:
+            pass
+    elif isinstance(value, int):
+        try:
+            return uuid.UUID(int=value)
+        except ValueError:
+            pass
+
+    errors.append(INVALID_UUID)
+
+
+def _validate_string(value, errors):
+    if isinstance(value, str):
+        value = value.strip()
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    else:
+        errors.append(INVALID_STRING)
+        return
+
+    if not value:
+        errors.append(BLANK)
+        return
+
+    if len(value) > MAX_LENGTH:
+        errors.append(MAX_LENGTH_EXCEEDED)
+    if "\x00" in value:
+        errors.append(NULL_CHARACTERS)
+    if surrogate := SURROGATE_CHARACTER.search(value):
+        errors.append(
+            (
+                "Surrogate characters are not allowed: "
+                f"U+{ord(surrogate.group()):X}.",
+                "surrogate_characters_not_allowed",
+            )
+        )
+
+    return value
+
+
+def _validate_event_id(value, errors):
+    value = _validate_string(value, errors)
+
+    if value is not None and len(value) > EVENT_ID_MAX_LENGTH:
+        if MAX_LENGTH_EXCEEDED in errors:
+            errors.remove(MAX_LENGTH_EXCEEDED)
+        errors.insert(0, EVENT_ID_MAX_LENGTH_EXCEEDED)
+
+    return value
+
+
+def _validate_json(value, errors):
+    # Anything a JSON parser produced can be serialized back.
+    return value
+
+
+def _validate_datetime(value, errors):
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = parse_datetime(value)
+        except (TypeError, ValueError):
+            parsed = None
+
+    if parsed is None:
+        errors.append(INVALID_DATETIME)
+        return
+
+    # Same handling as `DateTimeField.enforce_timezone`.
+    current_timezone = timezone.get_current_timezone()
+    if timezone.is_aware(parsed):
+        try:
+            return parsed.astimezone(current_timezone)
+        except OverflowError:
+            errors.append(DATETIME_OVERFLOW)
+            return
+
+    return timezone.make_aware(parsed, current_timezone)
+
+
+def _non_field_error(message, code):
+    return {NON_FIELD_ERRORS: [ErrorDetail(message, code=code)]}
+
+
+FIELD_VALIDATORS = (
+    ("session_id", _validate_uuid),
+    ("category", _validate_string),
+    ("name", _validate_string),
+    ("data", _validate_json),
+    ("timestamp", _validate_datetime),
+)
@@ -1,36 +1,73 @@
+import json
+import time
+from functools import partial
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.dateparse import parse_datetime
+from django.views import View
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework import status
-from rest_framework.authentication import TokenAuthentication
+from prometheus_client import CONTENT_TYPE_LATEST
+from rest_framework import serializers, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .archive import archived_events, reaches_archive
+from .authentication import CachedTokenAuthentication
+from .conditional import events_etag, response_cache, response_cache_key
+from .ingest import submit_event, submit_events
+from .metrics import (
+    EVENTS_ACCEPTED,
+    ROWS_RETURNED,
+    SERIALIZATION_DURATION,
+    VALIDATION_FAILURES,
+    render_metrics,
+)
 from .models import Event
-from .serializers import EventSerializer
-from .tasks import handle_event
+from .pagination import EventCursorPagination
+from .parsers import FastJSONParser, NDJSONParser
+from .renderers import FastJSONRenderer, NDJSONRenderer, ndjson_streaming_response
+from .serializers import EventSerializer, EventStatsQuerySerializer
+from .stats import BUCKETS, count_events
+from .validators import EventListValidator, EventValidator
+from .wire import encode_event
 
 
 class EventsView(APIView):
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = EventCursorPagination
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer, NDJSONRenderer)
     serializer_class = EventSerializer
 
     @extend_schema(
         parameters=[
             OpenApiParameter("session_id", OpenApiTypes.UUID, OpenApiParameter.QUERY),
             OpenApiParameter("category", OpenApiTypes.STR, OpenApiParameter.QUERY),
+            OpenApiParameter(
+                "data",
+                OpenApiTypes.STR,
+                OpenApiParameter.QUERY,
+                description="JSON object contained in the event data.",
+            ),
             OpenApiParameter(
                 "timestamp_before", OpenApiTypes.DATETIME, OpenApiParameter.QUERY
             ),
             OpenApiParameter(
                 "timestamp_after", OpenApiTypes.DATETIME, OpenApiParameter.QUERY
             ),
+            OpenApiParameter("limit", OpenApiTypes.INT, OpenApiParameter.QUERY),
+            OpenApiParameter("cursor", OpenApiTypes.STR, OpenApiParameter.QUERY),
         ],
     )
     def get(self, request):
-        lookups = {}
+        lookups = {"application": request.user}
         params = request.query_params.copy()
 
         if session_id := params.get("session_id"):
@@ -39,28 +76,190 @@ class EventsView(APIView):
         if category := params.get("category"):
             lookups["category"] = category
 
+        if data := params.get("data"):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                data = None
+
+            if not isinstance(data, dict):
+                return Response(
+                    {"data": ["Must be a JSON object."]},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            # Served by the jsonb_path_ops GIN index on `data`.
+            lookups["data__contains"] = data
+
         if before := params.get("timestamp_before"):
             lookups["timestamp__lt"] = before
 
         if after := params.get("timestamp_after"):
             lookups["timestamp__gte"] = after
 
+        etag = quote_etag(events_etag(request))
+        if not_modified := get_conditional_response(request, etag=etag):
+            return not_modified
+
         events = Event.objects.filter(**lookups)
 
-        serializer = self.serializer_class(events, many=True, read_only=True)
+        # Ranges starting before the hot window also read the archived events.
+        archived = None
+        after = _parse_timestamp(params.get("timestamp_after"))
+        if reaches_archive(request.user.id, after):
+            archived = partial(
+                archived_events,
+                request.user.id,
+                session_id=params.get("session_id") or None,
+                category=params.get("category") or None,
+                data=lookups.get("data__contains"),
+                after=after,
+                before=_parse_timestamp(params.get("timestamp_before")),
+            )
+
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            # Exports stream every matching event instead of paginating.
+            response = ndjson_streaming_response(
+                request,
+                events.order_by("timestamp", "id"),
+                settings.EVENTS_EXPORT_CHUNK_SIZE,
+                archived() if archived else None,
+            )
+            response["ETag"] = etag
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+            return response
+
+        cache_key = response_cache_key(request, etag)
+        data = response_cache.get(cache_key)
+
+        if data is None:
+            paginator = self.pagination_class()
+            page = paginator.paginate_queryset(
+                events, request, view=self, archived=archived
+            )
+            started = time.perf_counter()
+            serializer = self.serializer_class(page, many=True, read_only=True)
+            data = paginator.get_paginated_response(serializer.data).data
+
+            renderer_format = request.accepted_renderer.format
+            SERIALIZATION_DURATION.labels(renderer_format).observe(
+                time.perf_counter() - started
+            )
+            ROWS_RETURNED.labels(renderer_format).observe(len(page))
+
+            response_cache.set(cache_key, data)
+
+        return Response(data, headers={"ETag": etag})
 
     def post(self, request):
         data = request.data.copy()
         application_id = request.user.id
-        serializer = self.serializer_class(
-            data=data, context={"application_id": application_id}
+        validator = EventValidator(data=data)
+
+        if validator.is_valid():
+            submit_event(application_id, encode_event(validator.validated_data))
+            EVENTS_ACCEPTED.labels("events").inc()
+
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        VALIDATION_FAILURES.labels("events").inc()
+
+        return Response(validator.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _parse_timestamp(value):
+    try:
+        timestamp = parse_datetime(value or "")
+    except ValueError:
+        return None
+
+    if timestamp is not None and timezone.is_naive(timestamp):
+        return timezone.make_aware(timestamp)
+
+    return timestamp
+
+
+class EventStatsView(APIView):
+
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    serializer_class = EventStatsQuerySerializer
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("session_id", OpenApiTypes.UUID, OpenApiParameter.QUERY),
+            OpenApiParameter("category", OpenApiTypes.STR, OpenApiParameter.QUERY),
+            OpenApiParameter(
+                "timestamp_before", OpenApiTypes.DATETIME, OpenApiParameter.QUERY
+            ),
+            OpenApiParameter(
+                "timestamp_after", OpenApiTypes.DATETIME, OpenApiParameter.QUERY
+            ),
+            OpenApiParameter(
+                "bucket", OpenApiTypes.STR, OpenApiParameter.QUERY, enum=BUCKETS
+            ),
+            OpenApiParameter(
+                "group_by",
+                OpenApiTypes.STR,
+                OpenApiParameter.QUERY,
+                description="Comma separated list of category and name.",
+            ),
+        ],
+    )
+    def get(self, request):
+        query = self.serializer_class(data=request.query_params)
+
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        params = query.validated_data
+        filters = {
+            "session_id": params.get("session_id"),
+            "category": params.get("category"),
+            "after": params.get("timestamp_after"),
+            "before": params.get("timestamp_before"),
+        }
+        source, rows = count_events(
+            request.user.id, filters, params["bucket"], params.get("group_by", [])
+        )
+
+        timestamp_field = serializers.DateTimeField()
+        for row in rows:
+            row["bucket"] = timestamp_field.to_representation(row["bucket"])
+
+        return Response({"bucket": params["bucket"], "source": source, "results": rows})
+
+
+class EventsBatchView(APIView):
+
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (FastJSONParser, NDJSONParser)
+    serializer_class = EventSerializer
+
+    @extend_schema(request=EventSerializer(many=True))
+    def post(self, request):
+        application_id = request.user.id
+        validator = EventListValidator(
+            data=request.data, max_length=settings.EVENTS_BATCH_MAX_SIZE
         )
 
-        if serializer.is_valid():
-            handle_event.delay(application_id, data)
+        if validator.is_valid():
+            events = [encode_event(event) for event in validator.validated_data]
+            submit_events(application_id, events)
+            EVENTS_ACCEPTED.labels("events-batch").inc(len(events))
 
             return Response(status=status.HTTP_204_NO_CONTENT)
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        VALIDATION_FAILURES.labels("events-batch").inc()
+
+        return Response(validator.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class MetricsView(View):
+    """
+    Prometheus metrics, see `events.metrics`.
+    """
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
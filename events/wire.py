@@ -0,0 +1,44 @@
+"""
+Compact format of the events sent through the broker.
+
+A validated event travels as a positional list in the order of `FIELDS`
+instead of a dict, so messages don't repeat the key names. `uid` is the
+`event_id` of the event, if any. Otherwise it's left to the worker to hash the
+event, see `events.dedup`.
+"""
+from datetime import datetime
+
+
+FIELDS = ("session_id", "category", "name", "data", "timestamp", "uid")
+
+
+def encode_event(event: dict) -> list:
+    return [
+        str(event["session_id"]),
+        event["category"],
+        event["name"],
+        event["data"],
+        event["timestamp"].isoformat(),
+        event.get("event_id"),
+    ]
+
+
+def decode_event(event) -> dict:
+    # Messages published before the compact format carry the request dict.
+    if isinstance(event, dict):
+        return event
+
+    # Messages published before events had a `uid` have five fields.
+    session_id, category, name, data, timestamp, *uid = event
+
+    payload = {
+        "session_id": session_id,
+        "category": category,
+        "name": name,
+        "data": data,
+        "timestamp": datetime.fromisoformat(timestamp),
+    }
+    if uid and uid[0]:
+        payload["uid"] = uid[0]
+
+    return payload
@@ -0,0 +1,182 @@
+"""
+In-process group commit for EVENTS_INGEST_BACKEND=direct.
+
+The views hand accepted events to the `EventWriter` of their process instead
+of the broker. A writer thread stores everything submitted within
+EVENTS_DIRECT_FLUSH_INTERVAL_MS milliseconds, or up to EVENTS_DIRECT_FLUSH_SIZE
+events, in a single transaction, so concurrent requests share one commit.
+
+Each submission gets a `Future` resolved once its events are committed. With
+EVENTS_DIRECT_SYNC_ACK the request waits for it, otherwise it is answered right
+away and events still queued when the process dies are lost. Pending events
+are flushed by `close_writer`, called when a gunicorn worker exits (see
+`deployment/gunicorn.conf.py`) and, as a fallback, at exit.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection
+
+from events.ingest import persist_events
+from events.wire import decode_event
+
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class EventWriter:
+    def __init__(self, flush_interval=None, flush_size=None):
+        self.flush_interval = (
+            flush_interval or settings.EVENTS_DIRECT_FLUSH_INTERVAL_MS
+        ) / 1000
+        self.flush_size = flush_size or settings.EVENTS_DIRECT_FLUSH_SIZE
+        self.pid = os.getpid()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, application_id: int, events: list) -> Future:
+        """
+        Queues wire encoded events of an application, returning a `Future`
+        resolved once they're committed.
+        """
+        future = Future()
+        self._start()
+        self._queue.put((application_id, events, future))
+
+        return future
+
+    def close(self):
+        """
+        Stores the events queued so far and stops the writer thread.
+        """
+        with self._lock:
+            if self._thread is None:
+                return
+
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                pending, stop = self._collect()
+                if pending:
+                    self.flush(pending)
+
+                if stop:
+                    break
+        finally:
+            # The thread owns its connection, nothing else would close it.
+            connection.close()
+
+    def _collect(self):
+        """
+        Waits for a first submission, then gathers more until `flush_size`
+        events are pending or `flush_interval` has passed since the first one.
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+
+        pending = [item]
+        size = len(item[1])
+        deadline = time.monotonic() + self.flush_interval
+
+        while size < self.flush_size:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+
+            if item is _STOP:
+                return pending, True
+
+            pending.append(item)
+            size += len(item[1])
+
+        return pending, False
+
+    def flush(self, pending: list):
+        try:
+            persist_events(
+                [
+                    (application_id, decode_event(event))
+                    for application_id, events, _ in pending
+                    for event in events
+                ]
+            )
+        except (InterfaceError, OperationalError) as error:
+            # The database is unavailable, fail the batch and drop the
+            # connection so that the next one reconnects.
+            logger.exception("Could not store a batch of %d submissions", len(pending))
+            connection.close()
+            for _, _, future in pending:
+                future.set_exception(error)
+        except Exception:
+            # Something in the batch can't be stored, retry the submissions one
+            # by one so a single bad event doesn't fail the rest.
+            self._flush_individually(pending)
+        else:
+            for _, _, future in pending:
+                future.set_result(None)
+
+    def _flush_individually(self, pending):
+        for application_id, events, future in pending:
+            try:
+                persist_events(
+                    [(application_id, decode_event(event)) for event in events]
+                )
+            except Exception as error:
+                logger.exception("Could not store events of %s", application_id)
+                if isinstance(error, (InterfaceError, OperationalError)):
+                    connection.close()
+                future.set_exception(error)
+            else:
+                future.set_result(None)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> EventWriter:
+    """
+    Returns the writer of the current process, creating it on first use (and
+    again after a fork, since threads don't survive it).
+    """
+    global _writer
+
+    with _writer_lock:
+        if _writer is None or _writer.pid != os.getpid():
+            _writer = EventWriter()
+            atexit.register(_writer.close)
+
+        return _writer
+
+
+def close_writer():
+    """
+    Stores the events still queued by the writer of the current process, if
+    it has one, and stops it.
+    """
+    with _writer_lock:
+        writer = _writer if _writer is not None and _writer.pid == os.getpid() else None
+
+    if writer is not None:
+        writer.close()
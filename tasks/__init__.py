@@ -82,6 +82,47 @@ def black(ctx, check=False, run_in_docker=True):
     ctx.run(cmd)
 
 
+@task
+def bench(
+    ctx,
+    duration=30,
+    connections=32,
+    batch_size=1,
+    workers=2,
+    gzip=False,
+    output="bench_output.json",
+    run_in_docker=True,
+):
+    """
+    Run the ingestion load benchmark and write its results as JSON.
+    """
+    cmd = " ".join(
+        [
+            "python -m deployment.bench",
+            f"--duration {duration}",
+            f"--connections {connections}",
+            f"--batch-size {batch_size}",
+            f"--workers {workers}",
+            f"--output {output}",
+        ]
+        + (["--gzip"] if gzip else [])
+    )
+
+    _maybe_bring_up_detached_compose_cluster(ctx, run_in_docker)
+    ctx.run(_maybe_get_dockerized_command(cmd, run_in_docker))
+
+
+@task
+def profile_report(ctx, sort="tottime", limit=30, run_in_docker=True):
+    """
+    Rank the hottest functions across the collected request profiles.
+    """
+    cmd = f"python manage.py profile_report --sort {sort} --limit {limit}"
+
+    _maybe_bring_up_detached_compose_cluster(ctx, run_in_docker)
+    ctx.run(_maybe_get_dockerized_command(cmd, run_in_docker))
+
+
 @task
 def build(ctx):
     """
@@ -206,6 +247,8 @@ def run(ctx, run_in_docker=True):
 
     uvicorn_cmd = " ".join(
         [
+            # Samples of the previous run would be added to this one's.
+            'rm -rf "${PROMETHEUS_MULTIPROC_DIR:-/nonexistent}"/* ;',
             "uvicorn the_eye.asgi:application",
             "--host 0.0.0.0",
             "--port 8001",
@@ -0,0 +1,7 @@
+from .settings import *
+
+
+# Settings used by `invoke bench`, see `deployment/bench.py`. The benchmark
+# talks to the same Postgres and RabbitMQ as the development cluster.
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
@@ -0,0 +1,5 @@
+"""
+PostgreSQL backend that keeps connections open in a per-process pool, use it
+with `"ENGINE": "the_eye.db.pooled"` and configure it with the `POOL` key of
+the database settings.
+"""
@@ -0,0 +1,42 @@
+from django.db.backends.postgresql import base, creation
+
+from .pool import close_pools, get_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # PostgreSQL refuses to drop a database with open connections.
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Checks connections out of a per-process pool instead of opening them, and
+    gives them back when Django closes them, e.g. at the end of every request
+    or Celery task. Each thread still uses its own connection, so connections
+    are never shared by the threads `async_to_sync` and `sync_to_async` hop
+    between.
+    """
+
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        return get_pool(
+            self.alias, self.get_connection_params(), self.settings_dict.get("POOL")
+        )
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        connection = self.pool.getconn(lambda: connect(conn_params))
+        self.isolation_level = connection.isolation_level
+
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # A connection closed inside an atomic block stays attached to
+                # this wrapper until the block ends, it can't be reused.
+                self.pool.putconn(self.connection, close=self.in_atomic_block)
@@ -0,0 +1,310 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Connections kept open, opened again on checkout whenever fewer are.
+    "MIN_SIZE": 1,
+    # Connections kept open once they're returned.
+    "MAX_SIZE": 10,
+    # Extra connections opened when every kept one is in use, closed on return.
+    "MAX_OVERFLOW": 10,
+    # Seconds after which a connection is closed instead of reused.
+    "MAX_LIFETIME": 30 * 60,
+    # Seconds to wait for a connection when MAX_SIZE + MAX_OVERFLOW are in use.
+    "TIMEOUT": 30,
+    # Connections idle for longer than this many seconds are pinged on checkout.
+    "CHECK_IDLE": 10,
+}
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of psycopg2 connections.
+
+    Checked out connections are validated first: closed, expired or not idle
+    connections are replaced, and those idle for longer than `CHECK_IDLE`
+    seconds have to answer a `SELECT 1`. Returned connections are rolled back
+    if they're still in a transaction.
+    """
+
+    def __init__(self, options=None, database=None):
+        options = {**DEFAULTS, **(options or {})}
+        self.database = database
+        self.min_size = options["MIN_SIZE"]
+        self.max_size = options["MAX_SIZE"]
+        self.max_overflow = options["MAX_OVERFLOW"]
+        self.max_lifetime = options["MAX_LIFETIME"]
+        self.timeout = options["TIMEOUT"]
+        self.check_idle = options["CHECK_IDLE"]
+
+        self._idle = deque()
+        self._created = {}
+        self._open = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.discarded = 0
+
+    def getconn(self, connect):
+        """
+        Checks out a connection, opening one with `connect()` when none is idle.
+        """
+        started = time.monotonic()
+        self._fill(connect)
+
+        while True:
+            connection, returned_at = self._reserve(started + self.timeout)
+
+            if connection is None:
+                connection = self._connect(connect)
+                break
+
+            if self._is_healthy(connection, returned_at):
+                break
+
+            self._discard(connection)
+
+        waited = time.monotonic() - started
+        with self._condition:
+            self.checkouts += 1
+            if waited >= 0.001:
+                self.waits += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        return connection
+
+    def putconn(self, connection, close=False):
+        """
+        Returns a checked out connection, closing it when `close` is true, when
+        it expired or when the pool already keeps MAX_SIZE connections.
+        """
+        if connection not in self._created:
+            # Not ours, e.g. inherited from the parent process.
+            connection.close()
+            return
+
+        keep = not close and not connection.closed and not self._is_expired(connection)
+
+        if keep:
+            try:
+                status = connection.get_transaction_status()
+                if status == TRANSACTION_STATUS_UNKNOWN:
+                    keep = False
+                elif status != TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except psycopg2.Error:
+                keep = False
+
+        with self._condition:
+            self._in_use -= 1
+
+            if keep and self._open <= self.max_size:
+                self._idle.append((connection, time.monotonic()))
+                self._condition.notify()
+                return
+
+        self._discard(connection, checked_out=False)
+
+    def close(self):
+        """
+        Closes the idle connections.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+
+        for connection, _ in idle:
+            with self._condition:
+                self._in_use += 1
+            self._discard(connection)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "size": self._open,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "overflow": max(self._open - self.max_size, 0),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 6),
+                "max_wait_seconds": round(self.max_wait_seconds, 6),
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+            }
+
+    def _fill(self, connect):
+        """
+        Opens the connections missing to keep MIN_SIZE open, e.g. after some
+        were discarded or failed to open. Failures are logged and retried on
+        the next checkout.
+        """
+        if self._open >= self.min_size:
+            return
+
+        with self._condition:
+            missing = max(self.min_size - self._open, 0)
+            self._open += missing
+
+        for _ in range(missing):
+            try:
+                connection = connect()
+            except psycopg2.Error:
+                logger.exception("Could not open a pooled connection")
+                with self._condition:
+                    self._open -= 1
+                    self._condition.notify()
+                continue
+
+            with self._condition:
+                self._created[connection] = time.monotonic()
+                self._idle.append((connection, time.monotonic()))
+                self._condition.notify()
+
+    def _reserve(self, deadline):
+        """
+        Takes the most recently returned idle connection with the time it was
+        returned, or returns `(None, None)` when the caller may open a new one.
+        Waits until `deadline` otherwise.
+        """
+        with self._condition:
+            while True:
+                if self._idle:
+                    self._in_use += 1
+                    return self._idle.pop()
+
+                if self._open < self.max_size + self.max_overflow:
+                    self._open += 1
+                    self._in_use += 1
+                    return None, None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available after {self.timeout}s"
+                    )
+
+                self._condition.wait(remaining)
+
+    def _connect(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self._open -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._created[connection] = time.monotonic()
+
+        return connection
+
+    def _is_expired(self, connection) -> bool:
+        return time.monotonic() - self._created[connection] >= self.max_lifetime
+
+    def _is_healthy(self, connection, returned_at) -> bool:
+        if connection.closed or self._is_expired(connection):
+            return False
+
+        try:
+            if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                return False
+
+            if time.monotonic() - returned_at >= self.check_idle:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+        except psycopg2.Error:
+            return False
+
+        return True
+
+    def _discard(self, connection, checked_out=True):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+        with self._condition:
+            self._created.pop(connection, None)
+            self._open -= 1
+            if checked_out:
+                self._in_use -= 1
+            self.discarded += 1
+            self._condition.notify()
+
+
+# Pools by (pid, alias, connection parameters). Pools of a parent process are
+# kept referenced, as closing their connections would close them for the
+# parent too.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, options) -> ConnectionPool:
+    key = (os.getpid(), alias, repr(sorted(conn_params.items())))
+
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(options, conn_params.get("database"))
+
+        return _pools[key]
+
+
+def pool_stats() -> dict:
+    """
+    Returns the stats of the pools of the current process by database alias.
+    """
+    pid = os.getpid()
+    stats = {}
+
+    with _pools_lock:
+        pools = [(key[1], pool) for key, pool in _pools.items() if key[0] == pid]
+
+    for alias, pool in pools:
+        totals = stats.setdefault(alias, {})
+        for name, value in pool.stats().items():
+            if name == "max_wait_seconds":
+                totals[name] = max(totals.get(name, 0), value)
+            else:
+                totals[name] = totals.get(name, 0) + value
+
+    return stats
+
+
+def close_pools(database=None):
+    """
+    Closes the idle connections of the current process, only the ones to
+    `database` when given.
+    """
+    pid = os.getpid()
+
+    with _pools_lock:
+        pools = [
+            pool
+            for (key_pid, _, _), pool in _pools.items()
+            if key_pid == pid and database in (None, pool.database)
+        ]
+
+    for pool in pools:
+        pool.close()
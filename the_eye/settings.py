@@ -50,6 +50,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "events.middleware.MetricsMiddleware",
+    "events.middleware.ProfilingMiddleware",
+    "django.middleware.gzip.GZipMiddleware",
+    "events.middleware.RequestDecompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -85,12 +89,21 @@ WSGI_APPLICATION = "the_eye.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # PostgreSQL with a per-process connection pool, see `the_eye.db.pooled`.
+        "ENGINE": "the_eye.db.pooled",
         "NAME": os.environ.get("POSTGRES_DB"),
         "USER": os.environ.get("POSTGRES_USER"),
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
         "PORT": "5432",
         "HOST": "postgres",
+        "POOL": {
+            "MIN_SIZE": int(os.environ.get("POSTGRES_POOL_MIN_SIZE", 1)),
+            "MAX_SIZE": int(os.environ.get("POSTGRES_POOL_MAX_SIZE", 10)),
+            "MAX_OVERFLOW": int(os.environ.get("POSTGRES_POOL_MAX_OVERFLOW", 10)),
+            "MAX_LIFETIME": int(os.environ.get("POSTGRES_POOL_MAX_LIFETIME", 1800)),
+            "TIMEOUT": int(os.environ.get("POSTGRES_POOL_TIMEOUT", 30)),
+            "CHECK_IDLE": int(os.environ.get("POSTGRES_POOL_CHECK_IDLE", 10)),
+        },
     }
 }
 
@@ -139,7 +152,16 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Django REST Framework Settings
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "events.authentication.CachedTokenAuthentication",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "events.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "events.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
@@ -156,11 +178,148 @@ SPECTACULAR_SETTINGS = {
 }
 
 # Celery Settings
+EVENTS_QUEUE = os.environ.get("EVENTS_QUEUE", "events")
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL")
-CELERY_ACCEPT_CONTENT = ["application/json"]
+# Tasks are serialized with `events.codec` ("fastjson"), JSON messages are still
+# accepted so queues published by previous versions drain.
+CELERY_ACCEPT_CONTENT = ["application/json", "application/x-fastjson"]
 CELERY_RESULT_SERIALIZER = "json"
-CELERY_TASK_SERIALIZER = "json"
+CELERY_TASK_SERIALIZER = "fastjson"
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_SEND_EVENTS = True
 
 CELERY_IMPORTS = ("events.tasks",)
+CELERY_TASK_ROUTES = {
+    "handle_event": {"queue": EVENTS_QUEUE},
+    "handle_events": {"queue": EVENTS_QUEUE},
+}
+CELERY_BEAT_SCHEDULE = {
+    "maintain-event-partitions": {
+        "task": "maintain_event_partitions",
+        "schedule": 60 * 60,
+    },
+    "update-event-rollups": {
+        "task": "update_event_rollups",
+        "schedule": 60,
+    },
+    "archive-events": {
+        "task": "archive_events",
+        "schedule": 60 * 60,
+    },
+}
+
+# Events Settings
+EVENTS_BATCH_MAX_SIZE = int(os.environ.get("EVENTS_BATCH_MAX_SIZE", 500))
+
+# Batches of at least EVENTS_BATCH_COMPRESSION_MIN_SIZE events are compressed by
+# Celery with EVENTS_BATCH_COMPRESSION before being published ("" disables it).
+EVENTS_BATCH_COMPRESSION = os.environ.get("EVENTS_BATCH_COMPRESSION", "zlib") or None
+EVENTS_BATCH_COMPRESSION_MIN_SIZE = int(
+    os.environ.get("EVENTS_BATCH_COMPRESSION_MIN_SIZE", 10)
+)
+
+# Page size of `GET /events/`, clients can ask for up to EVENTS_MAX_PAGE_SIZE events.
+EVENTS_PAGE_SIZE = int(os.environ.get("EVENTS_PAGE_SIZE", 100))
+EVENTS_MAX_PAGE_SIZE = int(os.environ.get("EVENTS_MAX_PAGE_SIZE", 1000))
+
+# Rows fetched per round trip when streaming `GET /events/?format=ndjson` exports.
+EVENTS_EXPORT_CHUNK_SIZE = int(os.environ.get("EVENTS_EXPORT_CHUNK_SIZE", 2000))
+
+# `GET /events/` pages are cached for EVENTS_RESPONSE_CACHE_TTL seconds, late events of
+# time ranges that ended show up once it expires.
+EVENTS_RESPONSE_CACHE_SIZE = int(os.environ.get("EVENTS_RESPONSE_CACHE_SIZE", 1000))
+EVENTS_RESPONSE_CACHE_TTL = int(os.environ.get("EVENTS_RESPONSE_CACHE_TTL", 300))
+
+# Authenticated tokens are cached in process memory for EVENTS_AUTH_CACHE_TTL seconds.
+EVENTS_AUTH_CACHE_SIZE = int(os.environ.get("EVENTS_AUTH_CACHE_SIZE", 10_000))
+EVENTS_AUTH_CACHE_TTL = int(os.environ.get("EVENTS_AUTH_CACHE_TTL", 60))
+
+# `events_event` partitions, see `events.partitions`. EVENTS_PARTITION_INTERVAL is
+# "day" or "month" and shouldn't change once partitions exist. Partitions older than
+# EVENTS_RETENTION_DAYS (unset keeps everything) are detached, and dropped too
+# when EVENTS_PARTITION_DROP_EXPIRED is true, expired rows of the default
+# partition are moved out or deleted the same way.
+EVENTS_PARTITION_INTERVAL = os.environ.get("EVENTS_PARTITION_INTERVAL", "month")
+EVENTS_PARTITION_PREMAKE = int(os.environ.get("EVENTS_PARTITION_PREMAKE", 2))
+EVENTS_RETENTION_DAYS = int(os.environ.get("EVENTS_RETENTION_DAYS", 0)) or None
+EVENTS_PARTITION_DROP_EXPIRED = (
+    os.environ.get("EVENTS_PARTITION_DROP_EXPIRED", "false") == "true"
+)
+
+# Events older than EVENTS_ARCHIVE_AFTER_DAYS (unset keeps everything in the database)
+# are moved to compressed segment files of up to EVENTS_ARCHIVE_SEGMENT_SIZE events in
+# EVENTS_ARCHIVE_DIR and deleted EVENTS_ARCHIVE_DELETE_CHUNK_SIZE rows at a time, see
+# `events.archive`. `GET /events/` still reads them.
+EVENTS_ARCHIVE_AFTER_DAYS = int(os.environ.get("EVENTS_ARCHIVE_AFTER_DAYS", 0)) or None
+EVENTS_ARCHIVE_DIR = os.environ.get("EVENTS_ARCHIVE_DIR", str(BASE_DIR / "archive"))
+EVENTS_ARCHIVE_SEGMENT_SIZE = int(
+    os.environ.get("EVENTS_ARCHIVE_SEGMENT_SIZE", 100_000)
+)
+EVENTS_ARCHIVE_DELETE_CHUNK_SIZE = int(
+    os.environ.get("EVENTS_ARCHIVE_DELETE_CHUNK_SIZE", 5000)
+)
+
+# Number of (application, session) pairs each worker process remembers as existing,
+# for EVENTS_SESSION_CACHE_TTL seconds.
+EVENTS_SESSION_CACHE_SIZE = int(os.environ.get("EVENTS_SESSION_CACHE_SIZE", 100_000))
+EVENTS_SESSION_CACHE_TTL = int(os.environ.get("EVENTS_SESSION_CACHE_TTL", 300))
+
+# Number of events each worker process remembers having committed, their retries are
+# dropped without a database round trip.
+EVENTS_RECENT_EVENTS_SIZE = int(os.environ.get("EVENTS_RECENT_EVENTS_SIZE", 100_000))
+
+# Batching consumer (`manage.py consume_events`), a batch is stored when it reaches
+# EVENTS_CONSUMER_BATCH_SIZE messages or EVENTS_CONSUMER_BATCH_TIMEOUT_MS after its
+# first message arrived, whichever happens first.
+EVENTS_CONSUMER_BATCH_SIZE = int(os.environ.get("EVENTS_CONSUMER_BATCH_SIZE", 500))
+EVENTS_CONSUMER_BATCH_TIMEOUT_MS = int(
+    os.environ.get("EVENTS_CONSUMER_BATCH_TIMEOUT_MS", 100)
+)
+
+# Events loaded per `COPY` statement by `manage.py load_events`.
+EVENTS_BACKFILL_CHUNK_SIZE = int(os.environ.get("EVENTS_BACKFILL_CHUNK_SIZE", 10_000))
+
+# Where accepted events go: "celery" publishes them to the broker from the request,
+# "direct" stores them from the web process (see below) and "spool" appends them to
+# segment files in EVENTS_SPOOL_DIR that `manage.py drain_spool` sends to
+# EVENTS_SPOOL_DRAIN_TARGET ("broker" or "database"). Segments are fsynced every
+# EVENTS_SPOOL_FSYNC_INTERVAL_MS (0 fsyncs every request), requests wait for it up to
+# EVENTS_SPOOL_SYNC_TIMEOUT_MS before answering 503, and closed once they reach
+# EVENTS_SPOOL_SEGMENT_BYTES or are EVENTS_SPOOL_SEGMENT_SECONDS old.
+EVENTS_INGEST_BACKEND = os.environ.get("EVENTS_INGEST_BACKEND", "celery")
+EVENTS_SPOOL_DIR = os.environ.get("EVENTS_SPOOL_DIR", str(BASE_DIR / "spool"))
+EVENTS_SPOOL_DRAIN_TARGET = os.environ.get("EVENTS_SPOOL_DRAIN_TARGET", "broker")
+EVENTS_SPOOL_FSYNC_INTERVAL_MS = int(
+    os.environ.get("EVENTS_SPOOL_FSYNC_INTERVAL_MS", 10)
+)
+EVENTS_SPOOL_SEGMENT_BYTES = int(
+    os.environ.get("EVENTS_SPOOL_SEGMENT_BYTES", 16 * 1024 * 1024)
+)
+EVENTS_SPOOL_SEGMENT_SECONDS = int(os.environ.get("EVENTS_SPOOL_SEGMENT_SECONDS", 5))
+EVENTS_SPOOL_SYNC_TIMEOUT_MS = int(os.environ.get("EVENTS_SPOOL_SYNC_TIMEOUT_MS", 5000))
+
+# EVENTS_INGEST_BACKEND=direct stores the events accepted within
+# EVENTS_DIRECT_FLUSH_INTERVAL_MS, or up to EVENTS_DIRECT_FLUSH_SIZE events, in one
+# transaction. With EVENTS_DIRECT_SYNC_ACK requests wait for that commit, up to
+# EVENTS_DIRECT_ACK_TIMEOUT_MS before answering 503.
+EVENTS_DIRECT_ACK_TIMEOUT_MS = int(os.environ.get("EVENTS_DIRECT_ACK_TIMEOUT_MS", 5000))
+EVENTS_DIRECT_FLUSH_INTERVAL_MS = int(
+    os.environ.get("EVENTS_DIRECT_FLUSH_INTERVAL_MS", 5)
+)
+EVENTS_DIRECT_FLUSH_SIZE = int(os.environ.get("EVENTS_DIRECT_FLUSH_SIZE", 500))
+EVENTS_DIRECT_SYNC_ACK = os.environ.get("EVENTS_DIRECT_SYNC_ACK", "true") == "true"
+
+# A EVENTS_PROFILE_SAMPLE_RATE fraction of the requests (0 disables sampling), and the
+# ones carrying a token from `manage.py profile_token` in EVENTS_PROFILE_HEADER, are
+# profiled into EVENTS_PROFILE_DIR, which keeps the newest EVENTS_PROFILE_KEEP profiles.
+EVENTS_PROFILE_SAMPLE_RATE = float(os.environ.get("EVENTS_PROFILE_SAMPLE_RATE", 0))
+EVENTS_PROFILE_HEADER = os.environ.get("EVENTS_PROFILE_HEADER", "X-Profile")
+EVENTS_PROFILE_TOKEN_MAX_AGE = int(os.environ.get("EVENTS_PROFILE_TOKEN_MAX_AGE", 3600))
+EVENTS_PROFILE_DIR = os.environ.get("EVENTS_PROFILE_DIR", str(BASE_DIR / "profiles"))
+EVENTS_PROFILE_KEEP = int(os.environ.get("EVENTS_PROFILE_KEEP", 500))
+
+# Largest request body accepted once decompressed, for requests sent with
+# `Content-Encoding: gzip` or `deflate`.
+EVENTS_REQUEST_MAX_DECOMPRESSED_SIZE = int(
+    os.environ.get("EVENTS_REQUEST_MAX_DECOMPRESSED_SIZE", 10 * 1024 * 1024)
+)
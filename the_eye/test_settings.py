@@ -1,6 +1,49 @@
 from .settings import (
     AUTH_USER_MODEL,
+    CELERY_TASK_ROUTES,
     DATABASES,
+    EVENTS_ARCHIVE_AFTER_DAYS,
+    EVENTS_ARCHIVE_DELETE_CHUNK_SIZE,
+    EVENTS_ARCHIVE_DIR,
+    EVENTS_ARCHIVE_SEGMENT_SIZE,
+    EVENTS_AUTH_CACHE_SIZE,
+    EVENTS_AUTH_CACHE_TTL,
+    EVENTS_BACKFILL_CHUNK_SIZE,
+    EVENTS_BATCH_COMPRESSION,
+    EVENTS_BATCH_COMPRESSION_MIN_SIZE,
+    EVENTS_BATCH_MAX_SIZE,
+    EVENTS_CONSUMER_BATCH_SIZE,
+    EVENTS_CONSUMER_BATCH_TIMEOUT_MS,
+    EVENTS_DIRECT_ACK_TIMEOUT_MS,
+    EVENTS_DIRECT_FLUSH_INTERVAL_MS,
+    EVENTS_DIRECT_FLUSH_SIZE,
+    EVENTS_DIRECT_SYNC_ACK,
+    EVENTS_EXPORT_CHUNK_SIZE,
+    EVENTS_INGEST_BACKEND,
+    EVENTS_MAX_PAGE_SIZE,
+    EVENTS_PAGE_SIZE,
+    EVENTS_PARTITION_DROP_EXPIRED,
+    EVENTS_PARTITION_INTERVAL,
+    EVENTS_PARTITION_PREMAKE,
+    EVENTS_PROFILE_DIR,
+    EVENTS_PROFILE_HEADER,
+    EVENTS_PROFILE_KEEP,
+    EVENTS_PROFILE_SAMPLE_RATE,
+    EVENTS_PROFILE_TOKEN_MAX_AGE,
+    EVENTS_QUEUE,
+    EVENTS_RECENT_EVENTS_SIZE,
+    EVENTS_REQUEST_MAX_DECOMPRESSED_SIZE,
+    EVENTS_RESPONSE_CACHE_SIZE,
+    EVENTS_RESPONSE_CACHE_TTL,
+    EVENTS_RETENTION_DAYS,
+    EVENTS_SESSION_CACHE_SIZE,
+    EVENTS_SESSION_CACHE_TTL,
+    EVENTS_SPOOL_DIR,
+    EVENTS_SPOOL_DRAIN_TARGET,
+    EVENTS_SPOOL_FSYNC_INTERVAL_MS,
+    EVENTS_SPOOL_SEGMENT_BYTES,
+    EVENTS_SPOOL_SEGMENT_SECONDS,
+    EVENTS_SPOOL_SYNC_TIMEOUT_MS,
     INSTALLED_APPS,
     MIDDLEWARE,
     ROOT_URLCONF,
@@ -20,7 +20,7 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
-from events.views import EventsView
+from events.views import EventsBatchView, EventStatsView, EventsView, MetricsView
 
 urlpatterns = [
     path(r"", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
@@ -28,4 +28,7 @@ urlpatterns = [
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/schema/swagger-ui/", SpectacularSwaggerView.as_view(), name="swagger-ui"),
     path("events/", EventsView.as_view(), name="events"),
+    path("events/batch/", EventsBatchView.as_view(), name="events-batch"),
+    path("events/stats/", EventStatsView.as_view(), name="events-stats"),
+    path("metrics", MetricsView.as_view(), name="metrics"),
 ]